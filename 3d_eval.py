@@ -1,12 +1,74 @@
 import subprocess
 import json
+import glob
 import os
+import itertools
+import multiprocessing
+import queue
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import Dict, Optional
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+from dataclasses import asdict, dataclass, field, replace
 import time
 from datetime import datetime
 
+import heightmap_mesh
+import mesh_simplify
+import surface_maps
+import texture_prep
+from conversion_cache import ConversionCache, DEFAULT_MAX_BYTES, version_hash
+from surface_maps import bake_surface_maps
+
+# バッチ変換の入力として扱う画像の拡張子
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+# blender_mcp_script.py のワーカーモードが返す応答行の接頭辞
+WORKER_RESULT_PREFIX = "GAAAGS_RESULT "
+
+# blender_mcp_script.py が処理段階ごとに出力する進捗イベント行の接頭辞
+WORKER_EVENT_PREFIX = "GAAAGS_EVENT "
+
+# この秒数だけBlenderの出力が途切れたら固まったとみなして強制終了する
+DEFAULT_STALL_TIMEOUT = 120
+
+# エラー調査用に保持するBlender出力の行数
+BLENDER_LOG_LINES = 200
+
+# Blenderを起動せずに heightmap_mesh で変換する品質レベル
+FAST_BACKEND_QUALITIES = {"low", "medium"}
+
+# エクスポート形式ごとの拡張子（gltf はどちらのバックエンドでもバイナリの .glb で書き出す）
+MODEL_EXTENSIONS = {
+    "fbx": ".fbx",
+    "obj": ".obj",
+    "gltf": ".glb"
+}
+
+def model_extension(export_format: str) -> str:
+    """エクスポート形式の拡張子（gltf は .glb）"""
+    fmt = export_format.lower()
+    return MODEL_EXTENSIONS.get(fmt, f".{fmt}")
+
+# 出力ファイルと一緒に書き出されるサーフェスマップ（<出力名>_<マップ名>.png）
+SURFACE_MAP_NAMES = ("normal", "occlusion", "height")
+
+def validate_mesh_mode(mesh_mode: str, formats: Iterable[str]):
+    """メッシュの作り方と出力フォーマットの組み合わせを確認
+    
+    silhouette は heightmap_mesh だけが作れるため、heightmap_mesh が書き出せないフォーマット（fbx など）との
+    組み合わせは ValueError にする（Blenderの平面に黙って切り替わらないように）。
+    """
+    if mesh_mode not in ("plane", "silhouette"):
+        raise ValueError(f"未対応のメッシュの作り方です: {mesh_mode}")
+    unsupported = [fmt for fmt in formats if fmt.lower() not in heightmap_mesh.SUPPORTED_FORMATS]
+    if mesh_mode == "silhouette" and unsupported:
+        raise ValueError(f"silhouette は {' / '.join(heightmap_mesh.SUPPORTED_FORMATS)} のみ対応しています: "
+                         f"{', '.join(unsupported)}")
+
 @dataclass
 class ConversionSettings:
     """3D変換設定"""
@@ -15,6 +77,11 @@ class ConversionSettings:
     texture_size: int = 1024
     generate_lod: bool = True
     export_format: str = "fbx"  # fbx, obj, gltf
+    mesh_mode: str = "plane"  # plane, silhouette（silhouette は heightmap_mesh のみ対応）
+    surface_detail: str = "displacement"  # displacement, normal_map（中・高品質の凹凸の表現方法）
+    
+    def __post_init__(self):
+        validate_mesh_mode(self.mesh_mode, [self.export_format])
     
     @property
     def displacement_strength(self) -> float:
@@ -40,24 +107,412 @@ class ConversionMetadata:
     model_info: Dict
     conversion_info: Dict
     
+    @staticmethod
+    def path_for(output_path: str) -> Path:
+        """出力ファイルに対応するメタデータのパス（<画像名>.metadata.json）"""
+        output_path = Path(output_path)
+        return output_path.with_name(f"{output_path.stem}.metadata.json")
+    
     def save(self, output_path: str):
-        """メタデータをJSONファイルとして保存"""
-        metadata_path = Path(output_path).parent / "metadata.json"
-        with open(metadata_path, 'w', encoding='utf-8') as f:
+        """メタデータを出力ファイルの隣にJSONファイルとして保存
+        
+        並列変換で同じフォルダに書き出しても上書きし合わないよう出力ごとに別のファイルにし、
+        一時ファイルに書いてから置き換える。
+        """
+        metadata_path = self.path_for(output_path)
+        temp_path = metadata_path.with_name(f".{metadata_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
             json.dump({
                 "model_info": self.model_info,
                 "conversion_info": self.conversion_info
             }, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, metadata_path)
+
+@dataclass
+class BatchReport:
+    """バッチ変換の集計（品質レベル別のスループットと失敗）"""
+    started_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    elapsed_seconds: float = 0.0
+    per_quality: Dict[str, Dict] = field(default_factory=dict)
+    failures: List[Dict] = field(default_factory=list)
+    
+    def _stats(self, quality: str) -> Dict:
+        return self.per_quality.setdefault(quality, {
+            "succeeded": 0, "failed": 0, "retries": 0, "cache_hits": 0,
+            "busy_seconds": 0.0, "elapsed_seconds": 0.0,
+            "measured": 0, "stage_seconds": {}, "vertices": 0, "faces": 0, "output_bytes": 0
+        })
+    
+    def record(self, quality: str, image_path: str, success: bool, seconds: float, attempt: int,
+               final: bool):
+        """1回の変換試行を記録（final は最後の試行かどうか）"""
+        stats = self._stats(quality)
+        stats["busy_seconds"] += seconds
+        if success:
+            stats["succeeded"] += 1
+        elif final:
+            stats["failed"] += 1
+            self.failures.append({"quality": quality, "image_path": image_path, "attempts": attempt})
+        else:
+            stats["retries"] += 1
+    
+    def record_metrics(self, quality: str, metrics: Dict):
+        """成功した変換の計測値（convert_to_3d の metrics）を品質レベル別に合計"""
+        if not metrics:
+            return
+        stats = self._stats(quality)
+        stats["measured"] += 1
+        for stage, seconds in metrics.get("stages", {}).items():
+            stats["stage_seconds"][stage] = stats["stage_seconds"].get(stage, 0.0) + seconds
+        base_mesh = metrics.get("meshes", {}).get("base", {})
+        stats["vertices"] += base_mesh.get("vertices") or 0
+        stats["faces"] += base_mesh.get("faces") or 0
+        stats["output_bytes"] += sum(metrics.get("output_bytes", {}).values())
+    
+    def finish(self, quality: str, elapsed: float, cache_hits: int = 0):
+        """品質レベル1回分のバッチ所要時間とキャッシュから復元した件数を加算"""
+        stats = self._stats(quality)
+        stats["elapsed_seconds"] += elapsed
+        stats["cache_hits"] += cache_hits
+        self.elapsed_seconds += elapsed
+    
+    def to_dict(self) -> Dict:
+        """JSON保存用の辞書（スループットを含む）"""
+        per_quality = {}
+        for quality, stats in self.per_quality.items():
+            done = stats["succeeded"] + stats["failed"]
+            elapsed = stats["elapsed_seconds"]
+            measured = stats["measured"]
+            # 段階ごとの平均所要時間（最も長い段階をボトルネックとして示す）
+            avg_stage_seconds = {stage: round(seconds / measured, 3)
+                                 for stage, seconds in stats["stage_seconds"].items()} if measured else {}
+            per_quality[quality] = dict(
+                stats,
+                busy_seconds=round(stats["busy_seconds"], 2),
+                elapsed_seconds=round(elapsed, 2),
+                stage_seconds={stage: round(seconds, 2) for stage, seconds in stats["stage_seconds"].items()},
+                images_per_minute=round(stats["succeeded"] / elapsed * 60, 2) if elapsed else 0.0,
+                avg_seconds_per_attempt=round(
+                    stats["busy_seconds"] / (done + stats["retries"]), 2) if done + stats["retries"] else 0.0,
+                avg_stage_seconds=avg_stage_seconds,
+                bottleneck_stage=max(avg_stage_seconds, key=avg_stage_seconds.get) if avg_stage_seconds else None,
+                avg_faces=round(stats["faces"] / measured) if measured else 0,
+                avg_output_bytes=round(stats["output_bytes"] / measured) if measured else 0
+            )
+        total_succeeded = sum(stats["succeeded"] for stats in self.per_quality.values())
+        return {
+            "started_at": self.started_at,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "succeeded": total_succeeded,
+            "failed": len(self.failures),
+            "images_per_minute": round(total_succeeded / self.elapsed_seconds * 60, 2) if self.elapsed_seconds else 0.0,
+            "per_quality": per_quality,
+            "failures": self.failures
+        }
+    
+    def save(self, path: Path):
+        """batch_report.json として保存"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+
+def print_progress(event: Dict):
+    """進捗イベントの既定の表示（処理段階の終了とポリゴン数）"""
+    label = "/".join(str(event[key]) for key in ("quality", "lod") if key in event)
+    prefix = f"  [{label}] " if label else "  "
+    if event.get("event") == "stage_end":
+        print(f"{prefix}{event.get('stage')}: {event.get('seconds', 0):.2f}秒")
+    elif event.get("event") == "poly_count":
+        print(f"{prefix}ポリゴン数: {event.get('polygons'):,}")
+
+def pump_lines(stream, lines: queue.Queue):
+    """出力を1行ずつキューへ転送（EOFでNoneを送る）"""
+    for line in stream:
+        lines.put(line.rstrip('\n'))
+    lines.put(None)
+
+def read_blender_output(lines: queue.Queue, log: deque, timeout: float,
+                        stall_timeout: Optional[float] = None,
+                        on_event: Callable[[Dict], None] = None) -> Optional[Dict]:
+    """応答行が届くまでBlenderの出力を読み進める（プロセスが終了した場合は None）
+    
+    進捗イベント行は on_event へ渡し、それ以外の行は log に残す。
+    timeout 秒以内に応答がない場合と、stall_timeout 秒間出力が途切れた場合は TimeoutError。
+    """
+    deadline = time.time() + timeout
+    last_output = time.time()
+    while True:
+        now = time.time()
+        wait_seconds = deadline - now
+        if wait_seconds <= 0:
+            raise TimeoutError(f"Blenderが{timeout}秒以内に応答しませんでした")
+        if stall_timeout:
+            if now - last_output >= stall_timeout:
+                raise TimeoutError(f"Blenderの出力が{stall_timeout}秒間止まっています")
+            wait_seconds = min(wait_seconds, last_output + stall_timeout - now)
+        try:
+            line = lines.get(timeout=wait_seconds)
+        except queue.Empty:
+            continue
+        if line is None:
+            return None
+        last_output = time.time()
+        if line.startswith(WORKER_RESULT_PREFIX):
+            return json.loads(line[len(WORKER_RESULT_PREFIX):])
+        if line.startswith(WORKER_EVENT_PREFIX):
+            if on_event:
+                on_event(json.loads(line[len(WORKER_EVENT_PREFIX):]))
+            continue
+        log.append(line)
+
+def iter_image_paths(source: Union[str, Path, Iterable]) -> Iterator[Path]:
+    """ディレクトリ・マニフェスト（.json / 1行1パスのテキスト）・パスのリストから画像パスを順に取り出す"""
+    if not isinstance(source, (str, Path)):
+        for path in source:
+            yield Path(path)
+        return
+    
+    source = Path(source)
+    if source.is_dir():
+        # 大量のファイルでも一覧を作らずに逐次処理する
+        with os.scandir(source) as entries:
+            for entry in entries:
+                if entry.is_file() and Path(entry.name).suffix.lower() in IMAGE_EXTENSIONS:
+                    yield Path(entry.path)
+    elif source.suffix.lower() in IMAGE_EXTENSIONS:
+        yield source
+    elif source.suffix.lower() == ".json":
+        with open(source, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        entries = manifest.get("images", []) if isinstance(manifest, dict) else manifest
+        for entry in entries:
+            path = entry["path"] if isinstance(entry, dict) else entry
+            yield source.parent / path
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    yield source.parent / line
+
+class BlenderWorker:
+    """スクリプトを読み込んだまま常駐し、標準入出力でジョブを受け取るBlenderプロセス"""
+    
+    def __init__(self, blender_path: str, script_path: Path, startup_timeout: float = 120,
+                 stall_timeout: Optional[float] = DEFAULT_STALL_TIMEOUT):
+        self.blender_path = blender_path
+        self.script_path = script_path
+        self.startup_timeout = startup_timeout
+        self.stall_timeout = stall_timeout
+        self.process = None
+        self.jobs_done = 0
+        self.last_used = 0.0
+        self.log = deque(maxlen=BLENDER_LOG_LINES)  # 直近のBlender出力（エラー調査用）
+        self._lines = queue.Queue()
+        self._ids = itertools.count(1)
+    
+    def start(self):
+        """ワーカープロセスを起動して準備完了を待つ"""
+        self.process = subprocess.Popen(
+            [self.blender_path, '--background', '--python', str(self.script_path), '--', '--serve'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=pump_lines, args=(self.process.stdout, self._lines), daemon=True).start()
+        
+        response = self._read_response(self.startup_timeout)
+        if response.get("status") != "ready":
+            self.stop()
+            raise RuntimeError(f"Blenderワーカーの起動に失敗: {response}")
+        self.jobs_done = 0
+        self.last_used = time.time()
+    
+    def _read_response(self, timeout: float, stall_timeout: Optional[float] = None,
+                       on_event: Callable[[Dict], None] = None) -> Dict:
+        """応答行が届くまで出力を読み進める"""
+        try:
+            response = read_blender_output(self._lines, self.log, timeout, stall_timeout, on_event)
+        except TimeoutError:
+            # 固まったワーカーは終了処理を待たずに強制終了
+            self.stop(graceful=False)
+            raise
+        if response is None:
+            raise RuntimeError("Blenderワーカーが終了しました: " + "\n".join(list(self.log)[-20:]))
+        return response
+    
+    def request(self, payload: Dict, timeout: float, on_event: Callable[[Dict], None] = None) -> Dict:
+        """ジョブを送って応答を待つ（進捗イベントは on_event へ渡す）"""
+        if not self.is_alive():
+            self.start()
+        
+        payload = dict(payload, id=next(self._ids))
+        self.process.stdin.write(json.dumps(payload, ensure_ascii=False) + '\n')
+        self.process.stdin.flush()
+        response = self._read_response(timeout, self.stall_timeout, on_event)
+        self.last_used = time.time()
+        if payload.get("command", "convert") not in ("ping", "shutdown"):
+            self.jobs_done += 1
+        return response
+    
+    def is_alive(self) -> bool:
+        """プロセスが動作中か"""
+        return self.process is not None and self.process.poll() is None
+    
+    def ping(self, timeout: float = 10) -> bool:
+        """ヘルスチェック"""
+        try:
+            return self.is_alive() and self.request({"command": "ping"}, timeout).get("status") == "ok"
+        except Exception:
+            return False
+    
+    def stop(self, graceful: bool = True):
+        """ワーカープロセスを終了"""
+        if self.process is None:
+            return
+        if not graceful:
+            self.process.kill()
+            self.process.wait()
+        elif self.process.poll() is None:
+            try:
+                self.process.stdin.write(json.dumps({"command": "shutdown"}) + '\n')
+                self.process.stdin.flush()
+                self.process.wait(timeout=10)
+            except Exception:
+                self.process.kill()
+                self.process.wait()
+        self.process = None
+
+class BlenderWorkerPool:
+    """常駐Blenderワーカーのプール
+    
+    Blenderの起動コストを1回にまとめ、ジョブ間は clear_scene でシーンをリセットする。
+    リーク対策として max_jobs_per_worker 件ごとにワーカーを作り直す。
+    """
+    
+    def __init__(self, blender_path: str, script_path: Path, size: int = 2,
+                 max_jobs_per_worker: int = 50, health_check_interval: float = 60,
+                 stall_timeout: Optional[float] = DEFAULT_STALL_TIMEOUT):
+        self.blender_path = blender_path
+        self.script_path = script_path
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.health_check_interval = health_check_interval
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(BlenderWorker(blender_path, script_path, stall_timeout=stall_timeout))
+    
+    def _acquire(self) -> BlenderWorker:
+        """空いているワーカーを取得（必要なら起動・ヘルスチェック）"""
+        worker = self._idle.get()
+        try:
+            if not worker.is_alive():
+                worker.start()
+            elif time.time() - worker.last_used > self.health_check_interval and not worker.ping():
+                print("Blenderワーカーが応答しないため再起動します")
+                worker.stop()
+                worker.start()
+        except Exception:
+            self._idle.put(worker)
+            raise
+        return worker
+    
+    def _release(self, worker: BlenderWorker):
+        """ワーカーを返却（規定件数に達したら作り直す）"""
+        if worker.jobs_done >= self.max_jobs_per_worker:
+            worker.stop()
+        self._idle.put(worker)
+    
+    def run(self, job: Dict, timeout: float = 300, on_event: Callable[[Dict], None] = None) -> Dict:
+        """空いているワーカーでジョブを1件実行"""
+        worker = self._acquire()
+        try:
+            return worker.request(job, timeout, on_event)
+        finally:
+            self._release(worker)
+    
+    def convert(self, image_path: str, output_path: str, settings: Dict, timeout: float = 300) -> Dict:
+        """空いているワーカーで1件変換"""
+        return self.run({
+            "command": "convert",
+            "image_path": image_path,
+            "output_path": output_path,
+            "settings": settings
+        }, timeout)
+    
+    def close(self):
+        """全ワーカーを終了"""
+        for _ in range(self.size):
+            self._idle.get().stop()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
 
 class BlenderMCPConverter:
     """Blender-MCPを使った3D変換"""
     
-    def __init__(self, blender_path: str = None):
+    def __init__(self, blender_path: str = None, worker_pool_size: int = 0,
+                 max_jobs_per_worker: int = 50, fast_backend: bool = True,
+                 cache_dir: str = None, cache_max_bytes: int = DEFAULT_MAX_BYTES,
+                 texture_workers: int = None, stall_timeout: Optional[float] = DEFAULT_STALL_TIMEOUT,
+                 on_event: Optional[Callable[[Dict], None]] = print_progress):
         self.blender_path = blender_path or self.find_blender()
         self.mcp_script_path = Path("blender_mcp_script.py")
         self.setup_mcp_script()
+        # cache_dir を指定すると同じ画像・設定の変換結果を再利用する
+        self.cache = None
+        self.cache_version = None
+        if cache_dir:
+            self.cache = ConversionCache(cache_dir, cache_max_bytes)
+            self.cache_version = version_hash([
+                self.mcp_script_path, heightmap_mesh.__file__, mesh_simplify.__file__, surface_maps.__file__,
+                texture_prep.__file__
+            ])
+        # Blenderに渡すテクスチャの前処理は別プロセスで並列に行う（初回使用時に起動）
+        self.texture_workers = texture_workers or os.cpu_count() or 1
+        self.texture_pool = None
+        self._texture_pool_lock = threading.Lock()
+        self._texture_jobs = 0  # 前処理中の変換の数
         self.max_retries = 3
         self.error_log = []
+        self.last_report = None
+        # 低・中品質の gltf / obj はBlenderを使わずにNumPyで変換する
+        self.fast_backend = fast_backend
+        # Blenderの進捗イベント（image_path 付き）を受け取るコールバックと、出力の途絶による打ち切り秒数
+        self.on_event = on_event
+        self.stall_timeout = stall_timeout
+        # worker_pool_size > 0 の場合は常駐Blenderワーカーで変換する
+        self.worker_pool = None
+        if worker_pool_size > 0:
+            self.worker_pool = BlenderWorkerPool(
+                self.blender_path, self.mcp_script_path,
+                size=worker_pool_size, max_jobs_per_worker=max_jobs_per_worker,
+                stall_timeout=stall_timeout
+            )
+    
+    def close(self):
+        """常駐ワーカーを終了し、キャッシュの記録を保存"""
+        if self.cache:
+            self.cache.flush()
+        if self.texture_pool:
+            self.texture_pool.shutdown()
+            self.texture_pool = None
+        if self.worker_pool:
+            self.worker_pool.close()
+            self.worker_pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
     
     def find_blender(self) -> str:
         """Blenderの実行ファイルを探す"""
@@ -86,14 +541,85 @@ class BlenderMCPConverter:
         script_content = '''
 import bpy
 import bmesh
+import json
 import os
 import sys
+import time
+from contextlib import contextmanager
 from mathutils import Vector
 
+# 進捗イベント行の接頭辞（変換側が1行ずつ読み取ってコールバックへ渡す）
+EVENT_PREFIX = "GAAAGS_EVENT "
+
+# 実行中のジョブの計測値（ジョブごとにリセットして応答に含める）
+STATS = {"stages": {}, "meshes": {}, "qualities": {}}
+
+def reset_stats():
+    """計測値をリセット"""
+    STATS.clear()
+    STATS.update({"stages": {}, "meshes": {}, "qualities": {}})
+
+def stats_for(quality=None):
+    """品質ごとの計測値（品質なしは全品質で共有する処理の計測値）"""
+    if quality is None:
+        return STATS
+    return STATS["qualities"].setdefault(quality, {"stages": {}, "meshes": {}})
+
+def emit(event, **fields):
+    """進捗イベントをJSONで1行出力"""
+    fields = {key: value for key, value in fields.items() if value is not None}
+    print(EVENT_PREFIX + json.dumps(dict(fields, event=event)), flush=True)
+
+@contextmanager
+def stage(name, **fields):
+    """処理段階の開始と終了（所要時間付き）を通知し、所要時間を計測値に加算"""
+    emit("stage_start", stage=name, **fields)
+    started = time.time()
+    yield
+    seconds = time.time() - started
+    stages = stats_for(fields.get('quality'))["stages"]
+    stages[name] = round(stages.get(name, 0.0) + seconds, 3)
+    emit("stage_end", stage=name, seconds=round(seconds, 3), **fields)
+
+def emit_poly_count(obj, quality=None, lod=None):
+    """オブジェクトの頂点数とポリゴン数を通知し、計測値に記録（LODなしは base）"""
+    vertices, faces = len(obj.data.vertices), len(obj.data.polygons)
+    stats_for(quality)["meshes"][lod or "base"] = {"vertices": vertices, "faces": faces}
+    emit("poly_count", object=obj.name, vertices=vertices, polygons=faces, quality=quality, lod=lod)
+
+# ジョブごとに解放するデータブロックの種類（どこからも参照されていないものを削除）
+ORPHAN_DATA = ("meshes", "materials", "textures", "images", "node_groups")
+
 def clear_scene():
-    """シーンをクリア"""
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete(use_global=False)
+    """シーンをクリア（オペレーターを使わずにオブジェクトを削除し、孤立したデータも破棄）"""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    purge_orphans()
+
+def purge_orphans():
+    """利用者のいないデータブロックを削除（削除で新たに孤立したものも続けて削除）"""
+    removed = True
+    while removed:
+        removed = False
+        for name in ORPHAN_DATA:
+            blocks = getattr(bpy.data, name)
+            for block in [block for block in blocks if block.users == 0]:
+                blocks.remove(block)
+                removed = True
+
+def create_plane_mesh(name, size=2.0):
+    """bmeshでUV付きの正方形プレーン（XY平面、中心が原点、法線+Z）を作成"""
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    uv_layer = bm.loops.layers.uv.new("UVMap")
+    half = size / 2
+    corners = [(-half, -half), (half, -half), (half, half), (-half, half)]
+    face = bm.faces.new([bm.verts.new((x, y, 0.0)) for x, y in corners])
+    for loop, (x, y) in zip(face.loops, corners):
+        loop[uv_layer].uv = (x / size + 0.5, y / size + 0.5)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
 
 def create_plane_with_image(image_path, settings):
     """2D画像から3Dプレーンを作成"""
@@ -104,8 +630,8 @@ def create_plane_with_image(image_path, settings):
         return None
     
     # プレーン作成
-    bpy.ops.mesh.primitive_plane_add(size=2)
-    plane = bpy.context.active_object
+    plane = bpy.data.objects.new("Plane", create_plane_mesh("Plane"))
+    bpy.context.scene.collection.objects.link(plane)
     
     # マテリアル作成
     material = bpy.data.materials.new(name="ImageMaterial")
@@ -122,12 +648,15 @@ def create_plane_with_image(image_path, settings):
     # プリンシプルBSDFノード
     principled = nodes.new('ShaderNodeBsdfPrincipled')
     
-    # 画像テクスチャノード
-    image = bpy.data.images.load(image_path)
+    # 画像テクスチャノード（前処理済みのテクスチャがあればそれを使う）
+    color_texture = settings.get('color_texture')
+    image = bpy.data.images.load(color_texture or image_path, check_existing=True)
     
-    # テクスチャサイズの調整
-    if image.size[0] > settings.get('texture_size', 1024) or image.size[1] > settings.get('texture_size', 1024):
-        image.scale(settings.get('texture_size', 1024), settings.get('texture_size', 1024))
+    # テクスチャサイズの調整（前処理済みの場合は縮小済み）
+    texture_size = settings.get('texture_size', 1024)
+    if not color_texture and (image.size[0] > texture_size or image.size[1] > texture_size):
+        image.scale(texture_size, texture_size)
+    STATS["texture"] = {"width": image.size[0], "height": image.size[1]}
     
     image_node = nodes.new('ShaderNodeTexImage')
     image_node.image = image
@@ -141,47 +670,119 @@ def create_plane_with_image(image_path, settings):
     
     return plane
 
-def generate_lod(obj, quality_levels):
-    """LODを生成"""
+# LODレベルごとの縮小率（元のメッシュに対する比率）
+LOD_LEVELS = {
+    "high": 1.0,
+    "medium": 0.5,
+    "low": 0.25
+}
+
+# エクスポート形式ごとの拡張子
+MODEL_EXTENSIONS = {
+    "fbx": ".fbx",
+    "obj": ".obj",
+    "gltf": ".glb"
+}
+
+def duplicate_object(obj, name):
+    """メッシュデータごと独立した複製を作成"""
+    copy = obj.copy()
+    copy.data = obj.data.copy()
+    copy.name = name
+    for collection in obj.users_collection:
+        collection.objects.link(copy)
+    return copy
+
+def apply_modifiers(obj):
+    """スタック順に全ての修飾子を適用（評価済みメッシュでメッシュデータを置き換える）"""
+    if not obj.modifiers:
+        return
+    evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = bpy.data.meshes.new_from_object(evaluated)
+    old_mesh = obj.data
+    for modifier in list(obj.modifiers):
+        obj.modifiers.remove(modifier)
+    obj.data = mesh
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+def generate_lod(obj, quality_levels, quality=None):
+    """LODを生成（各LODは元メッシュの独立した複製から縮小するので比率が累積しない）"""
     lods = []
-    original_poly_count = len(obj.data.polygons)
     
     for level, ratio in quality_levels.items():
-        if level == "high":
+        if ratio >= 1.0:
+            emit_poly_count(obj, quality=quality, lod=level)
             lods.append(obj)
             continue
-            
+    
+        lod = duplicate_object(obj, f"{obj.name}_{level}")
+        apply_modifiers(lod)
+    
         # デシメート修飾子でポリゴン数削減
-        decimate = obj.modifiers.new(name=f"Decimate_{level}", type='DECIMATE')
+        decimate = lod.modifiers.new(name=f"Decimate_{level}", type='DECIMATE')
         decimate.type = 'RATIO'
         decimate.ratio = ratio
-        
+    
         # 修飾子適用
-        bpy.context.view_layer.objects.active = obj
-        bpy.ops.object.modifier_apply(modifier=decimate.name)
-        
-        lods.append(obj)
+        apply_modifiers(lod)
+        emit_poly_count(lod, quality=quality, lod=level)
+    
+        lods.append(lod)
     
     return lods
 
-def apply_displacement_from_image(obj, image_path, strength=0.1):
-    """画像の明度に基づいてディスプレースメントを適用"""
+def subdivide_mesh(obj, levels=2):
+    """Catmull-Clark のサブディビジョンサーフェスで滑らかに分割（levels 回、UVも補間される）
     
-    # サブディビジョンサーフェス追加
+    SUBSURF 修飾子を追加し、オペレーターを使わずに apply_modifiers（new_from_object）で適用する。
+    """
     subdiv = obj.modifiers.new(name="Subdivision", type='SUBSURF')
-    subdiv.levels = 2
-    
-    # ディスプレースメント修飾子追加
-    displace = obj.modifiers.new(name="Displace", type='DISPLACE')
-    
-    # ディスプレースメント用テクスチャ作成
+    subdiv.levels = levels
+    apply_modifiers(obj)
+
+def load_displacement_texture(image_path):
+    """ディスプレースメント用テクスチャ作成"""
     texture = bpy.data.textures.new(name="DisplaceTexture", type='IMAGE')
-    texture.image = bpy.data.images.load(image_path)
-    
+    texture.image = bpy.data.images.load(image_path, check_existing=True)
+    return texture
+
+def add_displacement(obj, texture, strength=0.1):
+    """ディスプレースメント修飾子追加"""
+    displace = obj.modifiers.new(name="Displace", type='DISPLACE')
     displace.texture = texture
     displace.strength = strength
     displace.mid_level = 0.5
 
+def attach_normal_map(obj, normal_map_path):
+    """ベイク済みのノーマルマップをマテリアルに接続（ジオメトリは変形しない）"""
+    
+    # 複製元とマテリアルを共有しないようにコピーする
+    material = obj.data.materials[0].copy()
+    obj.data.materials[0] = material
+    
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    principled = next(node for node in nodes if node.type == 'BSDF_PRINCIPLED')
+    
+    image = bpy.data.images.load(normal_map_path, check_existing=True)
+    image.colorspace_settings.name = 'Non-Color'
+    
+    image_node = nodes.new('ShaderNodeTexImage')
+    image_node.image = image
+    normal_node = nodes.new('ShaderNodeNormalMap')
+    
+    links.new(image_node.outputs['Color'], normal_node.inputs['Color'])
+    links.new(normal_node.outputs['Normal'], principled.inputs['Normal'])
+
+def apply_displacement_from_image(obj, image_path, strength=0.1):
+    """画像の明度に基づいてディスプレースメントを適用"""
+    with stage("subdivide"):
+        subdivide_mesh(obj)
+    with stage("displace"):
+        add_displacement(obj, load_displacement_texture(image_path), strength)
+        apply_modifiers(obj)
+
 def optimize_mesh(obj, poly_limit):
     """メッシュを最適化"""
     
@@ -195,97 +796,66 @@ def optimize_mesh(obj, poly_limit):
         decimate.ratio = poly_limit / current_polys
     
     # 修飾子適用
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.object.modifier_apply(modifier=decimate.name)
+    apply_modifiers(obj)
 
-def export_model(obj, output_path, format_type, generate_lod=False):
-    """モデルをエクスポート"""
+def export_object(obj, output_path, format_type):
+    """1つのオブジェクトを指定フォーマットでエクスポート"""
     
-    if generate_lod:
-        # LOD生成
-        quality_levels = {
-            "high": 1.0,
-            "medium": 0.5,
-            "low": 0.25
-        }
-        lods = generate_lod(obj, quality_levels)
-        
-        # 各LODをエクスポート
-        for level, lod_obj in zip(quality_levels.keys(), lods):
-            output_dir = os.path.dirname(output_path)
-            lod_path = os.path.join(output_dir, level, os.path.basename(output_path))
-            os.makedirs(os.path.dirname(lod_path), exist_ok=True)
-            
-            # オブジェクト選択
-            bpy.ops.object.select_all(action='DESELECT')
-            lod_obj.select_set(True)
-            bpy.context.view_layer.objects.active = lod_obj
-            
-            # フォーマットに応じてエクスポート
-            if format_type.lower() == 'fbx':
-                bpy.ops.export_scene.fbx(
-                    filepath=lod_path,
-                    use_selection=True,
-                    embed_textures=True
-                )
-            elif format_type.lower() == 'obj':
-                bpy.ops.export_scene.obj(
-                    filepath=lod_path,
-                    use_selection=True
-                )
-            elif format_type.lower() == 'gltf':
-                bpy.ops.export_scene.gltf(
-                    filepath=lod_path,
-                    use_selection=True,
-                    export_format='GLB'
-                )
-    else:
-        # 通常のエクスポート
-        bpy.ops.object.select_all(action='DESELECT')
-        obj.select_set(True)
-        bpy.context.view_layer.objects.active = obj
-        
-        if format_type.lower() == 'fbx':
-            bpy.ops.export_scene.fbx(
+    # エクスポート対象だけを選択（選択オペレーターは使わない）
+    for other in bpy.context.view_layer.objects:
+        other.select_set(other == obj)
+    bpy.context.view_layer.objects.active = obj
+    
+    # フォーマットに応じてエクスポート
+    if format_type.lower() == 'fbx':
+        bpy.ops.export_scene.fbx(
+            filepath=output_path,
+            use_selection=True,
+            embed_textures=True
+        )
+    elif format_type.lower() == 'obj':
+        if 'obj_export' in dir(bpy.ops.wm):
+            # Blender 3.2以降の新しいOBJエクスポーター（旧エクスポーターは4.0で削除）
+            bpy.ops.wm.obj_export(
                 filepath=output_path,
-                use_selection=True,
-                embed_textures=True
+                export_selected_objects=True
             )
-        elif format_type.lower() == 'obj':
+        else:
             bpy.ops.export_scene.obj(
                 filepath=output_path,
                 use_selection=True
             )
-        elif format_type.lower() == 'gltf':
-            bpy.ops.export_scene.gltf(
-                filepath=output_path,
-                use_selection=True,
-                export_format='GLB'
-            )
+    elif format_type.lower() == 'gltf':
+        bpy.ops.export_scene.gltf(
+            filepath=output_path,
+            use_selection=True,
+            export_format='GLB'
+        )
 
-def main():
-    """メイン処理"""
-    
-    # コマンドライン引数取得
-    if len(sys.argv) < 6:
-        print("Usage: blender --background --python script.py -- <image_path> <output_path> <settings_json>")
-        return
-    
-    # '--'以降の引数を取得
-    try:
-        separator_index = sys.argv.index('--')
-        args = sys.argv[separator_index + 1:]
-    except ValueError:
-        print("Arguments should be passed after '--'")
-        return
-    
-    image_path = args[0]
-    output_path = args[1]
-    settings_json = args[2]
+def lod_path(output_path, level):
+    """LODの出力パス（出力先フォルダ/LODレベル/ファイル名）"""
+    output_dir = os.path.dirname(output_path)
+    path = os.path.join(output_dir, level, os.path.basename(output_path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def export_model(obj, output_path, format_type, with_lod=False):
+    """モデルをエクスポート"""
     
-    # 設定読み込み
-    import json
-    settings = json.loads(settings_json)
+    if with_lod:
+        # LOD生成して各LODをエクスポート
+        with stage("lod"):
+            lods = generate_lod(obj, LOD_LEVELS)
+        with stage("export", path=output_path):
+            for level, lod_obj in zip(LOD_LEVELS.keys(), lods):
+                export_object(lod_obj, lod_path(output_path, level), format_type)
+    else:
+        # 通常のエクスポート
+        with stage("export", path=output_path):
+            export_object(obj, output_path, format_type)
+
+def convert(image_path, output_path, settings):
+    """1件の画像を変換してエクスポート（成功時True）"""
     
     print(f"Converting {image_path} to {output_path}")
     print(f"Settings: {settings}")
@@ -294,25 +864,194 @@ def main():
     clear_scene()
     
     # 2D画像から3Dモデル作成
-    obj = create_plane_with_image(image_path, settings)
+    with stage("load"):
+        obj = create_plane_with_image(image_path, settings)
     if not obj:
         print("Failed to create model")
-        return
+        return False
     
     # 品質に応じて処理を変更
-    if settings.get('quality') in ['medium', 'high']:
+    if settings.get('normal_map'):
+        # ノーマルマップで凹凸を表現（ローポリのまま）
+        with stage("normal_map"):
+            attach_normal_map(obj, settings['normal_map'])
+    elif settings.get('quality') in ['medium', 'high']:
         # ディスプレースメント適用
-        apply_displacement_from_image(obj, image_path, 
+        apply_displacement_from_image(obj, settings.get('displacement_texture', image_path),
                                     strength=settings.get('displacement_strength', 0.1))
     
     # メッシュ最適化
-    optimize_mesh(obj, settings.get('poly_count_limit', 5000))
+    with stage("decimate"):
+        optimize_mesh(obj, settings.get('poly_count_limit', 5000))
+    emit_poly_count(obj)
     
     # エクスポート
     export_model(obj, output_path, settings.get('export_format', 'fbx'),
-                generate_lod=settings.get('generate_lod', False))
+                with_lod=settings.get('generate_lod', False))
     
     print(f"Conversion completed: {output_path}")
+    return True
+
+def convert_all(image_path, output_dir, name, settings):
+    """1回のセッションで全品質・全LOD・全フォーマットを書き出す
+    
+    画像読み込み・プレーン作成・サブディビジョンは1度だけ行い、
+    品質ごとに独立した複製へディスプレースメントとデシメートを適用する。
+    戻り値は {品質: {フォーマット: 出力パス}}
+    """
+    
+    print(f"Converting {image_path} to {output_dir} (all qualities)")
+    print(f"Settings: {settings}")
+    
+    clear_scene()
+    
+    with stage("load"):
+        base = create_plane_with_image(image_path, settings)
+    if not base:
+        print("Failed to create model")
+        return {}
+    
+    qualities = settings.get('qualities', {})
+    formats = settings.get('formats', [settings.get('export_format', 'fbx')])
+    variants = {}
+    
+    # 低品質とノーマルマップを使う品質はディスプレースメントなしの平面から作る
+    for quality, quality_settings in qualities.items():
+        if quality == 'low' or quality_settings.get('normal_map'):
+            variants[quality] = duplicate_object(base, f"{name}_{quality}")
+            if quality_settings.get('normal_map'):
+                attach_normal_map(variants[quality], quality_settings['normal_map'])
+    
+    displaced = [quality for quality in qualities if quality not in variants]
+    if displaced:
+        # サブディビジョンとテクスチャ読み込みは全品質で共有
+        with stage("subdivide"):
+            subdivide_mesh(base)
+            texture = load_displacement_texture(settings.get('displacement_texture', image_path))
+        for quality in displaced:
+            with stage("displace", quality=quality):
+                obj = duplicate_object(base, f"{name}_{quality}")
+                add_displacement(obj, texture, qualities[quality].get('displacement_strength', 0.1))
+                apply_modifiers(obj)
+            variants[quality] = obj
+    
+    outputs = {}
+    for quality, obj in variants.items():
+        with stage("decimate", quality=quality):
+            optimize_mesh(obj, qualities[quality].get('poly_count_limit', 5000))
+        emit_poly_count(obj, quality=quality)
+    
+        # LODは品質ごとに1度だけ生成し、全フォーマットで使い回す
+        lods = []
+        if settings.get('generate_lod', False):
+            with stage("lod", quality=quality):
+                lods = generate_lod(obj, LOD_LEVELS, quality=quality)
+    
+        outputs[quality] = {}
+        for format_type in formats:
+            path = os.path.join(output_dir, quality,
+                                name + MODEL_EXTENSIONS.get(format_type.lower(), '.' + format_type))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with stage("export", quality=quality, path=path):
+                export_object(obj, path, format_type)
+                for level, lod_obj in zip(LOD_LEVELS.keys(), lods):
+                    export_object(lod_obj, lod_path(path, level), format_type)
+            outputs[quality][format_type] = path
+    
+    print(f"Conversion completed: {output_dir}")
+    return outputs
+
+# ワーカーモードで変換側へ返す応答行の接頭辞
+RESULT_PREFIX = "GAAAGS_RESULT "
+
+def respond(payload):
+    """変換側へJSON応答を1行で返す"""
+    print(RESULT_PREFIX + json.dumps(payload), flush=True)
+
+def handle_job(job):
+    """1件のジョブを実行して応答を返す"""
+    command = job.get("command", "convert")
+    reset_stats()
+    if command == "convert":
+        success = convert(job["image_path"], job["output_path"], job["settings"])
+        return {"status": "ok" if success else "error", "stats": STATS}
+    if command == "convert_all":
+        outputs = convert_all(job["image_path"], job["output_dir"], job["name"], job["settings"])
+        return {"status": "ok" if outputs else "error", "outputs": outputs, "stats": STATS}
+    return {"status": "error", "message": f"unknown command: {command}"}
+
+def serve():
+    """ワーカーモード: 標準入力からJSONジョブを1行ずつ受け取り、同じBlenderで変換し続ける"""
+    
+    respond({"status": "ready"})
+    
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            respond({"status": "error", "message": f"invalid job: {e}"})
+            continue
+        
+        command = job.get("command", "convert")
+        if command == "ping":
+            respond({"id": job.get("id"), "status": "ok"})
+            continue
+        if command == "shutdown":
+            respond({"id": job.get("id"), "status": "ok"})
+            break
+        
+        try:
+            respond(dict(handle_job(job), id=job.get("id")))
+        except Exception as e:
+            respond({"id": job.get("id"), "status": "error", "message": str(e)})
+        finally:
+            # 次のジョブに備えてシーンをリセット
+            clear_scene()
+
+def main():
+    """メイン処理"""
+    
+    # '--'以降の引数を取得
+    try:
+        separator_index = sys.argv.index('--')
+        args = sys.argv[separator_index + 1:]
+    except ValueError:
+        print("Arguments should be passed after '--'")
+        return
+    
+    # 常駐ワーカーモード
+    if args and args[0] == '--serve':
+        serve()
+        return
+    
+    # JSONジョブを1件だけ実行するモード
+    if len(args) >= 2 and args[0] == '--job':
+        try:
+            respond(handle_job(json.loads(args[1])))
+        except Exception as e:
+            respond({"status": "error", "message": str(e)})
+            sys.exit(1)
+        return
+    
+    # コマンドライン引数取得
+    if len(args) < 3:
+        print("Usage: blender --background --python script.py -- <image_path> <output_path> <settings_json>")
+        print("       blender --background --python script.py -- --job <job_json>")
+        print("       blender --background --python script.py -- --serve")
+        return
+    
+    image_path = args[0]
+    output_path = args[1]
+    settings_json = args[2]
+    
+    # 設定読み込み
+    settings = json.loads(settings_json)
+    
+    convert(image_path, output_path, settings)
 
 if __name__ == "__main__":
     main()
@@ -330,47 +1069,84 @@ if __name__ == "__main__":
             "details": details or {}
         })
     
-    def batch_convert(self, image_paths: list, output_dir: str, 
-                     settings: ConversionSettings = None) -> Dict[str, str]:
-        """複数の画像をバッチ処理で変換"""
-        if len(image_paths) > 10:
-            raise ValueError("最大10ファイルまで同時処理可能です")
+    def batch_convert(self, image_paths: Union[str, Path, Iterable], output_dir: str,
+                     settings: ConversionSettings = None, max_workers: int = None,
+                     job_timeout: float = 300, report: BatchReport = None) -> Dict[str, Optional[str]]:
+        """複数の画像をバッチ処理で変換
+        
+        image_paths にはパスのリストのほか、画像フォルダやマニフェストファイルも指定できる。
+        max_workers 件を並列に変換し、失敗したジョブは他のジョブを止めずに再投入する。
+        集計は report（省略時は新規作成）に記録し、batch_report.json に保存する。
+        """
+        if settings is None:
+            settings = ConversionSettings()
+        if max_workers is None:
+            max_workers = self.worker_pool.size if self.worker_pool else (os.cpu_count() or 1)
+        self.last_report = report = report or BatchReport()
         
         results = {}
         output_dir = Path(output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
+        quality_dir = output_dir / settings.quality
+        quality_dir.mkdir(parents=True, exist_ok=True)
         
-        # 品質別の出力ディレクトリを作成
-        quality_dirs = {
-            "low": output_dir / "low",
-            "medium": output_dir / "medium",
-            "high": output_dir / "high"
-        }
-        for dir_path in quality_dirs.values():
-            dir_path.mkdir(exist_ok=True)
+        def run_job(image_path: Path, attempt: int):
+            output_path = quality_dir / (image_path.stem + model_extension(settings.export_format))
+            started = time.time()
+            metrics = {}
+            try:
+                result = self.convert_to_3d(str(image_path), str(output_path), settings,
+                                            timeout=job_timeout, metrics=metrics)
+                error = None if result else "conversion_failed"
+            except Exception as e:
+                result, error = None, str(e)
+            return image_path, attempt, result, error, time.time() - started, metrics
         
-        for image_path in image_paths:
-            image_path = Path(image_path)
-            quality = settings.quality if settings else "medium"
-            output_path = quality_dirs[quality] / f"{image_path.stem}.{settings.export_format}"
-            
-            # 最大3回までリトライ
-            for attempt in range(self.max_retries):
-                try:
-                    result = self.convert_to_3d(str(image_path), str(output_path), settings)
+        batch_started = time.time()
+        hits_before = self.cache.hits if self.cache else 0
+        pending_images = iter(iter_image_paths(image_paths))
+        retry_queue = deque()
+        running = set()
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                # 空きワーカーにジョブを投入（リトライを優先、入力は必要な分だけ読み進める）
+                while len(running) < max_workers:
+                    if retry_queue:
+                        image_path, attempt = retry_queue.popleft()
+                    else:
+                        image_path = next(pending_images, None)
+                        if image_path is None:
+                            break
+                        attempt = 1
+                    running.add(executor.submit(run_job, image_path, attempt))
+                
+                if not running:
+                    break
+                
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    image_path, attempt, result, error, seconds, metrics = future.result()
+                    final = bool(result) or attempt >= self.max_retries
+                    report.record(settings.quality, str(image_path), bool(result), seconds, attempt, final)
+                    
                     if result:
+                        report.record_metrics(settings.quality, metrics)
                         results[str(image_path)] = result
-                        break
-                    else:
-                        self.log_error("conversion_failed", 
-                                     f"変換失敗 (試行 {attempt + 1}/{self.max_retries})",
-                                     {"image_path": str(image_path)})
-                except Exception as e:
-                    self.log_error("conversion_error",
-                                 str(e),
-                                 {"image_path": str(image_path), "attempt": attempt + 1})
-                    if attempt == self.max_retries - 1:
+                        continue
+                    
+                    self.log_error("conversion_failed" if error == "conversion_failed" else "conversion_error",
+                                 f"変換失敗 (試行 {attempt}/{self.max_retries})",
+                                 {"image_path": str(image_path), "attempt": attempt, "error": error})
+                    if final:
                         results[str(image_path)] = None
+                    else:
+                        retry_queue.append((image_path, attempt + 1))
+        
+        report.finish(settings.quality, time.time() - batch_started,
+                      cache_hits=self.cache.hits - hits_before if self.cache else 0)
+        report.save(output_dir / "batch_report.json")
+        if self.cache:
+            self.cache.flush()
         
         # エラーログを保存
         if self.error_log:
@@ -380,23 +1156,142 @@ if __name__ == "__main__":
         
         return results
     
-    def convert_to_3d(self, image_path: str, output_path: str, 
-                     settings: ConversionSettings = None) -> Optional[str]:
-        """2D画像を3Dモデルに変換"""
-        
-        if settings is None:
-            settings = ConversionSettings()
-        
-        start_time = time.time()
-        
-        # 設定をJSONで渡す
-        settings_json = json.dumps({
+    def settings_payload(self, settings: ConversionSettings) -> Dict:
+        """Blenderスクリプトへ渡す設定を作成"""
+        return {
             'quality': settings.quality,
             'poly_count_limit': settings.poly_limit,
             'texture_size': settings.texture_size,
             'generate_lod': settings.generate_lod,
-            'export_format': settings.export_format
-        })
+            'export_format': settings.export_format,
+            'displacement_strength': settings.displacement_strength
+        }
+    
+    def uses_fast_backend(self, quality: str, formats: Iterable[str], mesh_mode: str = "plane") -> bool:
+        """Blenderを起動せずに heightmap_mesh で変換できるか（silhouette は品質によらず heightmap_mesh）"""
+        if not all(fmt.lower() in heightmap_mesh.SUPPORTED_FORMATS for fmt in formats):
+            return False
+        return mesh_mode == "silhouette" or (self.fast_backend and quality in FAST_BACKEND_QUALITIES)
+    
+    def run_fast_backend(self, image_path: str, output_path: str, settings: ConversionSettings) -> Dict:
+        """heightmap_mesh で変換（Blenderスクリプトと同じく低品質はディスプレースメントなし）"""
+        return heightmap_mesh.convert_image(
+            image_path, output_path, settings.export_format,
+            poly_limit=settings.poly_limit,
+            displacement_strength=settings.displacement_strength if settings.quality != "low" else 0.0,
+            texture_size=settings.texture_size,
+            lod_levels=heightmap_mesh.LOD_LEVELS if settings.generate_lod else None,
+            mesh_mode=settings.mesh_mode,
+            thickness=settings.displacement_strength,
+            surface_detail=settings.surface_detail
+        )
+    
+    def cache_key(self, image_path: str, output_path: str, settings: ConversionSettings) -> str:
+        """画像の内容・出力ファイル名・設定・変換方法・スクリプトのバージョンからキャッシュキーを作成"""
+        normalized = dict(asdict(settings), export_format=settings.export_format.lower(),
+                          backend=self.uses_fast_backend(settings.quality, [settings.export_format],
+                                                         settings.mesh_mode))
+        return self.cache.key(image_path, Path(output_path).name, normalized, self.cache_version)
+    
+    def output_files(self, output_path: str, since: float, extra: Iterable[str] = ()) -> List[Path]:
+        """変換で書き出されたファイル（モデル・MTL・テクスチャ・サーフェスマップ・LOD）
+        
+        出力名が同じ古いファイルを含めないよう、since 以降に更新されたものだけを返す。
+        """
+        output_path = Path(output_path)
+        stem = glob.escape(output_path.stem)
+        patterns = [f"{stem}.*"] + [f"{stem}_{name}.png" for name in SURFACE_MAP_NAMES]
+        directories = [output_path.parent] + [output_path.parent / level for level in heightmap_mesh.LOD_LEVELS]
+        
+        candidates = {Path(path) for path in extra if path}
+        for directory in directories:
+            for pattern in patterns:
+                candidates.update(directory.glob(pattern))
+        # メタデータは変換の出力ではない（キャッシュには別に保存する）
+        # ファイルシステムの更新時刻の精度を考慮して1秒の余裕を持たせる
+        return sorted(path for path in candidates
+                      if path.is_file() and not path.name.endswith(".metadata.json")
+                      and path.stat().st_mtime >= since - 1)
+    
+    def prepare_texture(self, image_path: str, output_dir: str, name: str, settings: ConversionSettings,
+                        work_dir: str, formats: Iterable[str]) -> Dict[str, str]:
+        """テクスチャの縮小とディスプレースメント用画像の作成を行い、Blenderへ渡す設定を返す
+        
+        ディスプレースメント用画像は work_dir（変換後に削除する一時フォルダ）に保存する。カラーテクスチャは
+        OBJ を書き出すときだけ MTL から参照されるため output_dir に、それ以外（FBX・GLBは埋め込み）は work_dir に保存する。
+        他の変換と前処理が重なったときだけプロセスプールに送り、1件だけならこのプロセスで実行する。
+        """
+        color_dir = output_dir if any(fmt.lower() == "obj" for fmt in formats) else work_dir
+        args = (image_path, color_dir, settings.texture_size, name, work_dir)
+        with self._texture_pool_lock:
+            use_pool = self._texture_jobs > 0 and self.texture_workers > 1
+            self._texture_jobs += 1
+            if use_pool and self.texture_pool is None:
+                # バッチ変換のスレッドから fork しないよう spawn で起動する
+                self.texture_pool = ProcessPoolExecutor(
+                    max_workers=self.texture_workers, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            if use_pool:
+                prepared = self.texture_pool.submit(texture_prep.prepare_texture, *args).result()
+            else:
+                prepared = texture_prep.prepare_texture(*args)
+        finally:
+            with self._texture_pool_lock:
+                self._texture_jobs -= 1
+        return prepared.settings()
+    
+    def collect_metrics(self, stats: Dict, output_path: str, files: Iterable[Path],
+                        total_seconds: float) -> Dict:
+        """変換側の計測値（段階ごとの所要時間・メッシュ・テクスチャ）に出力ファイルのサイズを加える"""
+        output_dir = Path(output_path).parent
+        return {
+            "total_seconds": round(total_seconds, 3),
+            "stages": stats.get("stages", {}),
+            "meshes": stats.get("meshes", {}),
+            "texture": stats.get("texture"),
+            "output_bytes": {Path(path).relative_to(output_dir).as_posix(): Path(path).stat().st_size
+                             for path in files}
+        }
+    
+    def uses_normal_map(self, settings: ConversionSettings) -> bool:
+        """ディスプレースメントの代わりにノーマルマップを使うか（低品質は元々凹凸なし）"""
+        return settings.surface_detail == "normal_map" and settings.quality in ("medium", "high")
+    
+    def bake_normal_map(self, image_path: str, output_dir: str, settings: ConversionSettings) -> str:
+        """Blenderに渡すノーマルマップをベイクして保存"""
+        maps = bake_surface_maps(image_path, settings.texture_size, settings.displacement_strength,
+                                 occlusion=False)
+        return maps.save(Path(output_dir), f"{Path(image_path).stem}_{settings.quality}")["normal"]
+    
+    def event_handler(self, image_path: str) -> Optional[Callable[[Dict], None]]:
+        """進捗イベントに画像パスを付けて on_event へ渡すハンドラ"""
+        if not self.on_event:
+            return None
+        return lambda event: self.on_event(dict(event, image_path=image_path))
+    
+    def run_blender(self, image_path: str, output_path: str, settings_dict: Dict,
+                    timeout: float = 300) -> Optional[Dict]:
+        """Blenderで変換を実行（常駐ワーカーがあればそちらを使う）し、成功時は計測値を含む応答を返す"""
+        response = self.run_blender_job({
+            "command": "convert",
+            "image_path": image_path,
+            "output_path": output_path,
+            "settings": settings_dict
+        }, timeout, self.event_handler(image_path))
+        if response.get("status") != "ok":
+            print(f"✗ 3D conversion failed: {response.get('message', response)}")
+            return None
+        return response
+    
+    def run_blender_job(self, job: Dict, timeout: float = 300,
+                        on_event: Callable[[Dict], None] = None) -> Dict:
+        """BlenderスクリプトにJSONジョブを渡して応答を受け取る
+        
+        出力は1行ずつ読み、進捗イベントは on_event へ渡す（全出力はメモリに溜めない）。
+        """
+        
+        if self.worker_pool:
+            return self.worker_pool.run(job, timeout, on_event)
         
         # Blenderコマンド構築
         cmd = [
@@ -404,72 +1299,303 @@ if __name__ == "__main__":
             '--background',
             '--python', str(self.mcp_script_path),
             '--',
-            image_path,
-            output_path,
-            settings_json
+            '--job',
+            json.dumps(job)
         ]
         
+        # エンコーディングを明示的に指定
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',  # エンコーディングエラーを置換文字で処理
+            bufsize=1
+        )
+        lines = queue.Queue()
+        log = deque(maxlen=BLENDER_LOG_LINES)
+        threading.Thread(target=pump_lines, args=(process.stdout, lines), daemon=True).start()
+        
         try:
-            print(f"Starting 3D conversion: {image_path}")
-            # エンコーディングを明示的に指定
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace',  # エンコーディングエラーを置換文字で処理
-                timeout=300
-            )
+            response = read_blender_output(lines, log, timeout, self.stall_timeout, on_event)
+        except TimeoutError:
+            # 固まったBlenderは固定のタイムアウトを待たずに強制終了
+            process.kill()
+            process.wait()
+            raise
+        
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        
+        if response is None or response.get("status") != "ok":
+            # 失敗時だけ直近の出力を表示（デバッグ用）
+            print("Blender output (tail):\n" + "\n".join(list(log)[-40:]))
+        if response is None:
+            return {"status": "error", "message": f"exit code {process.returncode}: " + "\n".join(list(log)[-5:])}
+        return response
+    
+    def convert_all_qualities(self, image_path: str, output_dir: str,
+                              qualities: List[str] = ("low", "medium", "high"),
+                              settings: ConversionSettings = None, formats: List[str] = None,
+                              timeout: float = 600) -> Dict[str, Dict[str, str]]:
+        """1回のBlenderセッションで全品質・全LOD・全フォーマットを書き出す
+        
+        戻り値は {品質: {フォーマット: 出力パス}}（失敗時は空）。
+        出力は output_dir/<品質>/<画像名>.<拡張子> に保存し、その隣に <画像名>.metadata.json を作成する。
+        """
+        if settings is None:
+            settings = ConversionSettings()
+        formats = list(formats or [settings.export_format])
+        validate_mesh_mode(settings.mesh_mode, formats)
+        per_quality = {quality: replace(settings, quality=quality) for quality in qualities}
+        name = Path(image_path).stem
+        
+        # 高速変換できる品質はBlenderに送らない
+        blender_qualities = [quality for quality in qualities
+                             if not self.uses_fast_backend(quality, formats, settings.mesh_mode)]
+        
+        job = {
+            "command": "convert_all",
+            "image_path": image_path,
+            "output_dir": str(output_dir),
+            "name": name,
+            "settings": {
+                "texture_size": settings.texture_size,
+                "generate_lod": settings.generate_lod,
+                "formats": formats,
+                "qualities": {
+                    quality: {
+                        "poly_count_limit": per_quality[quality].poly_limit,
+                        "displacement_strength": per_quality[quality].displacement_strength
+                    }
+                    for quality in blender_qualities
+                }
+            }
+        }
+        
+        raw_outputs, quality_stats = {}, {}
+        started = time.time()
+        work_dir = tempfile.mkdtemp(prefix="gaaags_texture_")
+        try:
+            if blender_qualities:
+                # 縮小済みテクスチャとディスプレースメント用画像は全品質で共有
+                job["settings"].update(self.prepare_texture(image_path, str(output_dir), name, settings,
+                                                            work_dir, formats))
+            for quality in blender_qualities:
+                if self.uses_normal_map(per_quality[quality]):
+                    job["settings"]["qualities"][quality]["normal_map"] = self.bake_normal_map(
+                        image_path, os.path.join(str(output_dir), quality), per_quality[quality])
             
-            # 出力を表示（デバッグ用）
-            print("Blender stdout:", result.stdout)
-            if result.stderr:
-                print("Blender stderr:", result.stderr)
+            print(f"Starting 3D conversion (all qualities): {image_path}")
+            for quality in qualities:
+                if quality in blender_qualities:
+                    continue
+                raw_outputs[quality] = {}
+                stats = quality_stats[quality] = {"stages": {}}
+                for fmt in formats:
+                    path = os.path.join(str(output_dir), quality, name + model_extension(fmt))
+                    result = self.run_fast_backend(image_path, path, replace(per_quality[quality], export_format=fmt))
+                    raw_outputs[quality][fmt] = path
+                    # メッシュは全フォーマットで同じ、所要時間はフォーマット分を合計する
+                    stats.update(meshes=result["meshes"], texture=result["texture"])
+                    for stage, seconds in result["stages"].items():
+                        stats["stages"][stage] = round(stats["stages"].get(stage, 0.0) + seconds, 4)
+        
+            if blender_qualities:
+                response = self.run_blender_job(job, timeout, self.event_handler(image_path))
+                if response.get("status") != "ok":
+                    print(f"✗ 3D conversion failed: {response.get('message', response)}")
+                    return {}
+                raw_outputs.update(response.get("outputs", {}))
+                stats = response.get("stats") or {}
+                for quality in blender_qualities:
+                    # 読み込みとサブディビジョンは全品質で共有した処理として別に記録する
+                    quality_stats[quality] = dict(stats.get("qualities", {}).get(quality, {}),
+                                                  texture=stats.get("texture"),
+                                                  shared_stages=stats.get("stages", {}))
+        except (subprocess.TimeoutExpired, TimeoutError) as e:
+            print(f"✗ 3D conversion timed out: {e}")
+            return {}
+        except Exception as e:
+            print(f"✗ 3D conversion error: {e}")
+            return {}
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        outputs = {}
+        for quality, paths in raw_outputs.items():
+            valid = {fmt: path for fmt, path in paths.items()
+                     if os.path.exists(path) and os.path.getsize(path) > 0}
+            if not valid:
+                print(f"✗ 出力ファイルが生成されていません: {quality}")
+                continue
             
-            if result.returncode == 0:
-                # 出力ファイルの検証
-                if not os.path.exists(output_path):
-                    print(f"✗ 出力ファイルが生成されていません: {output_path}")
-                    return None
-                
-                file_size = os.path.getsize(output_path)
-                if file_size == 0:
-                    print(f"✗ 出力ファイルサイズが0バイトです: {output_path}")
-                    return None
-                
-                # メタデータ生成
-                metadata = ConversionMetadata(
-                    model_info={
-                        "name": Path(output_path).stem,
-                        "polygon_count": settings.poly_limit,
+            quality_settings = per_quality[quality]
+            stats = quality_stats.get(quality, {})
+            first_output = next(iter(valid.values()))
+            files = [Path(path) for fmt_path in valid.values()
+                     for path in self.output_files(fmt_path, started)]
+            quality_metrics = self.collect_metrics(stats, first_output, sorted(set(files)),
+                                                   time.time() - started)
+            if stats.get("shared_stages"):
+                quality_metrics["shared_stages"] = stats["shared_stages"]
+            base_mesh = quality_metrics["meshes"].get("base", {})
+            ConversionMetadata(
+                model_info={
+                    "name": Path(image_path).stem,
+                    "polygon_count": base_mesh.get("faces"),
+                    "vertex_count": base_mesh.get("vertices"),
+                    "polygon_limit": quality_settings.poly_limit,
+                    "texture_size": settings.texture_size,
+                    "quality_level": quality,
+                    "export_format": list(valid)
+                },
+                conversion_info={
+                    "conversion_time": datetime.now().isoformat(),
+                    "original_image": image_path,
+                    "outputs": valid,
+                    "metrics": quality_metrics,
+                    "settings_used": {
+                        "quality": quality,
+                        "poly_count_limit": quality_settings.poly_limit,
                         "texture_size": settings.texture_size,
-                        "quality_level": settings.quality,
-                        "export_format": settings.export_format
-                    },
-                    conversion_info={
-                        "conversion_time": datetime.now().isoformat(),
-                        "original_image": image_path,
-                        "settings_used": {
-                            "quality": settings.quality,
-                            "poly_count_limit": settings.poly_limit,
-                            "texture_size": settings.texture_size,
-                            "generate_lod": settings.generate_lod,
-                            "export_format": settings.export_format
-                        }
+                        "generate_lod": settings.generate_lod,
+                        "export_format": formats
                     }
-                )
-                
-                # メタデータ保存
-                metadata.save(output_path)
-                
-                print(f"✓ 3D conversion successful: {output_path}")
-                return output_path
+                }
+            ).save(first_output)
+            outputs[quality] = valid
+        
+        print(f"✓ 3D conversion successful: {', '.join(outputs)}")
+        return outputs
+    
+    def convert_to_3d(self, image_path: str, output_path: str, 
+                     settings: ConversionSettings = None, timeout: float = 300,
+                     metrics: Dict = None) -> Optional[str]:
+        """2D画像を3Dモデルに変換
+        
+        metrics に辞書を渡すと、成功時に処理段階ごとの所要時間・メッシュの頂点数と面数・
+        テクスチャの大きさ・出力ファイルのサイズ（メタデータの metrics と同じもの）を書き込む。
+        出力パスの拡張子はエクスポート形式に合わせる（gltf は .glb）。戻り値は実際に書き出したパス。
+        """
+        
+        if settings is None:
+            settings = ConversionSettings()
+        output_path = str(Path(output_path).with_suffix(model_extension(settings.export_format)))
+        
+        start_time = time.time()
+        
+        # 設定をJSONで渡す
+        settings_dict = self.settings_payload(settings)
+        
+        try:
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache_key(image_path, output_path, settings)
+                cached = self.cache.restore(cache_key, Path(output_path).parent)
+                if cached:
+                    metadata = ConversionMetadata(**cached)
+                    metadata.conversion_info.update(original_image=image_path, cache_hit=True)
+                    metadata.save(output_path)
+                    if metrics is not None:
+                        # 所要時間は復元にかかった時間だけを記録する
+                        metrics.update(metadata.conversion_info.get("metrics") or {})
+                        metrics.update(stages={"cache_restore": round(time.time() - start_time, 4)},
+                                       total_seconds=round(time.time() - start_time, 3))
+                    print(f"✓ キャッシュから復元: {output_path}")
+                    return output_path
+            
+            print(f"Starting 3D conversion: {image_path}")
+            lod_stats = None
+            if self.uses_fast_backend(settings.quality, [settings.export_format], settings.mesh_mode):
+                backend = "heightmap_mesh"
+                stats = self.run_fast_backend(image_path, output_path, settings)
+                lod_stats = stats["lod_stats"]
             else:
-                print(f"✗ 3D conversion failed: {result.stderr}")
+                backend = "blender"
+                prepare_started = time.time()
+                with tempfile.TemporaryDirectory(prefix="gaaags_texture_") as work_dir:
+                    settings_dict.update(self.prepare_texture(
+                        image_path, str(Path(output_path).parent), Path(output_path).stem, settings,
+                        work_dir, [settings.export_format]))
+                    if self.uses_normal_map(settings):
+                        settings_dict['normal_map'] = self.bake_normal_map(
+                            image_path, str(Path(output_path).parent), settings)
+                    prepare_seconds = time.time() - prepare_started
+                    response = self.run_blender(image_path, output_path, settings_dict, timeout)
+                if not response:
+                    return None
+                stats = response.get("stats") or {}
+                stats["stages"] = dict(prepare=round(prepare_seconds, 4), **stats.get("stages", {}))
+            
+            # 出力ファイルの検証
+            if not os.path.exists(output_path):
+                print(f"✗ 出力ファイルが生成されていません: {output_path}")
+                return None
+            
+            file_size = os.path.getsize(output_path)
+            if file_size == 0:
+                print(f"✗ 出力ファイルサイズが0バイトです: {output_path}")
                 return None
+            
+            # 出力ファイルと計測値
+            # 一時フォルダに置いた中間ファイルは出力に含めない
+            extra = [path for path in (settings_dict.get('normal_map'), settings_dict.get('color_texture'))
+                     if path and Path(path).parent == Path(output_path).parent]
+            files = self.output_files(output_path, start_time, extra)
+            conversion_metrics = self.collect_metrics(stats, output_path, files, time.time() - start_time)
+            base_mesh = conversion_metrics["meshes"].get("base", {})
+            
+            # メタデータ生成
+            metadata = ConversionMetadata(
+                model_info={
+                    "name": Path(output_path).stem,
+                    "polygon_count": base_mesh.get("faces"),
+                    "vertex_count": base_mesh.get("vertices"),
+                    "polygon_limit": settings.poly_limit,
+                    "texture_size": settings.texture_size,
+                    "quality_level": settings.quality,
+                    "export_format": settings.export_format
+                },
+                conversion_info={
+                    "conversion_time": datetime.now().isoformat(),
+                    "original_image": image_path,
+                    "backend": backend,
+                    "lods": lod_stats,
+                    "metrics": conversion_metrics,
+                    "settings_used": {
+                        "quality": settings.quality,
+                        "poly_count_limit": settings.poly_limit,
+                        "texture_size": settings.texture_size,
+                        "generate_lod": settings.generate_lod,
+                        "export_format": settings.export_format,
+                        "mesh_mode": settings.mesh_mode,
+                        "surface_detail": settings.surface_detail
+                    }
+                }
+            )
+            
+            # メタデータ保存
+            metadata.save(output_path)
+            
+            if cache_key:
+                try:
+                    self.cache.store(cache_key, Path(output_path).parent, files, asdict(metadata))
+                except OSError as e:
+                    print(f"⚠ キャッシュへの保存に失敗: {e}")
+            
+            if metrics is not None:
+                metrics.update(conversion_metrics)
+            
+            print(f"✓ 3D conversion successful: {output_path}")
+            return output_path
                 
-        except subprocess.TimeoutExpired:
-            print("✗ 3D conversion timed out")
+        except (subprocess.TimeoutExpired, TimeoutError) as e:
+            print(f"✗ 3D conversion timed out: {e}")
             return None
         except Exception as e:
             print(f"✗ 3D conversion error: {e}")
@@ -479,7 +1605,8 @@ class ConversionTester:
     """3D変換テスト"""
     
     def __init__(self):
-        self.converter = BlenderMCPConverter()
+        # 品質別テストで同じBlenderを使い回す
+        self.converter = BlenderMCPConverter(worker_pool_size=1)
         self.test_dir = Path("3d_test_output")
         self.test_dir.mkdir(exist_ok=True)
     
@@ -500,11 +1627,17 @@ class ConversionTester:
         
         results = []
         
+        # 全品質を1回のBlenderセッションで変換
+        print("テスト実行中: 全品質一括変換")
+        outputs = self.converter.convert_all_qualities(
+            str(test_image), str(self.test_dir),
+            qualities=[settings.quality for _, settings in quality_tests]
+        )
+        
         for test_name, settings in quality_tests:
-            print(f"テスト実行中: {test_name}")
+            print(f"テスト結果: {test_name}")
             
-            output_file = self.test_dir / f"test_{settings.quality}.{settings.export_format}"
-            result = self.converter.convert_to_3d(str(test_image), str(output_file), settings)
+            result = outputs.get(settings.quality, {}).get(settings.export_format)
             
             if result:
                 file_size = os.path.getsize(result) if os.path.exists(result) else 0
@@ -583,12 +1716,69 @@ class ConversionTester:
         success_count = sum(1 for r in results if r['success'])
         print(f"\n成功率: {success_count}/{len(results)} ({success_count/len(results)*100:.1f}%)")
 
+def run_batch(args):
+    """コマンドラインからのバッチ変換"""
+    report = BatchReport()
+    cache_dir = None if args.no_cache else args.cache_dir
+    with BlenderMCPConverter(args.blender, worker_pool_size=args.workers, cache_dir=cache_dir,
+                             cache_max_bytes=int(args.cache_max_gb * 1024 ** 3)) as converter:
+        for quality in args.quality:
+            settings = ConversionSettings(quality=quality, export_format=args.format,
+                                          mesh_mode=args.mesh_mode,
+                                          surface_detail=args.surface_detail)
+            results = converter.batch_convert(args.batch, args.output, settings,
+                                              max_workers=args.workers,
+                                              job_timeout=args.timeout, report=report)
+            succeeded = sum(1 for r in results.values() if r)
+            print(f"[{quality}] {succeeded}/{len(results)} 件成功"
+                  f"（キャッシュから復元 {report.per_quality[quality]['cache_hits']} 件）")
+    
+    summary = report.to_dict()
+    print(f"合計: {summary['succeeded']}件成功 / {summary['failed']}件失敗, "
+          f"{summary['images_per_minute']} 件/分")
+    for quality, stats in summary["per_quality"].items():
+        stage = stats["bottleneck_stage"]
+        if stage:
+            print(f"[{quality}] 最も時間のかかる段階: {stage}（平均 {stats['avg_stage_seconds'][stage]}秒）")
+    return summary
+
 # 使用例とテスト実行
 def main():
     """メインのテスト実行"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Blender-MCP 3D変換")
+    parser.add_argument("--batch", help="画像フォルダまたはマニフェスト（指定時はバッチ変換）")
+    parser.add_argument("--output", default="3d_output", help="出力ディレクトリ")
+    parser.add_argument("--quality", nargs="+", default=["medium"],
+                        choices=["low", "medium", "high"], help="品質レベル（複数指定可）")
+    parser.add_argument("--format", default="fbx", choices=["fbx", "obj", "gltf"], help="出力フォーマット")
+    parser.add_argument("--mesh-mode", default="plane", choices=["plane", "silhouette"],
+                        help="メッシュの作り方（silhouette は被写体の輪郭を押し出す。gltf / obj のみ）")
+    parser.add_argument("--surface-detail", default="displacement", choices=["displacement", "normal_map"],
+                        help="中・高品質の凹凸の表現（normal_map はローポリのままノーマルマップを付ける）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="並列ワーカー数")
+    parser.add_argument("--timeout", type=float, default=300, help="1件あたりのタイムアウト（秒）")
+    parser.add_argument("--blender", default=None, help="Blenderの実行ファイル")
+    parser.add_argument("--cache-dir", default=".conversion_cache", help="変換結果キャッシュの保存先")
+    parser.add_argument("--cache-max-gb", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3,
+                        help="変換結果キャッシュの上限（GB、超えたら古いものから削除）")
+    parser.add_argument("--no-cache", action="store_true", help="変換結果キャッシュを使わない")
+    args = parser.parse_args()
+    try:
+        validate_mesh_mode(args.mesh_mode, [args.format])
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.batch:
+        run_batch(args)
+        return
     
     tester = ConversionTester()
-    results = tester.run_tests()
+    try:
+        results = tester.run_tests()
+    finally:
+        tester.converter.close()
     
     # 成功した場合は次のステップを提案
     if any(r['success'] for r in results):
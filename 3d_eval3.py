@@ -1,10 +1,15 @@
 # image2model.py
-import asyncio, base64, json, os, anthropic
+import asyncio, contextlib, json, os, anthropic
 from mcp import ClientSession
 from mcp.client.stdio import stdio_client, StdioServerParameters
 import time
 import logging
+from datetime import datetime
+from pathlib import Path
 from anthropic._exceptions import OverloadedError
+from agent_trace import ToolTrace, load_trace, replay_trace, trace_params
+from image_payload import ImagePayload, ImagePayloadCache
+from tool_cache import NON_MUTATING_TOOLS, CachingSession
 
 # ログの設定
 logging.basicConfig(
@@ -14,13 +19,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-ANTHROPIC_API_KEY = os.environ["ANTHROPIC_API_KEY"]
+# 未設定でも読み込めるようにする（負荷試験・テストではClaudeを使わない）
+ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 MODEL = "claude-sonnet-4-20250514"        # Vision & tool-use 両対応
 
-async def load_image_base64(path: str) -> str:
+# エンコード済み画像のキャッシュ（同じ画像の再送・バッチの再実行でエンコードし直さない）
+PAYLOAD_CACHE_DIR = ".image_payload_cache"
+payload_cache = ImagePayloadCache(PAYLOAD_CACHE_DIR)
+
+async def load_image_payload(path: str) -> ImagePayload:
+    """画像を縮小・再エンコードしてbase64にする（イベントループを止めないよう別スレッドで実行）"""
     logger.info(f"画像を読み込み中: {path}")
-    with open(path, "rb") as f:
-        return base64.b64encode(f.read()).decode()
+    payload = await asyncio.to_thread(payload_cache.get, path)
+    saving = payload.saved_bytes / payload.original_bytes * 100 if payload.original_bytes else 0.0
+    logger.info(
+        f"画像: {payload.original_bytes / 1024:.0f}KB → {payload.encoded_bytes / 1024:.0f}KB "
+        f"({saving:.0f}%削減, {payload.media_type}, {payload.width}x{payload.height}, "
+        f"{'キャッシュ' if payload.cached else 'エンコード'} {payload.seconds}秒)"
+    )
+    return payload
 
 async def retry_on_overload(func, max_retries=3, delay=2):
     last_error = None
@@ -39,182 +56,582 @@ async def retry_on_overload(func, max_retries=3, delay=2):
             logger.error(f"予期せぬエラーが発生しました: {str(e)}")
             raise
 
-async def main(img_path: str, user_prompt: str):
-    r = None
-    w = None
+# シーンを変更しない読み取り専用ツール（同じターン内で並列に実行してよい）
+READ_ONLY_TOOLS = NON_MUTATING_TOOLS
+
+def mcp_is_error(result) -> bool:
+    """ツール実行結果がエラーかどうか（mcp 2.x では isError が is_error に改名された）"""
+    return bool(getattr(result, "isError", None) or getattr(result, "is_error", False))
+
+def tool_result_content(result) -> list:
+    """MCPのツール実行結果をtool_resultのcontentブロックに変換"""
+    blocks = []
+    for item in getattr(result, "content", None) or []:
+        if item.type == "text":
+            blocks.append({"type": "text", "text": item.text})
+        elif item.type == "image":
+            blocks.append({
+                "type": "image",
+                "source": {"type": "base64", "media_type": getattr(item, "mimeType", None) or item.mime_type,
+                           "data": item.data}
+            })
+        else:
+            blocks.append({"type": "text", "text": json.dumps(item.model_dump(mode="json"), ensure_ascii=False)})
+    return blocks or [{"type": "text", "text": str(result)}]
+
+async def run_tool(session, block, trace: ToolTrace = None, iteration: int = 0) -> dict:
+    """1件のtool_useを実行してtool_resultブロックを返す（失敗もis_errorとしてClaudeへ返す）"""
+    logger.info(f"ツール呼び出し: {block.name}")
+    started = time.perf_counter()
+    try:
+        result = await session.call_tool(block.name, block.input)
+        logger.info(f"ツール実行完了: {block.name}")
+        tool_result = {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": tool_result_content(result),
+            "is_error": mcp_is_error(result)
+        }
+    except Exception as e:
+        logger.error(f"ツール実行中にエラーが発生しました: {block.name}: {str(e)}")
+        tool_result = {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": f"ツール実行エラー: {str(e)}",
+            "is_error": True
+        }
+    if trace is not None:
+        trace.record(block.name, block.input, tool_result, time.perf_counter() - started, iteration)
+    return tool_result
+
+def plan_tool_groups(blocks: list) -> list:
+    """tool_useを実行グループに分ける
+
+    連続する読み取り専用ツールは1グループにまとめて並列実行し、
+    シーンを変更するツールは単独のグループにして応答の順番どおりに実行する。
+    """
+    groups = []
+    for block in blocks:
+        if block.name in READ_ONLY_TOOLS and groups and all(b.name in READ_ONLY_TOOLS for b in groups[-1]):
+            groups[-1].append(block)
+        else:
+            groups.append([block])
+    return groups
+
+async def activate_collection(session, name: str):
+    """新しいオブジェクトが入るアクティブなコレクションを切り替える（無ければ作成、失敗したら RuntimeError）"""
+    code = (
+        "import bpy\n"
+        f"name = {name!r}\n"
+        "collection = bpy.data.collections.get(name) or bpy.data.collections.new(name)\n"
+        "if name not in bpy.context.scene.collection.children:\n"
+        "    bpy.context.scene.collection.children.link(collection)\n"
+        "bpy.context.view_layer.active_layer_collection = "
+        "bpy.context.view_layer.layer_collection.children[name]\n"
+    )
+    result = await session.call_tool("execute_blender_code", {"code": code})
+    text = "".join(getattr(item, "text", "") for item in result.content or [])
+    if mcp_is_error(result) or text.startswith("Error"):
+        raise RuntimeError(f"コレクションを切り替えられませんでした: {name}: {text[:300]}")
+
+async def run_tool_calls(session, blocks: list, scene_lock: asyncio.Lock = None,
+                         collection: str = None, trace: ToolTrace = None, iteration: int = 0) -> list:
+    """1ターン分のtool_useをすべて実行し、tool_resultを応答の順番で返す
+
+    scene_lock を渡すと、同じBlenderを共有する他の会話とシーンを変更するツールが重ならないようにする。
+    collection を渡すと、シーンを変更するツールの前にそのコレクションをアクティブにする。
+    trace を渡すと、実行したツール呼び出しを記録する。
+    """
+    results = []
+    for group in plan_tool_groups(blocks):
+        if len(group) > 1:
+            logger.info(f"読み取り専用ツールを並列実行: {', '.join(b.name for b in group)}")
+        if group[0].name in READ_ONLY_TOOLS or (scene_lock is None and collection is None):
+            results.extend(await asyncio.gather(*(run_tool(session, block, trace, iteration) for block in group)))
+            continue
+        async with scene_lock or contextlib.nullcontext():
+            if collection:
+                try:
+                    await activate_collection(session, collection)
+                except Exception as e:
+                    # 別の会話のコレクションに入らないよう、ツールは実行せずエラーとして返す
+                    logger.error(str(e))
+                    results.append({"type": "tool_result", "tool_use_id": group[0].id,
+                                    "content": f"ツール実行エラー: {str(e)}", "is_error": True})
+                    continue
+            results.append(await run_tool(session, group[0], trace, iteration))
+    return results
+
+# プロンプトキャッシュのブレークポイント
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# 履歴中のツール結果の合計文字数の上限（超えたら古い結果を要約に置き換える）
+HISTORY_BUDGET_CHARS = 60000
+# 要約せずにそのまま残す直近のツール結果のターン数
+KEEP_RECENT_TOOL_TURNS = 2
+# 要約に残す先頭の文字数
+SUMMARY_CHARS = 300
+
+def tool_result_chars(block: dict) -> int:
+    """tool_resultブロックの大きさ（文字数、画像はbase64の長さ）"""
+    content = block.get("content")
+    if isinstance(content, str):
+        return len(content)
+    size = 0
+    for item in content or []:
+        if item["type"] == "text":
+            size += len(item["text"])
+        elif item["type"] == "image":
+            size += len(item["source"]["data"])
+    return size
+
+def summarize_tool_result(block: dict) -> dict:
+    """tool_resultを先頭部分だけの要約に置き換えたブロックを返す"""
+    content = block.get("content")
+    if isinstance(content, str):
+        text = content
+    else:
+        text = "\n".join(item["text"] if item["type"] == "text" else "[画像]" for item in content or [])
+    if len(text) > SUMMARY_CHARS:
+        text = f"{text[:SUMMARY_CHARS]}…（省略: 元の結果は{len(text)}文字）"
+    summary = {"type": "tool_result", "tool_use_id": block["tool_use_id"], "content": text}
+    if block.get("is_error"):
+        summary["is_error"] = True
+    return summary
+
+def tool_result_turns(messages: list) -> list:
+    """ツール結果を持つユーザーメッセージの番号（初回の画像ターンは除く）"""
+    return [
+        i for i, message in enumerate(messages)
+        if i > 0 and message["role"] == "user" and isinstance(message["content"], list)
+        and any(isinstance(b, dict) and b.get("type") == "tool_result" for b in message["content"])
+    ]
+
+def compact_history(messages: list, budget_chars: int = HISTORY_BUDGET_CHARS,
+                    keep_recent: int = KEEP_RECENT_TOOL_TURNS) -> int:
+    """ツール結果の合計が上限を超えたら、直近以外の結果をまとめて要約に置き換える
+
+    キャッシュ済みの先頭部分が変わるのは要約した回だけになるよう、
+    上限を超えたときに古い結果を一度に要約する。要約したブロック数を返す。
+    """
+    turns = tool_result_turns(messages)
+    total = sum(tool_result_chars(b) for i in turns for b in messages[i]["content"])
+    if total <= budget_chars:
+        return 0
+
+    compacted = 0
+    for i in turns[:-keep_recent] if keep_recent else turns:
+        content = []
+        for block in messages[i]["content"]:
+            if block.get("type") == "tool_result" and tool_result_chars(block) > SUMMARY_CHARS:
+                block = summarize_tool_result(block)
+                compacted += 1
+            content.append(block)
+        messages[i] = {"role": "user", "content": content}
+    return compacted
+
+def mark_cache_breakpoint(messages: list):
+    """最新のツール結果にキャッシュのブレークポイントを移す
+
+    ツール定義・初回の画像ターンと合わせてブレークポイントは最大3つ（上限は4つ）。
+    """
+    turns = tool_result_turns(messages)
+    for i in turns:
+        for block in messages[i]["content"]:
+            block.pop("cache_control", None)
+    if turns:
+        messages[turns[-1]]["content"][-1]["cache_control"] = CACHE_CONTROL
+
+# 1つの会話の最大ループ回数
+MAX_ITERATIONS = 50
+
+async def fetch_tools_schema(session) -> list:
+    """Blenderのツール一覧をClaude用schemaへ変換"""
+    logger.info("Blenderツール一覧を取得中...")
+    raw_tools = await session.list_tools()
+    tools_schema = [
+        {
+            "name": t.name,
+            "description": t.description,
+            "input_schema": getattr(t, "inputSchema", None) or t.input_schema,
+        }
+        for t in raw_tools.tools
+    ]
+    # ツール定義は毎回同じなので末尾にキャッシュのブレークポイントを置く
+    if tools_schema:
+        tools_schema[-1]["cache_control"] = CACHE_CONTROL
+    logger.info(f"利用可能なBlenderツール数: {len(tools_schema)}")
+    return tools_schema
+
+def initial_message(payload: ImagePayload, img_path: str, user_prompt: str, collection: str = None) -> dict:
+    """初回のユーザーメッセージ（画像＋プロンプト＋画像パス明示）"""
+    text = f"{user_prompt}。\n元画像はローカルで `{img_path}` に保存されています。"
+    if collection:
+        text += (f"\n同じBlenderで他の画像も同時に作業しています。作成するオブジェクトは"
+                 f"コレクション `{collection}` に入れ、他のコレクションのオブジェクトは変更・削除しないでください。")
+    return {
+        "role": "user",
+        "content": [
+            {   # 画像ブロック
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": payload.media_type,
+                    "data": payload.data
+                }
+            },
+            {   # テキストブロック
+                "type": "text",
+                "text": text,
+                "cache_control": CACHE_CONTROL  # 画像を含む初回ターンまでをキャッシュ
+            }
+        ]
+    }
+
+async def run_agent(client, session, tools_schema: list, img_path: str, user_prompt: str,
+                    max_iterations: int = MAX_ITERATIONS, scene_lock: asyncio.Lock = None,
+                    collection: str = None, trace: ToolTrace = None) -> dict:
+    """1枚の画像についてClaude⇄Blenderの会話を最後まで実行し、最終回答とループ回数を返す
+
+    trace を渡すと、会話中のツール呼び出しを再実行用に記録する。
+    """
+    payload = await load_image_payload(img_path)
+
+    # メッセージ履歴（初回のユーザーメッセージから保持する）
+    messages = [initial_message(payload, img_path, user_prompt, collection)]
+
+    async def create_message():
+        logger.info("Claudeにメッセージを送信中...")
+        response = await client.messages.create(
+            model=MODEL,
+            max_tokens=1024,
+            tools=tools_schema,
+            messages=messages
+        )
+        usage = response.usage
+        logger.info(
+            f"トークン: 入力 {usage.input_tokens}, "
+            f"キャッシュ読込 {usage.cache_read_input_tokens or 0}, "
+            f"キャッシュ作成 {usage.cache_creation_input_tokens or 0}"
+        )
+        return response
+
+    started = time.perf_counter()
+    msg = await retry_on_overload(create_message)
+    first_response_seconds = round(time.perf_counter() - started, 3)
+    logger.info(f"Claudeからの応答を受信しました（初回応答まで {first_response_seconds}秒, "
+                f"画像 {len(payload.data) / 1024:.0f}KB）")
+
+    # Claude⇄Blender ループ（1回につきLLMの往復は1回）
+    iteration = 1
+    final_text = []  # 最終的なテキスト応答を保持
+
+    while msg.stop_reason == "tool_use" and iteration <= max_iterations:
+        logger.info(f"ツール実行ループ {iteration}回目")
+
+        # 応答の形式を確認
+        if not msg.content:
+            logger.error("応答が空です")
+            break
+
+        for block in msg.content:
+            if block.type == "text":
+                logger.info(f"Claudeの応答: {block.text}")
+                final_text.append(block.text)
+
+        # 応答に含まれる全てのtool_useを実行し、結果を1つのユーザーメッセージで返す
+        tool_uses = [block for block in msg.content if block.type == "tool_use"]
+        tool_results = await run_tool_calls(session, tool_uses, scene_lock, collection, trace, iteration)
+        messages.append({"role": "assistant", "content": msg.content})
+        messages.append({"role": "user", "content": tool_results})
+        compacted = compact_history(messages)
+        if compacted:
+            logger.info(f"古いツール結果を要約しました: {compacted}件")
+        mark_cache_breakpoint(messages)
+
+        # Claudeへ実行結果を返却
+        logger.info(f"Claudeに実行結果を送信中... ({len(tool_results)}件)")
+        msg = await retry_on_overload(create_message)
+        logger.info("Claudeからの応答を受信しました")
+
+        iteration += 1
+
+    if iteration > max_iterations:
+        logger.warning(f"最大ループ回数({max_iterations}回)に達しました。処理を終了します。")
+
+    answer = [block.text for block in msg.content or [] if block.type == "text"]
+    if not msg.content:
+        logger.error("応答が空です")
+    return {
+        "final_text": final_text + answer,
+        "answer": "\n".join(answer),
+        "iterations": iteration - 1,
+        "stop_reason": msg.stop_reason,
+        "image": payload.summary(),
+        "first_response_seconds": first_response_seconds
+    }
+
+# Blender MCP サーバーの起動コマンド
+BLENDER_MCP_SERVER = StdioServerParameters(command="uvx", args=["blender-mcp"])
+
+# ツール一覧のキャッシュ（サーバーのバージョンが同じならセッション間で再利用する）
+TOOL_SCHEMA_CACHE_DIR = ".mcp_schema_cache"
+
+@contextlib.asynccontextmanager
+async def blender_session(server_cfg: StdioServerParameters = BLENDER_MCP_SERVER,
+                          schema_cache_dir: str = TOOL_SCHEMA_CACHE_DIR):
+    """Blender MCP サーバーを起動して初期化済みのセッションを返す（負荷試験では代替サーバーを渡す）
+
+    読み取り専用ツールの結果とツール一覧をキャッシュする CachingSession で包んで返す。
+    """
+    logger.info("Blender MCPサーバーを起動中...")
+    async with stdio_client(server_cfg) as (r, w):
+        async with ClientSession(r, w) as blender:
+            logger.info("Blender MCPサーバーに接続しました")
+            init = await blender.initialize()
+            logger.info("Blender MCPサーバーの初期化が完了しました")
+            server_info = getattr(init, "serverInfo", None) or getattr(init, "server_info", None)
+            session = CachingSession(blender, server_info, schema_cache_dir)
+            try:
+                yield session
+            finally:
+                stats = session.stats()
+                logger.info(f"ツール結果キャッシュ: ヒット {stats['hits']} / ミス {stats['misses']} "
+                            f"(破棄 {stats['invalidations']}回, ツール一覧 "
+                            f"{'キャッシュ' if stats['schema_cached'] else 'サーバーから取得'})")
+
+async def main(img_path: str, user_prompt: str, trace_path: str = None):
     try:
         logger.info("処理を開始します")
         logger.info(f"入力画像: {img_path}")
         logger.info(f"プロンプト: {user_prompt}")
 
-        # 1. Blender MCP サーバーを起動 & 接続
-        logger.info("Blender MCPサーバーを起動中...")
-        server_cfg = StdioServerParameters(command="uvx", args=["blender-mcp"])
-        async with stdio_client(server_cfg) as (r, w):
-            async with ClientSession(r, w) as blender:
-                logger.info("Blender MCPサーバーに接続しました")
-                await blender.initialize()
-                logger.info("Blender MCPサーバーの初期化が完了しました")
-
-                # 2. Blenderのツール一覧をClaude用schemaへ変換
-                logger.info("Blenderツール一覧を取得中...")
-                raw_tools = await blender.list_tools()
-                tools_schema = [
-                    {
-                        "name": t.name,
-                        "description": t.description,
-                        "input_schema": t.inputSchema,
-                    }
-                    for t in raw_tools.tools
-                ]
-                logger.info(f"利用可能なBlenderツール数: {len(tools_schema)}")
-
-                # 3. Claudeへ初回リクエスト（画像＋プロンプト＋画像パス明示）
-                logger.info("Claude APIに接続中...")
-                async with anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY) as client:
-                    img_b64 = await load_image_base64(img_path)
-                    logger.info("画像の読み込みが完了しました")
-
-                # 画像のbase64エンコーディングを確認
-                logger.info(f"画像のbase64長さ: {len(img_b64)}")
-
-                # リクエストの内容を確認（機密情報は除く）
-                logger.info("送信するリクエストの内容:")
-                logger.info(f"画像ブロックのtype: image")
-                logger.info(f"画像ブロックのmedia_type: image/png")
-
-                async def create_message():
-                    logger.info("Claudeにメッセージを送信中...")
-                    return await client.messages.create(
-                        model=MODEL,
-                        max_tokens=1024,
-                        tools=tools_schema,
-                        messages=[{
-                            "role": "user",
-                            "content": [
-                                {   # 画像ブロック
-                                    "type": "image",
-                                    "source": {
-                                        "type": "base64",
-                                        "media_type": "image/png",
-                                        "data": img_b64
-                                    }
-                                },
-                                {   # テキストブロック
-                                    "type": "text",
-                                    "text": f"{user_prompt}。\n"
-                                            f"元画像はローカルで `{img_path}` に保存されています。"
-                                }
-                            ]
-                        }]
-                    )
+        # 1. Blender MCP サーバーを起動 & 接続（stdio_client のコンテキストマネージャがクローズを処理する）
+        async with blender_session() as blender:
+            # 2. Blenderのツール一覧をClaude用schemaへ変換
+            tools_schema = await fetch_tools_schema(blender)
 
+            # 3. Claude⇄Blender の会話
+            logger.info("Claude APIに接続中...")
+            async with anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY) as client:
+                trace = ToolTrace(img_path, user_prompt, trace_params(img_path)) if trace_path else None
                 try:
-                    msg = await retry_on_overload(create_message)
-                    logger.info("Claudeからの応答を受信しました")
-
-                    # 4. Claude⇄Blender ループ
-                    iteration = 1
-                    max_iterations = 50  # 最大ループ回数を制限
-                    messages = []  # メッセージ履歴を保持
-                    final_text = []  # 最終的なテキスト応答を保持
-
-                    while msg.stop_reason == "tool_use" and iteration <= max_iterations:
-                        logger.info(f"ツール実行ループ {iteration}回目")
-                        
-                        # 応答の形式を確認
-                        if not msg.content:
-                            logger.error("応答が空です")
-                            break
-                            
-                        # アシスタントのメッセージを保存
-                        assistant_message_content = []
-                        for block in msg.content:
-                            if block.type == "text":
-                                logger.info(f"Claudeの応答: {block.text}")
-                                final_text.append(block.text)
-                                assistant_message_content.append(block)
-                            elif block.type == "tool_use":
-                                logger.info(f"ツール呼び出し: {block.name}")
-                                try:
-                                    result = await blender.call_tool(block.name, block.input)
-                                    logger.info(f"ツール実行完了: {block.name}")
-
-                                    # ツールの実行結果を処理
-                                    try:
-                                        # MCPプロトコルに従って結果を処理
-                                        if hasattr(result, 'content'):
-                                            result_str = result.content
-                                        elif hasattr(result, 'dict'):
-                                            result_str = json.dumps(result.dict())
-                                        elif hasattr(result, '__dict__'):
-                                            result_str = json.dumps(result.__dict__)
-                                        else:
-                                            result_str = str(result)
-                                    except Exception as e:
-                                        logger.error(f"結果の変換中にエラーが発生しました: {str(e)}")
-                                        result_str = str(result)
-
-                                    # アシスタントのメッセージを追加
-                                    messages.append({
-                                        "role": "assistant",
-                                        "content": assistant_message_content + [block]  # テキストブロックとツール使用ブロックを追加
-                                    })
-
-                                    # ツールの実行結果を追加
-                                    messages.append({
-                                        "role": "user",
-                                        "content": [{
-                                            "type": "tool_result",
-                                            "tool_use_id": block.id,
-                                            "content": result_str
-                                        }]
-                                    })
-
-                                    # Claudeへ実行結果を返却
-                                    logger.info("Claudeに実行結果を送信中...")
-
-                                    async def _send_tool_results_to_claude():
-                                        return await client.messages.create(
-                                            model=MODEL,
-                                            max_tokens=1024,
-                                            tools=tools_schema,
-                                            messages=messages
-                                        )
-                                    msg = await retry_on_overload(_send_tool_results_to_claude)
-                                    
-                                    logger.info("Claudeからの応答を受信しました")
-                                except Exception as e:
-                                    logger.error(f"ツール実行中にエラーが発生しました: {str(e)}")
-                                    break
-                        
-                        iteration += 1
-
-                    if iteration > max_iterations:
-                        logger.warning(f"最大ループ回数({max_iterations}回)に達しました。処理を終了します。")
-
-                    # 5. Claude の最終回答
-                    logger.info("最終回答を出力します")
-                    if msg.content:
-                        for block in msg.content:
-                            if block.type == "text":
-                                final_text.append(block.text)
-                                print(block.text)
-                    else:
-                        logger.error("応答が空です")
-                    logger.info("処理が完了しました")
+                    result = await run_agent(client, blender, tools_schema, img_path, user_prompt, trace=trace)
                 except Exception as e:
                     logger.error(f"Claude APIとの通信中にエラーが発生しました: {str(e)}")
                     raise
+
+        if trace is not None:
+            trace.save(trace_path)
+            logger.info(f"ツール呼び出しのトレースを保存しました: {trace_path}")
+
+        # 4. Claude の最終回答
+        logger.info("最終回答を出力します")
+        if result["answer"]:
+            print(result["answer"])
+        logger.info("処理が完了しました")
+        return result
     except Exception as e:
         logger.error(f"処理中にエラーが発生しました: {str(e)}")
         raise
-    finally:
-        # finallyブロックは維持しますが、パイプの明示的なクローズ処理は削除します。
-        # stdio_client のコンテキストマネージャがクローズを処理します。
-        pass
+
+# バッチの既定値
+DEFAULT_PROMPT = "これを Blender で 3D モデル化して"
+DEFAULT_CONCURRENCY = 2
+DEFAULT_IMAGE_TIMEOUT = 900  # 1枚あたりの上限（秒）
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+
+def collect_images(source: str, default_prompt: str = DEFAULT_PROMPT) -> list:
+    """ディレクトリ・マニフェスト（.json / 1行1パスのテキスト）から (画像パス, プロンプト) の一覧を作成
+
+    .json の各エントリは文字列か {"path": ..., "prompt": ...} で、prompt を省略すると default_prompt を使う。
+    """
+    source = Path(source)
+    if source.is_dir():
+        return [(str(path), default_prompt) for path in sorted(source.iterdir())
+                if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS]
+    if source.suffix.lower() in IMAGE_EXTENSIONS:
+        return [(str(source), default_prompt)]
+    if source.suffix.lower() == ".json":
+        with open(source, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        entries = manifest.get("images", []) if isinstance(manifest, dict) else manifest
+        images = []
+        for entry in entries:
+            if isinstance(entry, dict):
+                images.append((str(source.parent / entry["path"]), entry.get("prompt", default_prompt)))
+            else:
+                images.append((str(source.parent / entry), default_prompt))
+        return images
+    with open(source, "r", encoding="utf-8") as f:
+        return [(str(source.parent / line.strip()), default_prompt) for line in f
+                if line.strip() and not line.strip().startswith("#")]
+
+def collection_name(index: int, img_path: str) -> str:
+    """会話ごとのBlenderコレクション名"""
+    return f"agent_{index:03d}_{Path(img_path).stem}"
+
+async def run_batch_agents(session, client, images: list, concurrency: int = DEFAULT_CONCURRENCY,
+                           timeout: float = DEFAULT_IMAGE_TIMEOUT,
+                           max_iterations: int = MAX_ITERATIONS, trace_dir: str = None) -> dict:
+    """起動済みのMCPセッションとClaudeクライアントを共有して複数の画像の会話を並列に実行
+
+    各会話は専用のコレクションで作業し、シーンを変更するツールは共有ロックで1つずつ実行する。
+    画像ごとに timeout 秒を超えたら打ち切って失敗として記録する。
+    trace_dir を渡すと、成功した会話のツール呼び出しを <コレクション名>.json に保存する。
+    """
+    tools_schema = await fetch_tools_schema(session)
+    scene_lock = asyncio.Lock()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+
+    async def run_one(index: int, img_path: str, user_prompt: str) -> dict:
+        async with semaphore:
+            collection = collection_name(index, img_path)
+            record = {"image_path": img_path, "collection": collection}
+            image_started = time.perf_counter()
+            trace = ToolTrace(img_path, user_prompt, trace_params(img_path, collection)) if trace_dir else None
+            logger.info(f"[{index + 1}/{len(images)}] 開始: {img_path}")
+            try:
+                result = await asyncio.wait_for(
+                    run_agent(client, session, tools_schema, img_path, user_prompt,
+                              max_iterations, scene_lock, collection, trace),
+                    timeout
+                )
+                record.update(success=result["stop_reason"] != "tool_use", iterations=result["iterations"],
+                              answer=result["answer"], image=result["image"],
+                              first_response_seconds=result["first_response_seconds"])
+                if trace is not None and record["success"]:
+                    record["trace_path"] = str(Path(trace_dir) / f"{collection}.json")
+                    trace.save(record["trace_path"])
+            except asyncio.TimeoutError:
+                logger.error(f"タイムアウト（{timeout}秒）: {img_path}")
+                record.update(success=False, error=f"タイムアウト（{timeout}秒）")
+            except Exception as e:
+                logger.error(f"会話中にエラーが発生しました: {img_path}: {str(e)}")
+                record.update(success=False, error=str(e))
+            record["seconds"] = round(time.perf_counter() - image_started, 2)
+            logger.info(f"[{index + 1}/{len(images)}] {'完了' if record['success'] else '失敗'}: "
+                        f"{img_path} ({record['seconds']}秒)")
+            return record
+
+    results = await asyncio.gather(*(run_one(i, path, prompt) for i, (path, prompt) in enumerate(images)))
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "started_at": datetime.now().isoformat(),
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_seconds": round(elapsed, 2),
+        "images_per_hour": round(len(results) / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+        "concurrency": concurrency,
+        # 画像の前処理で減らした送信量（キャッシュから使った枚数を含む）
+        "image_bytes_saved": sum(r["image"]["original_bytes"] - r["image"]["encoded_bytes"]
+                                 for r in results if "image" in r),
+        "image_cache_hits": sum(1 for r in results if r.get("image", {}).get("cached")),
+        "results": results
+    }
+
+async def run_batch_replays(session, trace: dict, images: list,
+                            timeout: float = DEFAULT_IMAGE_TIMEOUT) -> dict:
+    """記録したトレースを画像ごとにパラメータを差し替えてLLMなしで再実行
+
+    シーンを変更するツールだけを再実行するため、画像は1枚ずつ順番に処理する。
+    """
+    started = time.perf_counter()
+    results = []
+    for index, (img_path, _) in enumerate(images):
+        collection = collection_name(index, img_path)
+        record = {"image_path": img_path, "collection": collection}
+        logger.info(f"[{index + 1}/{len(images)}] トレースを再実行: {img_path}")
+        try:
+            await activate_collection(session, collection)
+            replay = await asyncio.wait_for(
+                replay_trace(session, trace, trace_params(img_path, collection)), timeout)
+            record.update(success=replay["success"], calls=len(replay["calls"]), seconds=replay["seconds"])
+            if not replay["success"]:
+                failed = next(call for call in replay["calls"] if call["is_error"])
+                record["error"] = f"{failed['name']}: {failed['result']}"
+        except asyncio.TimeoutError:
+            record.update(success=False, error=f"タイムアウト（{timeout}秒）")
+        except Exception as e:
+            record.update(success=False, error=str(e))
+        if not record["success"]:
+            logger.error(f"再実行に失敗しました: {img_path}: {record['error']}")
+        results.append(record)
+
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "started_at": datetime.now().isoformat(),
+        "mode": "replay",
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_seconds": round(elapsed, 2),
+        "images_per_hour": round(len(results) / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+        "results": results
+    }
+
+def save_report(report: dict, report_path: str = None):
+    """バッチレポートを保存して結果をログに出す"""
+    if report_path:
+        Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"レポートを保存しました: {report_path}")
+    logger.info(f"バッチ処理が完了しました: 成功 {report['succeeded']} / 失敗 {report['failed']} "
+                f"({report['elapsed_seconds']}秒)")
+
+async def batch_main(source: str, user_prompt: str = DEFAULT_PROMPT, concurrency: int = DEFAULT_CONCURRENCY,
+                     timeout: float = DEFAULT_IMAGE_TIMEOUT, report_path: str = None,
+                     trace_dir: str = None) -> dict:
+    """Blender MCP サーバーとClaudeクライアントを1回だけ起動してバッチを実行し、レポートを保存"""
+    images = collect_images(source, user_prompt)
+    logger.info(f"バッチ処理を開始します: {len(images)}枚（同時実行数 {concurrency}）")
+    async with blender_session() as blender:
+        async with anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY) as client:
+            report = await run_batch_agents(blender, client, images, concurrency, timeout,
+                                            trace_dir=trace_dir)
+    save_report(report, report_path)
+    return report
+
+async def replay_main(source: str, trace_path: str, timeout: float = DEFAULT_IMAGE_TIMEOUT,
+                      report_path: str = None) -> dict:
+    """Claudeを使わずにトレースを画像ごとに再実行し、レポートを保存"""
+    trace = load_trace(trace_path)
+    images = collect_images(source)
+    logger.info(f"トレースの再実行を開始します: {trace_path} → {len(images)}枚")
+    async with blender_session() as blender:
+        report = await run_batch_replays(blender, trace, images, timeout)
+    report["trace_path"] = trace_path
+    save_report(report, report_path)
+    return report
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Claude⇄Blender MCP 画像→3Dモデル化")
+    parser.add_argument("source", nargs="?", help="画像・ディレクトリ・マニフェスト（省略時はファイル選択ダイアログ）")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="既定のプロンプト")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同時に実行する会話数")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_IMAGE_TIMEOUT, help="1枚あたりの上限（秒）")
+    parser.add_argument("--report", default="agent_batch_report.json", help="バッチレポートの保存先")
+    parser.add_argument("--record-traces", metavar="DIR", help="成功した会話のツール呼び出しを保存するフォルダ")
+    parser.add_argument("--replay", metavar="TRACE", help="Claudeを使わずにこのトレースを各画像に再実行")
+    args = parser.parse_args()
+
+    if args.replay:
+        if not args.source:
+            parser.error("--replay には画像・ディレクトリ・マニフェストの指定が必要です")
+        asyncio.run(replay_main(args.source, args.replay, args.timeout, args.report))
+        raise SystemExit(0)
+    if args.source:
+        asyncio.run(batch_main(args.source, args.prompt, args.concurrency, args.timeout, args.report,
+                               args.record_traces))
+        raise SystemExit(0)
+
     try:
         import tkinter as tk
         from tkinter import filedialog
@@ -229,7 +646,7 @@ if __name__ == "__main__":
         
         if input_file:  # ファイルが選択された場合のみ実行
             logger.info(f"選択されたファイル: {input_file}")
-            asyncio.run(main(input_file, "これを Blender で 3D モデル化して"))
+            asyncio.run(main(input_file, args.prompt))
         else:
             logger.warning("ファイルが選択されませんでした")
             print("ファイルが選択されませんでした")
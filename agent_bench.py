@@ -0,0 +1,223 @@
+"""
+GAAAGS エージェントループの負荷試験
+blender-mcp 代替サーバー（fake_blender_mcp.py）と、決められた tool_use を順に返す
+スクリプト化したClaudeクライアントを使い、3d_eval3 の会話ループを Blender・uvx・Anthropic API なしで実行して、
+ループのオーバーヘッド・同時実行数によるスケーリング・メモリ使用量を計測する
+
+    python agent_bench.py --sessions 200 --concurrency 1,8,32 --llm-latency 0.05 --tool-latency 0.01
+"""
+
+import asyncio
+import importlib.util
+import itertools
+import json
+import logging
+import re
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from anthropic.types import Message, TextBlock, ToolUseBlock, Usage
+from mcp.client.stdio import StdioServerParameters
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent
+
+# 1つの会話でClaudeが返す tool_use の並び（1要素が1回の応答、{image_path} は画像パスに置き換える）
+DEFAULT_SCRIPT = [
+    [("get_scene_info", {}), ("get_polyhaven_status", {})],
+    [("execute_blender_code", {"code": "import bpy\nbpy.ops.mesh.primitive_plane_add()\n"
+                                       "image = bpy.data.images.load({image_path!r})"})],
+    [("search_polyhaven_assets", {"asset_type": "textures", "categories": "rock"})],
+    [("download_polyhaven_asset", {"asset_id": "rock_00", "asset_type": "textures"}),
+     ("set_texture", {"object_name": "Object", "texture_id": "rock_00"})],
+    [("get_scene_info", {}), ("get_object_info", {"object_name": "Object"})],
+]
+FINAL_ANSWER = "3Dモデルを作成しました。"
+
+
+def load_agent_module():
+    """3d_eval3 を読み込む（ファイル名が数字で始まるためimportlibを使う）"""
+    spec = importlib.util.spec_from_file_location("eval_3d3", ROOT / "3d_eval3.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def fake_server(latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                seed: Optional[int] = None) -> StdioServerParameters:
+    """代替サーバーの起動コマンド"""
+    args = [str(ROOT / "fake_blender_mcp.py"), "--latency", str(latency), "--jitter", str(jitter),
+            "--failure-rate", str(failure_rate)]
+    if seed is not None:
+        args += ["--seed", str(seed)]
+    return StdioServerParameters(command=sys.executable, args=args)
+
+
+class ScriptedMessages:
+    """会話の進み具合（アシスタントの応答数）に応じて script の tool_use を返す messages.create の代替"""
+
+    def __init__(self, script: List[List] = None, latency: float = 0.0, final_answer: str = FINAL_ANSWER):
+        self.script = DEFAULT_SCRIPT if script is None else script
+        self.latency = latency
+        self.final_answer = final_answer
+        self.requests = 0
+        self.tool_errors = 0  # is_error で返されたツール結果の数
+        self._ids = itertools.count()
+
+    async def create(self, *, model: str, messages: List[Dict], **kwargs) -> Message:
+        self.requests += 1
+        last = messages[-1]["content"]
+        if len(messages) > 1 and isinstance(last, list):
+            self.tool_errors += sum(1 for block in last if isinstance(block, dict) and block.get("is_error"))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        turn = sum(1 for message in messages if message["role"] == "assistant")
+        usage = Usage(input_tokens=0, output_tokens=0)
+        if turn >= len(self.script):
+            return Message(id=f"msg_{next(self._ids)}", type="message", role="assistant", model=model,
+                           content=[TextBlock(type="text", text=self.final_answer)],
+                           stop_reason="end_turn", usage=usage)
+
+        image_path = self.image_path(messages[0])
+        content = [
+            ToolUseBlock(type="tool_use", id=f"toolu_{next(self._ids)}", name=name,
+                         input={key: value.format(image_path=image_path) if isinstance(value, str) else value
+                                for key, value in arguments.items()})
+            for name, arguments in self.script[turn]
+        ]
+        return Message(id=f"msg_{next(self._ids)}", type="message", role="assistant", model=model,
+                       content=content, stop_reason="tool_use", usage=usage)
+
+    @staticmethod
+    def image_path(message: Dict) -> str:
+        """初回のユーザーメッセージから画像パス（`...` で囲まれた部分）を取り出す"""
+        for block in message["content"]:
+            if block["type"] == "text":
+                match = re.search(r"`([^`]+)`", block["text"])
+                if match:
+                    return match.group(1)
+        return ""
+
+
+class ScriptedClient:
+    """AsyncAnthropic の代替（messages.create だけを持つ）"""
+
+    def __init__(self, script: List[List] = None, latency: float = 0.0):
+        self.messages = ScriptedMessages(script, latency)
+
+
+def make_images(directory: Path, count: int, size: int = 64) -> List:
+    """負荷試験用の画像（1枚を作成し、同じ内容のファイルを count 枚コピー）"""
+    directory.mkdir(parents=True, exist_ok=True)
+    first = directory / "bench_0000.png"
+    Image.new("RGB", (size, size), (180, 120, 60)).save(first)
+    data = first.read_bytes()
+    images = [(str(first), "これを Blender で 3D モデル化して")]
+    for i in range(1, count):
+        path = directory / f"bench_{i:04d}.png"
+        path.write_bytes(data)
+        images.append((str(path), images[0][1]))
+    return images
+
+
+async def run_scenario(agent, session, images: List, concurrency: int, llm_latency: float = 0.0,
+                       script: List[List] = None) -> Dict:
+    """1つの同時実行数で全画像の会話を実行し、所要時間とメモリを計測"""
+    client = ScriptedClient(script, llm_latency)
+    hits = getattr(session, "hits", 0)
+    tracemalloc.start()
+    started = time.perf_counter()
+    report = await agent.run_batch_agents(session, client, images, concurrency=concurrency)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    turns = client.messages.requests
+    tool_calls = sum(len(turn) for turn in client.messages.script) * len(images)
+    return {
+        "concurrency": concurrency,
+        "sessions": len(images),
+        "succeeded": report["succeeded"],
+        "failed": report["failed"],
+        "elapsed_seconds": round(elapsed, 3),
+        "sessions_per_second": round(len(images) / elapsed, 2) if elapsed > 0 else 0.0,
+        "llm_requests": turns,
+        "tool_calls": tool_calls,
+        "tool_errors": client.messages.tool_errors,
+        "tool_cache_hits": getattr(session, "hits", 0) - hits,
+        # LLMの待ち時間を除いた1往復あたりの時間（ツール実行とループ自体の処理）
+        "seconds_per_turn": round((elapsed * concurrency - turns * llm_latency) / turns, 5) if turns else 0.0,
+        "peak_traced_mb": round(peak / 1024 ** 2, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+
+async def run_benchmark(sessions: int = 100, concurrency_levels: List[int] = (1, 8, 32),
+                        llm_latency: float = 0.0, tool_latency: float = 0.0, tool_jitter: float = 0.0,
+                        failure_rate: float = 0.0, seed: Optional[int] = 0,
+                        script: List[List] = None, work_dir: Optional[str] = None) -> Dict:
+    """代替サーバーを1回起動し、同時実行数ごとに全セッションを実行"""
+    agent = load_agent_module()
+    logging.getLogger(agent.__name__).setLevel(logging.WARNING)
+    agent.payload_cache = agent.ImagePayloadCache()  # 作業フォルダにキャッシュを残さない
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        images = make_images(Path(temp_dir), sessions)
+        server = fake_server(tool_latency, tool_jitter, failure_rate, seed)
+        async with agent.blender_session(server, schema_cache_dir=temp_dir) as session:
+            scenarios = [await run_scenario(agent, session, images, concurrency, llm_latency, script)
+                         for concurrency in concurrency_levels]
+
+    baseline = scenarios[0]["elapsed_seconds"]
+    for scenario in scenarios:
+        scenario["speedup"] = round(baseline / scenario["elapsed_seconds"], 2) if scenario["elapsed_seconds"] else 0.0
+    return {
+        "sessions": sessions,
+        "llm_latency": llm_latency,
+        "tool_latency": tool_latency,
+        "tool_jitter": tool_jitter,
+        "failure_rate": failure_rate,
+        "turns_per_session": len(DEFAULT_SCRIPT if script is None else script) + 1,
+        "scenarios": scenarios
+    }
+
+
+def print_report(result: Dict):
+    """計測結果を表で表示"""
+    print(f"\n=== エージェントループ負荷試験（{result['sessions']}セッション, "
+          f"LLM遅延 {result['llm_latency']}秒, ツール遅延 {result['tool_latency']}秒）===")
+    print(f"{'同時実行':>8} {'所要(秒)':>9} {'セッション/秒':>12} {'倍率':>6} {'1往復(ms)':>10} "
+          f"{'失敗':>5} {'ツール失敗':>8} {'メモリ(MB)':>10}")
+    for s in result["scenarios"]:
+        print(f"{s['concurrency']:>8} {s['elapsed_seconds']:>9.2f} {s['sessions_per_second']:>12.2f} "
+              f"{s['speedup']:>6.2f} {s['seconds_per_turn'] * 1000:>10.2f} {s['failed']:>5} {s['tool_errors']:>8} "
+              f"{s['peak_traced_mb']:>10.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="エージェントループ負荷試験（Blender・APIなし）")
+    parser.add_argument("--sessions", type=int, default=100, help="会話（画像）の数")
+    parser.add_argument("--concurrency", default="1,8,32", help="同時実行数（カンマ区切り）")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Claude応答の疑似遅延（秒）")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="ツール応答の疑似遅延（秒）")
+    parser.add_argument("--tool-jitter", type=float, default=0.0, help="ツール遅延のばらつき（±秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="ツール呼び出しが失敗する確率")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--report", help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(
+        args.sessions, [int(c) for c in args.concurrency.split(",")], args.llm_latency,
+        args.tool_latency, args.tool_jitter, args.failure_rate, args.seed
+    ))
+    print_report(result)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"結果を保存しました: {args.report}")
@@ -0,0 +1,168 @@
+"""
+GAAAGS エージェントのツール呼び出しトレース
+Claude⇄Blender の会話で実行したツール呼び出し（ツール名・引数・結果・所要時間）を記録し、
+画像パスなどを差し替えてLLMなしで blender-mcp に対して再実行する
+"""
+
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tool_cache import NON_MUTATING_TOOLS
+
+# トレースファイルの形式のバージョン
+TRACE_VERSION = 1
+
+# 記録する結果テキストの最大文字数
+RESULT_PREVIEW_CHARS = 2000
+
+# 再実行しても意味のない読み取り専用ツール（シーンを変更しない、並列実行・キャッシュと同じ分類）
+SKIP_ON_REPLAY = NON_MUTATING_TOOLS
+
+
+def substitute(value: Any, replacements: Dict[str, str]) -> Any:
+    """value 内の文字列を replacements（置換前 → 置換後）で置き換える（辞書・リストは再帰的に）"""
+    if isinstance(value, str):
+        # 長いものから置き換えて、画像パスの一部（ファイル名など）が先に置換されないようにする
+        for old in sorted(replacements, key=len, reverse=True):
+            if old:
+                value = value.replace(old, replacements[old])
+        return value
+    if isinstance(value, dict):
+        return {key: substitute(item, replacements) for key, item in value.items()}
+    if isinstance(value, list):
+        return [substitute(item, replacements) for item in value]
+    return value
+
+
+def trace_params(image_path: str, collection: Optional[str] = None) -> Dict[str, str]:
+    """トレースのプレースホルダに入れる値（画像パス・ファイル名・コレクション名）
+
+    拡張子なしのファイル名はコード中の短い文字列と一致しやすいため対象にしない。
+    """
+    path = Path(image_path)
+    params = {
+        "image_path": str(path),
+        "image_abspath": str(path.resolve()),
+        "image_name": path.name,
+    }
+    if collection:
+        params["collection"] = collection
+    return params
+
+
+def result_text(result_block: Dict) -> str:
+    """tool_resultブロックのテキスト部分"""
+    content = result_block.get("content")
+    if isinstance(content, str):
+        return content
+    return "\n".join(item["text"] if item["type"] == "text" else "[画像]" for item in content or [])
+
+
+class ToolTrace:
+    """1つの会話のツール呼び出しの記録
+
+    保存時に params の値を {{名前}} のプレースホルダに置き換え、再実行時に新しい値を入れる。
+    """
+
+    def __init__(self, image_path: str = "", prompt: str = "", params: Optional[Dict[str, str]] = None):
+        self.image_path = image_path
+        self.prompt = prompt
+        self.params = params or {}
+        self.created_at = datetime.now().isoformat()
+        self.calls: List[Dict] = []
+
+    def record(self, name: str, arguments: Dict, result_block: Dict, seconds: float, iteration: int = 0):
+        """1回のツール呼び出しを記録"""
+        self.calls.append({
+            "iteration": iteration,
+            "name": name,
+            "input": arguments,
+            "is_error": bool(result_block.get("is_error")),
+            "result": result_text(result_block)[:RESULT_PREVIEW_CHARS],
+            "seconds": round(seconds, 3)
+        })
+
+    def to_dict(self) -> Dict:
+        """JSON保存用の辞書（引数中のパラメータの値はプレースホルダに置き換える）"""
+        # 値が同じパラメータ（画像パスが絶対パスの場合など）は先に定義したものを使う
+        placeholders = {}
+        for name, value in self.params.items():
+            placeholders.setdefault(value, f"{{{{{name}}}}}")
+        return {
+            "version": TRACE_VERSION,
+            "image_path": self.image_path,
+            "prompt": self.prompt,
+            "created_at": self.created_at,
+            "params": sorted(self.params),
+            "total_seconds": round(sum(call["seconds"] for call in self.calls), 3),
+            "calls": [dict(call, input=substitute(call["input"], placeholders)) for call in self.calls]
+        }
+
+    def save(self, path: str):
+        """トレースをJSONで保存"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def load_trace(path: str) -> Dict:
+    """保存したトレースを読み込む"""
+    with open(path, "r", encoding="utf-8") as f:
+        trace = json.load(f)
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"未対応のトレース形式です: {path} (version={trace.get('version')})")
+    return trace
+
+
+def replay_calls(trace: Dict, params: Dict[str, str], include_read_only: bool = False) -> List[Dict]:
+    """再実行するツール呼び出し（記録時に失敗した呼び出しと読み取り専用ツールは除く）"""
+    values = {f"{{{{{name}}}}}": value for name, value in params.items()}
+    missing = [name for name in trace.get("params", []) if name not in params]
+    if missing:
+        raise ValueError(f"トレースのパラメータが指定されていません: {', '.join(missing)}")
+    return [
+        {"name": call["name"], "input": substitute(call["input"], values)}
+        for call in trace["calls"]
+        if not call["is_error"] and (include_read_only or call["name"] not in SKIP_ON_REPLAY)
+    ]
+
+
+async def replay_trace(session, trace: Dict, params: Dict[str, str], stop_on_error: bool = True,
+                       include_read_only: bool = False) -> Dict:
+    """トレースのツール呼び出しをLLMなしで順番に実行
+
+    Hyper3Dのジョブなど、前の呼び出しの結果に依存する引数は置き換えられないため、
+    そうした呼び出しを含むトレースは再実行しても同じ結果にならない。
+    """
+    started = time.perf_counter()
+    calls = replay_calls(trace, params, include_read_only)
+    results = []
+    for call in calls:
+        call_started = time.perf_counter()
+        try:
+            result = await session.call_tool(call["name"], call["input"])
+            # mcp 2.x では isError が is_error に改名された
+            error = bool(getattr(result, "isError", None) or getattr(result, "is_error", False))
+            text = "\n".join(getattr(item, "text", "") for item in getattr(result, "content", None) or [])
+        except Exception as e:
+            error, text = True, f"ツール実行エラー: {str(e)}"
+        results.append({
+            "name": call["name"],
+            "is_error": error,
+            "result": text[:RESULT_PREVIEW_CHARS],
+            "seconds": round(time.perf_counter() - call_started, 3)
+        })
+        if error and stop_on_error:
+            break
+
+    failed = sum(1 for result in results if result["is_error"])
+    return {
+        "success": failed == 0 and len(results) == len(calls),
+        "calls": results,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
@@ -4,16 +4,22 @@ GAAAGS MVP版 パイプライン
 """
 
 import json
+import math
 import os
+import shutil
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 from google import genai
 from google.genai import types
 from PIL import Image
 from io import BytesIO
+from quality_scorer import QualityScorer, AssetQualityScore, save_quality_evaluations
+from pixel_art import PixelArtProcessor, load_palette
 
 class GAAAGSError(Exception):
     """GAAAGSの基本例外クラス"""
@@ -63,6 +69,8 @@ class GeneratedAsset:
     prompt_used: str
     created_at: datetime
     status: str  # generated, failed
+    quality_score: Optional[float] = None  # 自動品質評価の総合点（0.00-5.00）
+    quality_passed: Optional[bool] = None
 
 class FileManager:
     """ファイル管理"""
@@ -106,13 +114,22 @@ class FileManager:
                     "prompt": asset.prompt_used,
                     "status": asset.status,
                     "file_path": str(asset.image_path),
-                    "generated_at": asset.created_at.isoformat()
+                    "generated_at": asset.created_at.isoformat(),
+                    "quality_score": asset.quality_score,
+                    "quality_passed": asset.quality_passed
                 })
             
             with open(project_dir / "generation_log.json", "w", encoding="utf-8") as f:
                 json.dump(log, f, ensure_ascii=False, indent=2)
         except Exception as e:
             raise FileOperationError(f"生成ログの保存に失敗: {e}")
+    
+    def save_quality_evaluations(self, scores: List[AssetQualityScore], project_dir: Path):
+        """自動品質評価の結果を保存"""
+        try:
+            save_quality_evaluations(scores, project_dir)
+        except Exception as e:
+            raise FileOperationError(f"品質評価結果の保存に失敗: {e}")
 
 class PromptBuilder:
     """プロンプト生成"""
@@ -221,6 +238,14 @@ class AssetPipeline:
             self.file_manager = FileManager()
             self.prompt_builder = PromptBuilder()
             self.image_generator = GeminiImageGenerator(api_key)
+            self.quality_scorer = QualityScorer()
+            # 複数候補生成の設定（採用ラインと同時生成数）
+            self.accept_score = 4.0
+            self.candidate_parallelism = None
+            # art_style が pixel の世界観で使う後処理
+            self.pixel_processor = PixelArtProcessor()
+            # use_pixel_palette で読み込んだ既存のパレット（再利用して色を揃える）
+            self.pixel_palette = None
             # デフォルトの世界観設定を初期化
             self.world_setting = WorldSetting(
                 name="テスト世界",
@@ -278,8 +303,11 @@ class AssetPipeline:
         
         return specs.get(world_setting.genre, specs["fantasy"])
     
-    def process_world(self, world_setting: WorldSetting) -> List[GeneratedAsset]:
-        """世界観を処理してアセットを生成"""
+    def process_world(self, world_setting: WorldSetting, candidates: int = 1) -> List[GeneratedAsset]:
+        """世界観を処理してアセットを生成
+        
+        candidates が2以上の場合は、アセットごとに複数候補を生成して最良の1枚を採用する
+        """
         try:
             print(f"世界観 '{world_setting.name}' の処理を開始...")
             
@@ -297,6 +325,7 @@ class AssetPipeline:
             print(f"{len(asset_specs)}個のアセットを生成予定")
             
             generated_assets = []
+            quality_scores = []
             
             for i, spec in enumerate(asset_specs, 1):
                 try:
@@ -307,7 +336,12 @@ class AssetPipeline:
                     
                     # 画像生成
                     image_path = project_dir / "assets" / f"{spec.name}.png"
-                    success = self.image_generator.generate_image(prompt, image_path)
+                    best_score = None
+                    if candidates > 1:
+                        best_score = self.generate_best_of_n(prompt, image_path, world_setting, candidates)
+                        success = best_score is not None
+                    else:
+                        success = self.image_generator.generate_image(prompt, image_path)
                     
                     # アセット作成
                     asset = GeneratedAsset(
@@ -320,6 +354,12 @@ class AssetPipeline:
                         status="generated" if success else "failed"
                     )
                     
+                    # 生成直後に自動品質評価
+                    if success:
+                        score = self.evaluate_asset(asset, best_score)
+                        if score:
+                            quality_scores.append(score)
+                    
                     generated_assets.append(asset)
                     print(f"✓ {spec.name} 生成{'完了' if success else '失敗'}")
                 except Exception as e:
@@ -327,8 +367,14 @@ class AssetPipeline:
                     # エラーが発生しても処理を継続
                     continue
             
-            # 生成ログ保存
+            # ピクセルアート後処理（プロジェクト共通パレットで減色）
+            if world_setting.art_style == "pixel":
+                self.postprocess_pixel_art(generated_assets, project_dir)
+            
+            # 生成ログ・品質評価保存
             self.file_manager.save_generation_log(generated_assets, project_dir)
+            if quality_scores:
+                self.file_manager.save_quality_evaluations(quality_scores, project_dir)
             
             print(f"世界観 '{world_setting.name}' の処理完了: {len(generated_assets)}個生成")
             print(f"出力フォルダ: {project_dir}")
@@ -337,6 +383,114 @@ class AssetPipeline:
         except Exception as e:
             raise GAAAGSError(f"世界観処理中にエラーが発生: {e}")
 
+    def generate_best_of_n(self, prompt: str, image_path: Path, world_setting: WorldSetting,
+                           candidates: int) -> Optional[AssetQualityScore]:
+        """複数候補を並列生成・評価し、最良の候補を image_path に採用
+        
+        候補は assets/candidates/ に保存（アーカイブ）する。
+        accept_score 以上の合格候補が出た時点で、未着手の候補はキャンセルする
+        （生成中の候補は完了を待って評価し、ログと比較の対象に含める）。
+        """
+        candidate_dir = image_path.parent / "candidates"
+        candidate_dir.mkdir(exist_ok=True)
+        parallelism = self.candidate_parallelism or math.ceil(candidates / 2)
+        
+        accepted = threading.Event()
+        
+        def generate_candidate(index: int) -> Optional[Tuple[Path, AssetQualityScore]]:
+            # 他の候補が合格済みならAPIを呼ばずに終了
+            if accepted.is_set():
+                return None
+            candidate_path = candidate_dir / f"{image_path.stem}_{index}.png"
+            if not self.image_generator.generate_image(prompt, candidate_path):
+                raise ImageGenerationError(f"候補{index}の生成に失敗")
+            score = self.quality_scorer.score_image(
+                str(candidate_path), world_setting.color_palette, f"{world_setting.name}_{image_path.stem}"
+            )
+            if self.is_acceptable(score):
+                accepted.set()
+            return candidate_path, score
+        
+        results = []
+        with ThreadPoolExecutor(max_workers=min(parallelism, candidates)) as executor:
+            futures = [executor.submit(generate_candidate, i) for i in range(1, candidates + 1)]
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  候補の生成に失敗: {e}")
+                    continue
+                if result is None:
+                    continue
+                
+                candidate_path, score = result
+                results.append((candidate_path, score))
+                print(f"  候補 {candidate_path.name}: {score.overall:.2f}")
+                if self.is_acceptable(score) and not any(f.cancelled() for f in futures):
+                    # 十分な候補が得られたので未着手の候補を打ち切る（生成中の候補は捨てずに待つ）
+                    cancelled = sum(f.cancel() for f in futures)
+                    if cancelled:
+                        print(f"  合格候補が得られたため残り{cancelled}件をキャンセル")
+        
+        if not results:
+            return None
+        
+        best_path, best_score = max(results, key=lambda item: (item[1].passed, item[1].overall))
+        shutil.copyfile(best_path, image_path)
+        best_score.image_path = str(image_path)
+        print(f"  採用: {best_path.name} ({len(results)}候補中)")
+        return best_score
+    
+    def postprocess_pixel_art(self, assets: List[GeneratedAsset], project_dir: Path):
+        """生成済みアセットをピクセルアート化して pixel_assets/ に保存（pixel_palette があればそのパレットを使う）"""
+        image_paths = [asset.image_path for asset in assets if asset.status == "generated"]
+        if not image_paths:
+            return
+        
+        try:
+            print(f"ピクセルアート後処理中... ({len(image_paths)}個)")
+            result = self.pixel_processor.process_project(image_paths, project_dir / "pixel_assets",
+                                                          palette=self.pixel_palette)
+            print(f"✓ ピクセルアート化完了: {len(result.palette)}色パレット")
+        except Exception as e:
+            # 後処理の失敗で生成結果は失わない
+            print(f"✗ ピクセルアート後処理に失敗: {e}")
+    
+    def use_pixel_palette(self, palette_path: str):
+        """ピクセルアート化で再利用する palette.json を読み込む
+        
+        生成を始める前に呼び、色数やグリッドサイズが合わないファイルは ConfigurationError にする
+        （生成後の後処理で失敗してピクセルアートが失われないように）。
+        """
+        try:
+            self.pixel_palette = load_palette(palette_path, grid_size=self.pixel_processor.grid_size)
+        except (OSError, ValueError) as e:
+            raise ConfigurationError(f"パレットを読み込めません: {e}")
+    
+    def is_acceptable(self, score: AssetQualityScore) -> bool:
+        """候補の探索を打ち切ってよい品質か判定"""
+        return score.passed and score.overall >= self.accept_score
+    
+    def evaluate_asset(self, asset: GeneratedAsset,
+                       score: Optional[AssetQualityScore] = None) -> Optional[AssetQualityScore]:
+        """生成画像を自動評価してアセットに結果を反映（評価済みの場合は結果のみ反映）"""
+        if score is None:
+            try:
+                score = self.quality_scorer.score_image(
+                    asset.image_path, asset.world_setting.color_palette, asset.id
+                )
+            except Exception as e:
+                # 評価の失敗で生成処理は止めない
+                print(f"  品質評価に失敗: {e}")
+                return None
+        
+        asset.quality_score = score.overall
+        asset.quality_passed = score.passed
+        print(f"  品質スコア: {score.overall:.2f} ({'合格' if score.passed else '要確認'})")
+        return score
+
 class InteractiveConfig:
     """対話式設定"""
     
@@ -414,6 +568,12 @@ def main():
         parser.add_argument("--name", help="プロジェクト名")
         parser.add_argument("--output", default="mvp_output",
                           help="出力ディレクトリ")
+        parser.add_argument("--art-style", choices=["realistic", "cartoon", "pixel"],
+                          help="アートスタイル（pixel でピクセルアート後処理を実行）")
+        parser.add_argument("--candidates", type=int, default=1,
+                          help="アセットごとの生成候補数（2以上で最良の1枚を自動採用）")
+        parser.add_argument("--palette",
+                          help="ピクセルアート化で再利用する palette.json（省略時はアセットから作成）")
         args = parser.parse_args()
         
         # API key設定（環境変数から取得）
@@ -423,6 +583,8 @@ def main():
         
         # パイプライン初期化
         pipeline = AssetPipeline(API_KEY)
+        if args.palette:
+            pipeline.use_pixel_palette(args.palette)
         
         # 世界観設定
         if args.world and args.name:
@@ -440,9 +602,12 @@ def main():
             config = InteractiveConfig()
             world_setting = config.configure()
         
+        if args.art_style:
+            world_setting.art_style = args.art_style
+        
         # アセット生成実行
         print("\n生成開始...")
-        assets = pipeline.process_world(world_setting)
+        assets = pipeline.process_world(world_setting, candidates=args.candidates)
         
         # 結果表示
         print(f"\n=== 生成結果 ===")
@@ -1,14 +1,85 @@
 
 import bpy
 import bmesh
+import json
 import os
 import sys
+import time
+from contextlib import contextmanager
 from mathutils import Vector
 
+# 進捗イベント行の接頭辞（変換側が1行ずつ読み取ってコールバックへ渡す）
+EVENT_PREFIX = "GAAAGS_EVENT "
+
+# 実行中のジョブの計測値（ジョブごとにリセットして応答に含める）
+STATS = {"stages": {}, "meshes": {}, "qualities": {}}
+
+def reset_stats():
+    """計測値をリセット"""
+    STATS.clear()
+    STATS.update({"stages": {}, "meshes": {}, "qualities": {}})
+
+def stats_for(quality=None):
+    """品質ごとの計測値（品質なしは全品質で共有する処理の計測値）"""
+    if quality is None:
+        return STATS
+    return STATS["qualities"].setdefault(quality, {"stages": {}, "meshes": {}})
+
+def emit(event, **fields):
+    """進捗イベントをJSONで1行出力"""
+    fields = {key: value for key, value in fields.items() if value is not None}
+    print(EVENT_PREFIX + json.dumps(dict(fields, event=event)), flush=True)
+
+@contextmanager
+def stage(name, **fields):
+    """処理段階の開始と終了（所要時間付き）を通知し、所要時間を計測値に加算"""
+    emit("stage_start", stage=name, **fields)
+    started = time.time()
+    yield
+    seconds = time.time() - started
+    stages = stats_for(fields.get('quality'))["stages"]
+    stages[name] = round(stages.get(name, 0.0) + seconds, 3)
+    emit("stage_end", stage=name, seconds=round(seconds, 3), **fields)
+
+def emit_poly_count(obj, quality=None, lod=None):
+    """オブジェクトの頂点数とポリゴン数を通知し、計測値に記録（LODなしは base）"""
+    vertices, faces = len(obj.data.vertices), len(obj.data.polygons)
+    stats_for(quality)["meshes"][lod or "base"] = {"vertices": vertices, "faces": faces}
+    emit("poly_count", object=obj.name, vertices=vertices, polygons=faces, quality=quality, lod=lod)
+
+# ジョブごとに解放するデータブロックの種類（どこからも参照されていないものを削除）
+ORPHAN_DATA = ("meshes", "materials", "textures", "images", "node_groups")
+
 def clear_scene():
-    """シーンをクリア"""
-    bpy.ops.object.select_all(action='SELECT')
-    bpy.ops.object.delete(use_global=False)
+    """シーンをクリア（オペレーターを使わずにオブジェクトを削除し、孤立したデータも破棄）"""
+    for obj in list(bpy.data.objects):
+        bpy.data.objects.remove(obj, do_unlink=True)
+    purge_orphans()
+
+def purge_orphans():
+    """利用者のいないデータブロックを削除（削除で新たに孤立したものも続けて削除）"""
+    removed = True
+    while removed:
+        removed = False
+        for name in ORPHAN_DATA:
+            blocks = getattr(bpy.data, name)
+            for block in [block for block in blocks if block.users == 0]:
+                blocks.remove(block)
+                removed = True
+
+def create_plane_mesh(name, size=2.0):
+    """bmeshでUV付きの正方形プレーン（XY平面、中心が原点、法線+Z）を作成"""
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    uv_layer = bm.loops.layers.uv.new("UVMap")
+    half = size / 2
+    corners = [(-half, -half), (half, -half), (half, half), (-half, half)]
+    face = bm.faces.new([bm.verts.new((x, y, 0.0)) for x, y in corners])
+    for loop, (x, y) in zip(face.loops, corners):
+        loop[uv_layer].uv = (x / size + 0.5, y / size + 0.5)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
 
 def create_plane_with_image(image_path, settings):
     """2D画像から3Dプレーンを作成"""
@@ -19,8 +90,8 @@ def create_plane_with_image(image_path, settings):
         return None
     
     # プレーン作成
-    bpy.ops.mesh.primitive_plane_add(size=2)
-    plane = bpy.context.active_object
+    plane = bpy.data.objects.new("Plane", create_plane_mesh("Plane"))
+    bpy.context.scene.collection.objects.link(plane)
     
     # マテリアル作成
     material = bpy.data.materials.new(name="ImageMaterial")
@@ -37,12 +108,15 @@ def create_plane_with_image(image_path, settings):
     # プリンシプルBSDFノード
     principled = nodes.new('ShaderNodeBsdfPrincipled')
     
-    # 画像テクスチャノード
-    image = bpy.data.images.load(image_path)
+    # 画像テクスチャノード（前処理済みのテクスチャがあればそれを使う）
+    color_texture = settings.get('color_texture')
+    image = bpy.data.images.load(color_texture or image_path, check_existing=True)
     
-    # テクスチャサイズの調整
-    if image.size[0] > settings.get('texture_size', 1024) or image.size[1] > settings.get('texture_size', 1024):
-        image.scale(settings.get('texture_size', 1024), settings.get('texture_size', 1024))
+    # テクスチャサイズの調整（前処理済みの場合は縮小済み）
+    texture_size = settings.get('texture_size', 1024)
+    if not color_texture and (image.size[0] > texture_size or image.size[1] > texture_size):
+        image.scale(texture_size, texture_size)
+    STATS["texture"] = {"width": image.size[0], "height": image.size[1]}
     
     image_node = nodes.new('ShaderNodeTexImage')
     image_node.image = image
@@ -56,47 +130,119 @@ def create_plane_with_image(image_path, settings):
     
     return plane
 
-def generate_lod(obj, quality_levels):
-    """LODを生成"""
+# LODレベルごとの縮小率（元のメッシュに対する比率）
+LOD_LEVELS = {
+    "high": 1.0,
+    "medium": 0.5,
+    "low": 0.25
+}
+
+# エクスポート形式ごとの拡張子
+MODEL_EXTENSIONS = {
+    "fbx": ".fbx",
+    "obj": ".obj",
+    "gltf": ".glb"
+}
+
+def duplicate_object(obj, name):
+    """メッシュデータごと独立した複製を作成"""
+    copy = obj.copy()
+    copy.data = obj.data.copy()
+    copy.name = name
+    for collection in obj.users_collection:
+        collection.objects.link(copy)
+    return copy
+
+def apply_modifiers(obj):
+    """スタック順に全ての修飾子を適用（評価済みメッシュでメッシュデータを置き換える）"""
+    if not obj.modifiers:
+        return
+    evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+    mesh = bpy.data.meshes.new_from_object(evaluated)
+    old_mesh = obj.data
+    for modifier in list(obj.modifiers):
+        obj.modifiers.remove(modifier)
+    obj.data = mesh
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+def generate_lod(obj, quality_levels, quality=None):
+    """LODを生成（各LODは元メッシュの独立した複製から縮小するので比率が累積しない）"""
     lods = []
-    original_poly_count = len(obj.data.polygons)
     
     for level, ratio in quality_levels.items():
-        if level == "high":
+        if ratio >= 1.0:
+            emit_poly_count(obj, quality=quality, lod=level)
             lods.append(obj)
             continue
-            
+    
+        lod = duplicate_object(obj, f"{obj.name}_{level}")
+        apply_modifiers(lod)
+    
         # デシメート修飾子でポリゴン数削減
-        decimate = obj.modifiers.new(name=f"Decimate_{level}", type='DECIMATE')
+        decimate = lod.modifiers.new(name=f"Decimate_{level}", type='DECIMATE')
         decimate.type = 'RATIO'
         decimate.ratio = ratio
-        
+    
         # 修飾子適用
-        bpy.context.view_layer.objects.active = obj
-        bpy.ops.object.modifier_apply(modifier=decimate.name)
-        
-        lods.append(obj)
+        apply_modifiers(lod)
+        emit_poly_count(lod, quality=quality, lod=level)
+    
+        lods.append(lod)
     
     return lods
 
-def apply_displacement_from_image(obj, image_path, strength=0.1):
-    """画像の明度に基づいてディスプレースメントを適用"""
+def subdivide_mesh(obj, levels=2):
+    """Catmull-Clark のサブディビジョンサーフェスで滑らかに分割（levels 回、UVも補間される）
     
-    # サブディビジョンサーフェス追加
+    SUBSURF 修飾子を追加し、オペレーターを使わずに apply_modifiers（new_from_object）で適用する。
+    """
     subdiv = obj.modifiers.new(name="Subdivision", type='SUBSURF')
-    subdiv.levels = 2
-    
-    # ディスプレースメント修飾子追加
-    displace = obj.modifiers.new(name="Displace", type='DISPLACE')
-    
-    # ディスプレースメント用テクスチャ作成
+    subdiv.levels = levels
+    apply_modifiers(obj)
+
+def load_displacement_texture(image_path):
+    """ディスプレースメント用テクスチャ作成"""
     texture = bpy.data.textures.new(name="DisplaceTexture", type='IMAGE')
-    texture.image = bpy.data.images.load(image_path)
-    
+    texture.image = bpy.data.images.load(image_path, check_existing=True)
+    return texture
+
+def add_displacement(obj, texture, strength=0.1):
+    """ディスプレースメント修飾子追加"""
+    displace = obj.modifiers.new(name="Displace", type='DISPLACE')
     displace.texture = texture
     displace.strength = strength
     displace.mid_level = 0.5
 
+def attach_normal_map(obj, normal_map_path):
+    """ベイク済みのノーマルマップをマテリアルに接続（ジオメトリは変形しない）"""
+    
+    # 複製元とマテリアルを共有しないようにコピーする
+    material = obj.data.materials[0].copy()
+    obj.data.materials[0] = material
+    
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+    principled = next(node for node in nodes if node.type == 'BSDF_PRINCIPLED')
+    
+    image = bpy.data.images.load(normal_map_path, check_existing=True)
+    image.colorspace_settings.name = 'Non-Color'
+    
+    image_node = nodes.new('ShaderNodeTexImage')
+    image_node.image = image
+    normal_node = nodes.new('ShaderNodeNormalMap')
+    
+    links.new(image_node.outputs['Color'], normal_node.inputs['Color'])
+    links.new(normal_node.outputs['Normal'], principled.inputs['Normal'])
+
+def apply_displacement_from_image(obj, image_path, strength=0.1):
+    """画像の明度に基づいてディスプレースメントを適用"""
+    with stage("subdivide"):
+        subdivide_mesh(obj)
+    with stage("displace"):
+        add_displacement(obj, load_displacement_texture(image_path), strength)
+        apply_modifiers(obj)
+
 def optimize_mesh(obj, poly_limit):
     """メッシュを最適化"""
     
@@ -110,97 +256,66 @@ def optimize_mesh(obj, poly_limit):
         decimate.ratio = poly_limit / current_polys
     
     # 修飾子適用
-    bpy.context.view_layer.objects.active = obj
-    bpy.ops.object.modifier_apply(modifier=decimate.name)
+    apply_modifiers(obj)
 
-def export_model(obj, output_path, format_type, generate_lod=False):
-    """モデルをエクスポート"""
+def export_object(obj, output_path, format_type):
+    """1つのオブジェクトを指定フォーマットでエクスポート"""
     
-    if generate_lod:
-        # LOD生成
-        quality_levels = {
-            "high": 1.0,
-            "medium": 0.5,
-            "low": 0.25
-        }
-        lods = generate_lod(obj, quality_levels)
-        
-        # 各LODをエクスポート
-        for level, lod_obj in zip(quality_levels.keys(), lods):
-            output_dir = os.path.dirname(output_path)
-            lod_path = os.path.join(output_dir, level, os.path.basename(output_path))
-            os.makedirs(os.path.dirname(lod_path), exist_ok=True)
-            
-            # オブジェクト選択
-            bpy.ops.object.select_all(action='DESELECT')
-            lod_obj.select_set(True)
-            bpy.context.view_layer.objects.active = lod_obj
-            
-            # フォーマットに応じてエクスポート
-            if format_type.lower() == 'fbx':
-                bpy.ops.export_scene.fbx(
-                    filepath=lod_path,
-                    use_selection=True,
-                    embed_textures=True
-                )
-            elif format_type.lower() == 'obj':
-                bpy.ops.export_scene.obj(
-                    filepath=lod_path,
-                    use_selection=True
-                )
-            elif format_type.lower() == 'gltf':
-                bpy.ops.export_scene.gltf(
-                    filepath=lod_path,
-                    use_selection=True,
-                    export_format='GLB'
-                )
-    else:
-        # 通常のエクスポート
-        bpy.ops.object.select_all(action='DESELECT')
-        obj.select_set(True)
-        bpy.context.view_layer.objects.active = obj
-        
-        if format_type.lower() == 'fbx':
-            bpy.ops.export_scene.fbx(
+    # エクスポート対象だけを選択（選択オペレーターは使わない）
+    for other in bpy.context.view_layer.objects:
+        other.select_set(other == obj)
+    bpy.context.view_layer.objects.active = obj
+    
+    # フォーマットに応じてエクスポート
+    if format_type.lower() == 'fbx':
+        bpy.ops.export_scene.fbx(
+            filepath=output_path,
+            use_selection=True,
+            embed_textures=True
+        )
+    elif format_type.lower() == 'obj':
+        if 'obj_export' in dir(bpy.ops.wm):
+            # Blender 3.2以降の新しいOBJエクスポーター（旧エクスポーターは4.0で削除）
+            bpy.ops.wm.obj_export(
                 filepath=output_path,
-                use_selection=True,
-                embed_textures=True
+                export_selected_objects=True
             )
-        elif format_type.lower() == 'obj':
+        else:
             bpy.ops.export_scene.obj(
                 filepath=output_path,
                 use_selection=True
             )
-        elif format_type.lower() == 'gltf':
-            bpy.ops.export_scene.gltf(
-                filepath=output_path,
-                use_selection=True,
-                export_format='GLB'
-            )
+    elif format_type.lower() == 'gltf':
+        bpy.ops.export_scene.gltf(
+            filepath=output_path,
+            use_selection=True,
+            export_format='GLB'
+        )
 
-def main():
-    """メイン処理"""
-    
-    # コマンドライン引数取得
-    if len(sys.argv) < 6:
-        print("Usage: blender --background --python script.py -- <image_path> <output_path> <settings_json>")
-        return
-    
-    # '--'以降の引数を取得
-    try:
-        separator_index = sys.argv.index('--')
-        args = sys.argv[separator_index + 1:]
-    except ValueError:
-        print("Arguments should be passed after '--'")
-        return
-    
-    image_path = args[0]
-    output_path = args[1]
-    settings_json = args[2]
+def lod_path(output_path, level):
+    """LODの出力パス（出力先フォルダ/LODレベル/ファイル名）"""
+    output_dir = os.path.dirname(output_path)
+    path = os.path.join(output_dir, level, os.path.basename(output_path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def export_model(obj, output_path, format_type, with_lod=False):
+    """モデルをエクスポート"""
     
-    # 設定読み込み
-    import json
-    settings = json.loads(settings_json)
+    if with_lod:
+        # LOD生成して各LODをエクスポート
+        with stage("lod"):
+            lods = generate_lod(obj, LOD_LEVELS)
+        with stage("export", path=output_path):
+            for level, lod_obj in zip(LOD_LEVELS.keys(), lods):
+                export_object(lod_obj, lod_path(output_path, level), format_type)
+    else:
+        # 通常のエクスポート
+        with stage("export", path=output_path):
+            export_object(obj, output_path, format_type)
+
+def convert(image_path, output_path, settings):
+    """1件の画像を変換してエクスポート（成功時True）"""
     
     print(f"Converting {image_path} to {output_path}")
     print(f"Settings: {settings}")
@@ -209,25 +324,194 @@ def main():
     clear_scene()
     
     # 2D画像から3Dモデル作成
-    obj = create_plane_with_image(image_path, settings)
+    with stage("load"):
+        obj = create_plane_with_image(image_path, settings)
     if not obj:
         print("Failed to create model")
-        return
+        return False
     
     # 品質に応じて処理を変更
-    if settings.get('quality') in ['medium', 'high']:
+    if settings.get('normal_map'):
+        # ノーマルマップで凹凸を表現（ローポリのまま）
+        with stage("normal_map"):
+            attach_normal_map(obj, settings['normal_map'])
+    elif settings.get('quality') in ['medium', 'high']:
         # ディスプレースメント適用
-        apply_displacement_from_image(obj, image_path, 
+        apply_displacement_from_image(obj, settings.get('displacement_texture', image_path),
                                     strength=settings.get('displacement_strength', 0.1))
     
     # メッシュ最適化
-    optimize_mesh(obj, settings.get('poly_count_limit', 5000))
+    with stage("decimate"):
+        optimize_mesh(obj, settings.get('poly_count_limit', 5000))
+    emit_poly_count(obj)
     
     # エクスポート
     export_model(obj, output_path, settings.get('export_format', 'fbx'),
-                generate_lod=settings.get('generate_lod', False))
+                with_lod=settings.get('generate_lod', False))
     
     print(f"Conversion completed: {output_path}")
+    return True
+
+def convert_all(image_path, output_dir, name, settings):
+    """1回のセッションで全品質・全LOD・全フォーマットを書き出す
+    
+    画像読み込み・プレーン作成・サブディビジョンは1度だけ行い、
+    品質ごとに独立した複製へディスプレースメントとデシメートを適用する。
+    戻り値は {品質: {フォーマット: 出力パス}}
+    """
+    
+    print(f"Converting {image_path} to {output_dir} (all qualities)")
+    print(f"Settings: {settings}")
+    
+    clear_scene()
+    
+    with stage("load"):
+        base = create_plane_with_image(image_path, settings)
+    if not base:
+        print("Failed to create model")
+        return {}
+    
+    qualities = settings.get('qualities', {})
+    formats = settings.get('formats', [settings.get('export_format', 'fbx')])
+    variants = {}
+    
+    # 低品質とノーマルマップを使う品質はディスプレースメントなしの平面から作る
+    for quality, quality_settings in qualities.items():
+        if quality == 'low' or quality_settings.get('normal_map'):
+            variants[quality] = duplicate_object(base, f"{name}_{quality}")
+            if quality_settings.get('normal_map'):
+                attach_normal_map(variants[quality], quality_settings['normal_map'])
+    
+    displaced = [quality for quality in qualities if quality not in variants]
+    if displaced:
+        # サブディビジョンとテクスチャ読み込みは全品質で共有
+        with stage("subdivide"):
+            subdivide_mesh(base)
+            texture = load_displacement_texture(settings.get('displacement_texture', image_path))
+        for quality in displaced:
+            with stage("displace", quality=quality):
+                obj = duplicate_object(base, f"{name}_{quality}")
+                add_displacement(obj, texture, qualities[quality].get('displacement_strength', 0.1))
+                apply_modifiers(obj)
+            variants[quality] = obj
+    
+    outputs = {}
+    for quality, obj in variants.items():
+        with stage("decimate", quality=quality):
+            optimize_mesh(obj, qualities[quality].get('poly_count_limit', 5000))
+        emit_poly_count(obj, quality=quality)
+    
+        # LODは品質ごとに1度だけ生成し、全フォーマットで使い回す
+        lods = []
+        if settings.get('generate_lod', False):
+            with stage("lod", quality=quality):
+                lods = generate_lod(obj, LOD_LEVELS, quality=quality)
+    
+        outputs[quality] = {}
+        for format_type in formats:
+            path = os.path.join(output_dir, quality,
+                                name + MODEL_EXTENSIONS.get(format_type.lower(), '.' + format_type))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with stage("export", quality=quality, path=path):
+                export_object(obj, path, format_type)
+                for level, lod_obj in zip(LOD_LEVELS.keys(), lods):
+                    export_object(lod_obj, lod_path(path, level), format_type)
+            outputs[quality][format_type] = path
+    
+    print(f"Conversion completed: {output_dir}")
+    return outputs
+
+# ワーカーモードで変換側へ返す応答行の接頭辞
+RESULT_PREFIX = "GAAAGS_RESULT "
+
+def respond(payload):
+    """変換側へJSON応答を1行で返す"""
+    print(RESULT_PREFIX + json.dumps(payload), flush=True)
+
+def handle_job(job):
+    """1件のジョブを実行して応答を返す"""
+    command = job.get("command", "convert")
+    reset_stats()
+    if command == "convert":
+        success = convert(job["image_path"], job["output_path"], job["settings"])
+        return {"status": "ok" if success else "error", "stats": STATS}
+    if command == "convert_all":
+        outputs = convert_all(job["image_path"], job["output_dir"], job["name"], job["settings"])
+        return {"status": "ok" if outputs else "error", "outputs": outputs, "stats": STATS}
+    return {"status": "error", "message": f"unknown command: {command}"}
+
+def serve():
+    """ワーカーモード: 標準入力からJSONジョブを1行ずつ受け取り、同じBlenderで変換し続ける"""
+    
+    respond({"status": "ready"})
+    
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            job = json.loads(line)
+        except ValueError as e:
+            respond({"status": "error", "message": f"invalid job: {e}"})
+            continue
+        
+        command = job.get("command", "convert")
+        if command == "ping":
+            respond({"id": job.get("id"), "status": "ok"})
+            continue
+        if command == "shutdown":
+            respond({"id": job.get("id"), "status": "ok"})
+            break
+        
+        try:
+            respond(dict(handle_job(job), id=job.get("id")))
+        except Exception as e:
+            respond({"id": job.get("id"), "status": "error", "message": str(e)})
+        finally:
+            # 次のジョブに備えてシーンをリセット
+            clear_scene()
+
+def main():
+    """メイン処理"""
+    
+    # '--'以降の引数を取得
+    try:
+        separator_index = sys.argv.index('--')
+        args = sys.argv[separator_index + 1:]
+    except ValueError:
+        print("Arguments should be passed after '--'")
+        return
+    
+    # 常駐ワーカーモード
+    if args and args[0] == '--serve':
+        serve()
+        return
+    
+    # JSONジョブを1件だけ実行するモード
+    if len(args) >= 2 and args[0] == '--job':
+        try:
+            respond(handle_job(json.loads(args[1])))
+        except Exception as e:
+            respond({"status": "error", "message": str(e)})
+            sys.exit(1)
+        return
+    
+    # コマンドライン引数取得
+    if len(args) < 3:
+        print("Usage: blender --background --python script.py -- <image_path> <output_path> <settings_json>")
+        print("       blender --background --python script.py -- --job <job_json>")
+        print("       blender --background --python script.py -- --serve")
+        return
+    
+    image_path = args[0]
+    output_path = args[1]
+    settings_json = args[2]
+    
+    # 設定読み込み
+    settings = json.loads(settings_json)
+    
+    convert(image_path, output_path, settings)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,201 @@
+"""
+GAAAGS 3D変換キャッシュ
+元画像の内容ハッシュ・変換設定・変換スクリプトのバージョンをキーに変換結果を保存し、
+同じ変換を繰り返さずに出力ファイルとメタデータを復元する（合計サイズで上限を設け、古いものから削除）
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# ハッシュ計算で一度に読み込むサイズ
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# キャッシュの既定の上限（バイト）
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+
+
+def file_hash(path: Path) -> str:
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def version_hash(paths: Iterable[Path]) -> str:
+    """変換に使うスクリプト群の内容からバージョン文字列を作成"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(Path(path).name.encode("utf-8"))
+        digest.update(Path(path).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class ConversionCache:
+    """変換結果のキャッシュ
+
+    エントリは cache_dir/entries/<キー>/ に出力ファイル（出力フォルダからの相対パス）と entry.json を保存する。
+    最終利用時刻はエントリフォルダの更新時刻で管理し、合計サイズが max_bytes を超えたら古いものから削除する。
+    画像のハッシュは (サイズ, 更新時刻) が変わらない限り hashes.json の値を再利用する。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.entries_dir = self.cache_dir / "entries"
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        self.hashes_path = self.cache_dir / "hashes.json"
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._hashes_dirty = False
+        self._hashes = self._load_hashes()
+        self._entries = self._scan_entries()
+
+    def _load_hashes(self) -> Dict[str, List]:
+        if not self.hashes_path.exists():
+            return {}
+        try:
+            with open(self.hashes_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _scan_entries(self) -> Dict[str, Dict]:
+        """既存エントリのサイズと最終利用時刻を読み込む（壊れたエントリは削除）"""
+        entries = {}
+        with os.scandir(self.entries_dir) as scan:
+            for item in scan:
+                entry_path = Path(item.path) / "entry.json"
+                if not item.is_dir() or not entry_path.exists():
+                    shutil.rmtree(item.path, ignore_errors=True)
+                    continue
+                try:
+                    with open(entry_path, "r", encoding="utf-8") as f:
+                        size = json.load(f)["size"]
+                except (OSError, ValueError, KeyError):
+                    shutil.rmtree(item.path, ignore_errors=True)
+                    continue
+                entries[item.name] = {"size": size, "last_used": item.stat().st_mtime}
+        return entries
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def image_hash(self, image_path: str) -> str:
+        """画像の内容ハッシュ（サイズと更新時刻が同じなら前回の値を使う）"""
+        path = str(Path(image_path).resolve())
+        stat = os.stat(path)
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = file_hash(Path(path))
+        with self._lock:
+            self._hashes[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            self._hashes_dirty = True
+        return digest
+
+    def key(self, image_path: str, output_name: str, settings: Dict, version: str) -> str:
+        """キャッシュキー（画像の内容・出力ファイル名・正規化した設定・スクリプトのバージョン）"""
+        payload = json.dumps({
+            "image": self.image_hash(image_path),
+            "output_name": output_name,
+            "settings": settings,
+            "version": version
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def restore(self, key: str, output_dir: Path) -> Optional[Dict]:
+        """キャッシュがあれば出力ファイルを output_dir にコピーし、保存時のメタデータを返す"""
+        entry_dir = self.entries_dir / key
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries[key]["last_used"] = time.time()
+
+        try:
+            with open(entry_dir / "entry.json", "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            for relative in entry["files"]:
+                target = Path(output_dir) / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(entry_dir / "files" / relative, target)
+            os.utime(entry_dir)
+        except (OSError, ValueError, KeyError):
+            # 他のプロセスに削除された場合などは再変換させる
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry["metadata"]
+
+    def store(self, key: str, output_dir: Path, files: Iterable[Path], metadata: Dict):
+        """変換結果を保存し、上限を超えた分を古いエントリから削除する"""
+        output_dir = Path(output_dir)
+        staging = self.entries_dir / f".{key}.{uuid.uuid4().hex}"
+        relatives, size = [], 0
+        for path in files:
+            relative = Path(path).relative_to(output_dir)
+            target = staging / "files" / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+            relatives.append(relative.as_posix())
+            size += target.stat().st_size
+
+        with open(staging / "entry.json", "w", encoding="utf-8") as f:
+            json.dump({"files": relatives, "size": size, "metadata": metadata,
+                       "created_at": time.time()}, f, ensure_ascii=False)
+
+        entry_dir = self.entries_dir / key
+        with self._lock:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(staging, entry_dir)
+            self._entries[key] = {"size": size, "last_used": time.time()}
+            self._evict()
+
+    def _evict(self):
+        """合計サイズが上限以下になるまで最終利用が古いエントリを削除（ロック内で呼ぶ）"""
+        total = self.total_bytes
+        for key in sorted(self._entries, key=lambda k: self._entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= self._entries.pop(key)["size"]
+            shutil.rmtree(self.entries_dir / key, ignore_errors=True)
+
+    def flush(self):
+        """画像ハッシュの記録を保存"""
+        with self._lock:
+            if not self._hashes_dirty:
+                return
+            hashes = dict(self._hashes)
+            self._hashes_dirty = False
+        temp_path = self.hashes_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(hashes, f)
+        os.replace(temp_path, self.hashes_path)
+
+    def stats(self) -> Dict:
+        """ヒット数・ミス数・エントリ数・合計サイズ"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "total_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes
+            }
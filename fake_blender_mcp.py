@@ -0,0 +1,323 @@
+"""
+GAAAGS ローカル用の blender-mcp 代替サーバー
+blender-mcp と同じツール名・引数・説明を持つMCPサーバー（stdio）。Blenderは使わず、
+メモリ上のシーンを更新して結果を返す。応答の遅延と失敗率を指定でき、
+3d_eval3 の会話ループをBlender・uvx なしで負荷試験・回帰テストするために使う。
+
+    python fake_blender_mcp.py --latency 0.05 --jitter 0.02 --failure-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+try:
+    from mcp.server.fastmcp import FastMCP
+except ImportError:
+    # mcp 2.x では FastMCP が MCPServer に改名された
+    from mcp.server.mcpserver import MCPServer as FastMCP
+
+
+@dataclass
+class FakeSettings:
+    """応答の遅延（秒）と失敗率"""
+    latency: float = 0.0
+    jitter: float = 0.0
+    failure_rate: float = 0.0
+    seed: Optional[int] = None
+    hyper3d_seconds: float = 0.0  # Hyper3D の生成にかかる時間
+
+
+settings = FakeSettings()
+rng = random.Random()
+
+# メモリ上のシーン（オブジェクト名 → 情報）と Hyper3D のジョブ（キー → 残りのポーリング回数と完了時刻）
+scene: Dict[str, Dict] = {}
+jobs: Dict[str, Dict] = {}
+
+# Hyper3D のジョブが完了するまでのポーリング回数（hyper3d_seconds も経過している必要がある）
+HYPER3D_POLLS = 2
+
+mcp = FastMCP("BlenderMCP", log_level="WARNING")
+
+
+async def simulate(tool: str):
+    """設定した遅延だけ待ち、失敗率に応じて例外を出す（MCPではis_errorの結果になる）"""
+    delay = settings.latency + rng.uniform(-settings.jitter, settings.jitter)
+    if delay > 0:
+        await asyncio.sleep(delay)
+    if settings.failure_rate and rng.random() < settings.failure_rate:
+        raise RuntimeError(f"{tool}: 疑似的な失敗（failure_rate={settings.failure_rate}）")
+
+
+def add_object(name: str, kind: str = "MESH") -> str:
+    """シーンにオブジェクトを追加（名前が重複したら番号を付ける）"""
+    base, index = name, 1
+    while name in scene:
+        name = f"{base}.{index:03d}"
+        index += 1
+    scene[name] = {"name": name, "type": kind, "location": [0.0, 0.0, 0.0], "materials": []}
+    return name
+
+
+@mcp.tool()
+async def get_scene_info() -> str:
+    """Get detailed information about the current Blender scene"""
+    await simulate("get_scene_info")
+    return json.dumps({
+        "name": "Scene",
+        "object_count": len(scene),
+        "objects": [{key: obj[key] for key in ("name", "type", "location")} for obj in scene.values()],
+        "materials_count": sum(len(obj["materials"]) for obj in scene.values())
+    }, indent=2)
+
+
+@mcp.tool()
+async def get_object_info(object_name: str) -> str:
+    """
+    Get detailed information about a specific object in the Blender scene.
+
+    Parameters:
+    - object_name: The name of the object to get information about
+    """
+    await simulate("get_object_info")
+    if object_name not in scene:
+        return f"Error getting object info: Object not found: {object_name}"
+    return json.dumps(scene[object_name], indent=2)
+
+
+@mcp.tool()
+async def execute_blender_code(code: str) -> str:
+    """
+    Execute arbitrary Python code in Blender. Make sure to do it step-by-step by breaking it into smaller chunks.
+
+    Parameters:
+    - code: The Python code to execute
+    """
+    await simulate("execute_blender_code")
+    try:
+        compile(code, "<blender>", "exec")
+    except SyntaxError as e:
+        return f"Error executing code: {e}"
+    # コードは実行せず、オブジェクトを作る呼び出しがあればシーンに追加する
+    if "primitive_" in code or "objects.new" in code:
+        add_object("Object")
+    return "Code executed successfully: "
+
+
+@mcp.tool()
+async def get_polyhaven_categories(asset_type: str = "hdris") -> str:
+    """
+    Get a list of categories for a specific asset type on Polyhaven.
+
+    Parameters:
+    - asset_type: The type of asset to get categories for (hdris, textures, models, all)
+    """
+    await simulate("get_polyhaven_categories")
+    return f"Categories for {asset_type}:\n- outdoor: 120\n- indoor: 80\n- natural: 64"
+
+
+@mcp.tool()
+async def search_polyhaven_assets(asset_type: str = "all", categories: Optional[str] = None) -> str:
+    """
+    Search for assets on Polyhaven with optional filtering.
+
+    Parameters:
+    - asset_type: Type of assets to search for (hdris, textures, models, all)
+    - categories: Optional comma-separated list of categories to filter by
+
+    Returns a list of matching assets with basic information.
+    """
+    await simulate("search_polyhaven_assets")
+    lines = [f"Found 3 assets (type={asset_type}, categories={categories}):"]
+    lines += [f"- rock_{i:02d} (ID: rock_{i:02d})" for i in range(3)]
+    return "\n".join(lines)
+
+
+@mcp.tool()
+async def download_polyhaven_asset(asset_id: str, asset_type: str, resolution: str = "1k",
+                                   file_format: Optional[str] = None) -> str:
+    """
+    Download and import a Polyhaven asset into Blender.
+
+    Parameters:
+    - asset_id: The ID of the asset to download
+    - asset_type: The type of asset (hdris, textures, models)
+    - resolution: The resolution to download (e.g., 1k, 2k, 4k)
+    - file_format: Optional file format (e.g., hdr, exr for HDRIs; jpg, png for textures; gltf, fbx for models)
+
+    Returns a message indicating success or failure.
+    """
+    await simulate("download_polyhaven_asset")
+    if asset_type == "models":
+        add_object(asset_id)
+    return f"Successfully imported {asset_type[:-1]} '{asset_id}' ({resolution})"
+
+
+@mcp.tool()
+async def set_texture(object_name: str, texture_id: str) -> str:
+    """
+    Apply a previously downloaded Polyhaven texture to an object.
+
+    Parameters:
+    - object_name: Name of the object to apply the texture to
+    - texture_id: ID of the Polyhaven texture to apply (must be downloaded first)
+
+    Returns a message indicating success or failure.
+    """
+    await simulate("set_texture")
+    if object_name not in scene:
+        return f"Texture application failed: Object not found: {object_name}"
+    scene[object_name]["materials"].append(texture_id)
+    return f"Successfully applied texture '{texture_id}' to {object_name}."
+
+
+@mcp.tool()
+async def get_polyhaven_status() -> str:
+    """
+    Check if PolyHaven integration is enabled in Blender.
+    Returns a message indicating whether PolyHaven features are available.
+    """
+    await simulate("get_polyhaven_status")
+    return "PolyHaven integration is enabled and ready to use."
+
+
+@mcp.tool()
+async def get_hyper3d_status() -> str:
+    """
+    Check if Hyper3D Rodin integration is enabled in Blender.
+    Returns a message indicating whether Hyper3D Rodin features are available.
+
+    Don't emphasize the key type in the returned message, but sliently remember it.
+    """
+    await simulate("get_hyper3d_status")
+    return "Hyper3D Rodin integration is enabled and ready to use. Mode: MAIN_SITE."
+
+
+def start_job() -> str:
+    """Hyper3D のジョブを登録"""
+    task_uuid = str(uuid.uuid4())
+    seconds = max(0.0, settings.hyper3d_seconds + rng.uniform(-settings.jitter, settings.jitter))
+    jobs[task_uuid] = {"polls": HYPER3D_POLLS, "ready_at": time.monotonic() + seconds}
+    return json.dumps({"task_uuid": task_uuid, "subscription_key": task_uuid})
+
+
+def job_done(job: Dict) -> bool:
+    """ポーリング回数と生成時間の両方を満たしたら完了"""
+    return job["polls"] == 0 and time.monotonic() >= job["ready_at"]
+
+
+@mcp.tool()
+async def generate_hyper3d_model_via_text(text_prompt: str, bbox_condition: Optional[List[float]] = None) -> str:
+    """
+    Generate 3D asset using Hyper3D by giving description of the desired asset, and import the asset into Blender.
+    The 3D asset has built-in materials.
+    The generated model has a normalized size, so re-scaling after generation can be useful.
+
+    Parameters:
+    - text_prompt: A short description of the desired model in **English**.
+    - bbox_condition: Optional. If given, it has to be a list of floats of length 3. Controls the ratio between [Length, Width, Height] of the model.
+
+    Returns a message indicating success or failure.
+    """
+    await simulate("generate_hyper3d_model_via_text")
+    return start_job()
+
+
+@mcp.tool()
+async def generate_hyper3d_model_via_images(input_image_paths: Optional[List[str]] = None,
+                                            input_image_urls: Optional[List[str]] = None,
+                                            bbox_condition: Optional[List[float]] = None) -> str:
+    """
+    Generate 3D asset using Hyper3D by giving images of the wanted asset, and import the generated asset into Blender.
+    The 3D asset has built-in materials.
+    The generated model has a normalized size, so re-scaling after generation can be useful.
+
+    Parameters:
+    - input_image_paths: The **absolute** paths of input images. Even if only one image is provided, wrap it into a list. Required if Hyper3D Rodin in MAIN_SITE mode.
+    - input_image_urls: The URLs of input images. Even if only one image is provided, wrap it into a list. Required if Hyper3D Rodin in FAL_AI mode.
+    - bbox_condition: Optional. If given, it has to be a list of ints of length 3. Controls the ratio between [Length, Width, Height] of the model.
+
+    Only one of {input_image_paths, input_image_urls} should be given at a time, depending on the Hyper3D Rodin's current mode.
+    Returns a message indicating success or failure.
+    """
+    await simulate("generate_hyper3d_model_via_images")
+    return start_job()
+
+
+@mcp.tool()
+async def poll_rodin_job_status(subscription_key: Optional[str] = None, request_id: Optional[str] = None) -> str:
+    """
+    Check if the Hyper3D Rodin generation task is completed.
+
+    For Hyper3D Rodin mode MAIN_SITE:
+        Parameters:
+        - subscription_key: The subscription_key given in the generate model step.
+
+        Returns a list of status. The task is done if all status are "Done".
+        If "Failed" showed up, the generating process failed.
+        This is a polling API, so only proceed if the status are finally determined ("Done" or "Canceled").
+
+    For Hyper3D Rodin mode FAL_AI:
+        Parameters:
+        - request_id: The request_id given in the generate model step.
+
+        Returns the generation task status. The task is done if status is "COMPLETED".
+        The task is in progress if status is "IN_PROGRESS".
+        If status other than "COMPLETED", "IN_PROGRESS", "IN_QUEUE" showed up, the generating process might be failed.
+        This is a polling API, so only proceed if the status are finally determined ("COMPLETED" or some failed state).
+    """
+    await simulate("poll_rodin_job_status")
+    key = subscription_key or request_id
+    if key not in jobs:
+        return json.dumps({"status_list": ["Failed"]})
+    job = jobs[key]
+    job["polls"] = max(0, job["polls"] - 1)
+    return json.dumps({"status_list": ["Done"] if job_done(job) else ["Generating"]})
+
+
+@mcp.tool()
+async def import_generated_asset(name: str, task_uuid: Optional[str] = None, request_id: Optional[str] = None) -> str:
+    """
+    Import the asset generated by Hyper3D Rodin after the generation task is completed.
+
+    Parameters:
+    - name: The name of the object in scene
+    - task_uuid: For Hyper3D Rodin mode MAIN_SITE: The task_uuid given in the generate model step.
+    - request_id: For Hyper3D Rodin mode FAL_AI: The request_id given in the generate model step.
+
+    Only give one of {task_uuid, request_id} based on the Hyper3D Rodin Mode!
+    Return if the asset has been imported successfully.
+    """
+    await simulate("import_generated_asset")
+    job = jobs.get(task_uuid or request_id)
+    if job is None or not job_done(job):
+        return json.dumps({"succeed": False, "error": "Task is not completed"})
+    return json.dumps({"succeed": True, "name": add_object(name)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="blender-mcp 代替サーバー（負荷試験用）")
+    parser.add_argument("--latency", type=float, default=0.0, help="ツール応答の遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延のばらつき（±秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="ツール呼び出しが失敗する確率")
+    parser.add_argument("--seed", type=int, help="乱数のシード")
+    parser.add_argument("--hyper3d-seconds", type=float, default=0.0, help="Hyper3D の生成にかかる時間（秒）")
+    args = parser.parse_args()
+
+    settings.latency = args.latency
+    settings.jitter = args.jitter
+    settings.failure_rate = args.failure_rate
+    settings.seed = args.seed
+    settings.hyper3d_seconds = args.hyper3d_seconds
+    rng.seed(args.seed)
+    mcp.run()
+
+
+if __name__ == "__main__":
+    main()
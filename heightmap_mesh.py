@@ -0,0 +1,632 @@
+"""
+GAAAGS ハイトマップメッシュ変換
+Blenderを使わずに画像からメッシュを作成し、GLB / OBJ を直接書き出す
+- plane: 輝度でディスプレースメントしたグリッドメッシュ
+- silhouette: 被写体の輪郭を押し出したメッシュ（背景にはポリゴンを使わない）
+"""
+
+import io
+import json
+import os
+import struct
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from mesh_simplify import simplify_levels
+from quality_scorer import load_image_array, subject_mask
+from surface_maps import bake_surface_maps
+
+# この変換で書き出せるフォーマット（fbx はBlenderで変換する）
+SUPPORTED_FORMATS = ("gltf", "obj")
+
+# LODレベルごとの縮小率（blender_mcp_script.py の LOD_LEVELS と同じ）
+LOD_LEVELS = {
+    "high": 1.0,
+    "medium": 0.5,
+    "low": 0.25
+}
+
+# メッシュの作り方
+MESH_MODES = ("plane", "silhouette")
+
+# 表面の凹凸の表現方法（displacement: ジオメトリ、normal_map: 平面＋ノーマルマップ・AO）
+SURFACE_DETAILS = ("displacement", "normal_map")
+
+# Blenderのディスプレースメント修飾子と同じ中間値
+MID_LEVEL = 0.5
+
+# 輪郭抽出に使う画像の長辺（ピクセル）
+SILHOUETTE_RESOLUTION = 256
+
+# 輪郭として残す最小面積（画像面積に対する比率）。これより小さい島はノイズとして捨てる
+MIN_ISLAND_RATIO = 0.001
+
+# glTF の定数
+GLB_MAGIC = b"glTF"
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+COMPONENT_FLOAT = 5126
+COMPONENT_UNSIGNED_SHORT = 5123
+COMPONENT_UNSIGNED_INT = 5125
+TARGET_ARRAY_BUFFER = 34962
+TARGET_ELEMENT_ARRAY_BUFFER = 34963
+
+
+@dataclass
+class HeightmapMesh:
+    """グリッドメッシュの頂点・インデックス配列（Y-up、glTFと同じUV原点=左上）"""
+    positions: np.ndarray  # (N, 3) float32
+    normals: np.ndarray  # (N, 3) float32
+    uvs: np.ndarray  # (N, 2) float32
+    indices: np.ndarray  # (M, 3) uint32
+
+    @property
+    def vertex_count(self) -> int:
+        return len(self.positions)
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.indices)
+
+
+def grid_cells(poly_limit: int, image_size: int) -> int:
+    """三角形数が poly_limit 以下になる1辺のセル数（画像の解像度は超えない）"""
+    cells = int(np.sqrt(max(poly_limit, 2) / 2))
+    return max(1, min(cells, image_size - 1))
+
+
+def sample_heights(image: Image.Image, cells: int) -> np.ndarray:
+    """輝度をグリッドの頂点数にリサンプリング（0〜1）"""
+    gray = image.convert("L").resize((cells + 1, cells + 1), Image.BILINEAR)
+    return np.asarray(gray, dtype=np.float32) / 255.0
+
+
+def build_grid(heights: np.ndarray, strength: float) -> HeightmapMesh:
+    """ハイトマップから2x2のプレーン（Blenderの primitive_plane_add(size=2) と同じ大きさ）を作成"""
+    rows, cols = heights.shape
+    v, u = np.meshgrid(np.linspace(0.0, 1.0, rows, dtype=np.float32),
+                       np.linspace(0.0, 1.0, cols, dtype=np.float32), indexing="ij")
+
+    # Blender座標（Z-up）で組み立ててから glTF / OBJ の Y-up に変換する
+    x = u * 2.0 - 1.0
+    y = 1.0 - v * 2.0
+    z = (heights - MID_LEVEL) * strength
+    positions = np.stack([x, z, -y], axis=-1).reshape(-1, 3)
+
+    # 法線は高さの勾配から求める（n = (-dz/dx, -dz/dy, 1)）
+    dz_dx = np.gradient(z, 2.0 / (cols - 1), axis=1)
+    dz_dy = -np.gradient(z, 2.0 / (rows - 1), axis=0)
+    normals = np.stack([-dz_dx, np.ones_like(z), dz_dy], axis=-1).reshape(-1, 3)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+    uvs = np.stack([u, v], axis=-1).reshape(-1, 2)
+
+    # 各セルを2つの三角形に分割（上から見て反時計回り）
+    index = np.arange(rows * cols, dtype=np.uint32).reshape(rows, cols)
+    a, b = index[:-1, :-1], index[1:, :-1]
+    c, d = index[1:, 1:], index[:-1, 1:]
+    indices = np.stack([a, b, c, a, c, d], axis=-1).reshape(-1, 3)
+
+    return HeightmapMesh(
+        positions=np.ascontiguousarray(positions, dtype="<f4"),
+        normals=np.ascontiguousarray(normals, dtype="<f4"),
+        uvs=np.ascontiguousarray(uvs, dtype="<f4"),
+        indices=indices,
+    )
+
+
+def simplify_mesh_levels(mesh: HeightmapMesh, ratios: Sequence[float]) -> List[Tuple[HeightmapMesh, float]]:
+    """QEMでLODを一括生成（頂点属性は残った頂点のものをそのまま使う）し、(メッシュ, 誤差) を返す"""
+    targets = [max(1, int(mesh.triangle_count * ratio)) for ratio in ratios]
+    levels = []
+    for simplified in simplify_levels(mesh.positions, mesh.indices, targets):
+        levels.append((HeightmapMesh(
+            positions=np.ascontiguousarray(mesh.positions[simplified.kept]),
+            normals=np.ascontiguousarray(mesh.normals[simplified.kept]),
+            uvs=np.ascontiguousarray(mesh.uvs[simplified.kept]),
+            indices=simplified.indices,
+        ), simplified.error))
+    return levels
+
+
+def build_mesh(image: Image.Image, poly_limit: int, strength: float) -> HeightmapMesh:
+    """画像から三角形数 poly_limit 以下のメッシュを作成（強度0なら1枚のプレーン）"""
+    cells = grid_cells(poly_limit, max(image.size)) if strength else 1
+    return build_grid(sample_heights(image, cells), strength)
+
+
+# マーチングスクエアの角と辺（セル内座標 x右・y上）。辺 i は角 i と角 i+1 を結ぶ（0=上 1=右 2=下 3=左）
+_CORNERS = np.array([[0, 1], [1, 1], [1, 0], [0, 0]], dtype=np.float32)  # 左上・右上・右下・左下
+_EDGE_POINTS = np.array([[0.5, 1], [1, 0.5], [0.5, 0], [0, 0.5]], dtype=np.float32)
+_CORNER_EDGES = [(3, 0), (0, 1), (1, 2), (2, 3)]  # 各角に接する2辺
+
+
+def _marching_squares_table() -> np.ndarray:
+    """ケース番号ごとの線分（開始辺, 終了辺）x2 を作成（被写体が進行方向の左側になる向き）"""
+    table = np.full((16, 2, 2), -1, dtype=np.int64)
+    for case in range(16):
+        inside = [corner for corner in range(4) if case >> (3 - corner) & 1]
+        # 両端の角の内外が異なる辺を輪郭が横切る
+        crossed = [edge for edge in range(4)
+                   if (edge in inside) != ((edge + 1) % 4 in inside)]
+        if len(crossed) == 2:
+            pairs = [(crossed, inside)]
+        elif len(crossed) == 4:
+            # 鞍点は被写体の角ごとに分離する
+            pairs = [(list(_CORNER_EDGES[corner]), [corner]) for corner in inside]
+        else:
+            continue
+        for slot, ((a, b), corners) in enumerate(pairs):
+            p, q = _EDGE_POINTS[a], _EDGE_POINTS[b]
+            center = _CORNERS[corners].mean(axis=0)
+            cross = (q - p)[0] * (center - p)[1] - (q - p)[1] * (center - p)[0]
+            table[case, slot] = (a, b) if cross > 0 else (b, a)
+    return table
+
+
+_SEGMENT_TABLE = _marching_squares_table()
+
+
+def trace_contours(mask: np.ndarray) -> List[np.ndarray]:
+    """マーチングスクエアで被写体の外周を抽出（(行, 列)の閉じた点列、穴は含めない）"""
+    height, width = mask.shape
+    padded = np.pad(mask, 1).astype(np.int64)
+    case = padded[:-1, :-1] << 3 | padded[:-1, 1:] << 2 | padded[1:, 1:] << 1 | padded[1:, :-1]
+
+    # 辺ID: 横の辺は (H+2)x(W+1)、縦の辺は (H+1)x(W+2) の通し番号
+    rows, cols = np.indices(case.shape)
+    horizontal = lambda r, c: r * (width + 1) + c
+    vertical = lambda r, c: (height + 2) * (width + 1) + r * (width + 2) + c
+    edge_ids = np.stack([horizontal(rows, cols), vertical(rows, cols + 1),
+                         horizontal(rows + 1, cols), vertical(rows, cols)])
+
+    starts, ends = [], []
+    for slot in range(2):
+        segments = _SEGMENT_TABLE[case, slot]
+        valid = segments[..., 0] >= 0
+        for endpoint, out in ((0, starts), (1, ends)):
+            kind = segments[..., endpoint][valid]
+            out.append(edge_ids[kind, rows[valid], cols[valid]])
+    starts, ends = np.concatenate(starts), np.concatenate(ends)
+    if len(starts) == 0:
+        return []
+
+    # 辺IDの座標（元画像のピクセル中心基準）
+    all_ids = np.arange(vertical(height + 1, 0))
+    is_vertical = all_ids >= vertical(0, 0)
+    local = np.where(is_vertical, all_ids - vertical(0, 0), all_ids)
+    stride = np.where(is_vertical, width + 2, width + 1)
+    edge_rows = local // stride - 1 + np.where(is_vertical, 0.5, 0.0)
+    edge_cols = local % stride - 1 + np.where(is_vertical, 0.0, 0.5)
+
+    # 各線分の終点から始まる線分をたどって閉路にする
+    order = np.argsort(starts)
+    following = order[np.searchsorted(starts[order], ends)]
+    visited = np.zeros(len(starts), dtype=bool)
+    contours = []
+    for first in range(len(starts)):
+        if visited[first]:
+            continue
+        loop = []
+        segment = first
+        while not visited[segment]:
+            visited[segment] = True
+            loop.append(starts[segment])
+            segment = following[segment]
+        ids = np.array(loop)
+        points = np.stack([edge_rows[ids], edge_cols[ids]], axis=1)
+        # 外周は反時計回り（y上向き）なので面積が正、穴は負
+        if polygon_area(to_xy(points)) > 0:
+            contours.append(points)
+    return contours
+
+
+def to_xy(points: np.ndarray) -> np.ndarray:
+    """(行, 列) を y上向きの (x, y) に変換"""
+    return np.stack([points[:, 1], -points[:, 0]], axis=1)
+
+
+def polygon_area(xy: np.ndarray) -> float:
+    """符号付き面積（反時計回りが正）"""
+    x, y = xy[:, 0], xy[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker法で開いた点列を簡略化（両端は残す）"""
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, direction = points[first], points[last] - points[first]
+        offsets = points[first + 1:last] - start
+        length = np.hypot(*direction)
+        if length > 0:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        index = int(distances.argmax())
+        if distances[index] > tolerance:
+            split = first + 1 + index
+            keep[split] = True
+            stack.extend([(first, split), (split, last)])
+    return points[keep]
+
+
+def simplify_contour(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """閉じた輪郭を簡略化（最も遠い2点で分割してからDouglas-Peucker）"""
+    far = int(np.hypot(*(points - points[0]).T).argmax())
+    first = simplify_polyline(points[:far + 1], tolerance)
+    second = simplify_polyline(np.vstack([points[far:], points[:1]]), tolerance)
+    return np.vstack([first, second[1:-1]])
+
+
+def triangulate_polygon(xy: np.ndarray) -> np.ndarray:
+    """耳刈り取り法で単純多角形（反時計回り）を三角形分割
+
+    隣り合わない耳はまとめて刈り取り、耳の判定は凹頂点に対してベクトル化して行う。
+    """
+    remaining = np.arange(len(xy))
+    triangles = []
+    while len(remaining) > 3:
+        points = xy[remaining]
+        prev_points, next_points = np.roll(points, 1, axis=0), np.roll(points, -1, axis=0)
+        ab, bc = points - prev_points, next_points - points
+        cross = ab[:, 0] * bc[:, 1] - ab[:, 1] * bc[:, 0]
+        convex = cross > 1e-9
+        reflex = points[~convex]
+
+        ears = np.zeros(len(points), dtype=bool)
+        candidates = np.flatnonzero(convex)
+        if len(reflex) == 0:
+            ears[candidates] = True
+        elif len(candidates):
+            # 候補の三角形 (前, 自分, 次) の内側に凹頂点がないか（境界上も含む）
+            a = prev_points[candidates][:, None, :]
+            b = points[candidates][:, None, :]
+            c = next_points[candidates][:, None, :]
+            p = reflex[None, :, :]
+            d1 = (b[..., 0] - a[..., 0]) * (p[..., 1] - a[..., 1]) - (b[..., 1] - a[..., 1]) * (p[..., 0] - a[..., 0])
+            d2 = (c[..., 0] - b[..., 0]) * (p[..., 1] - b[..., 1]) - (c[..., 1] - b[..., 1]) * (p[..., 0] - b[..., 0])
+            d3 = (a[..., 0] - c[..., 0]) * (p[..., 1] - c[..., 1]) - (a[..., 1] - c[..., 1]) * (p[..., 0] - c[..., 0])
+            same = ((p == a) | (p == c)).all(axis=-1)
+            inside = (d1 >= 0) & (d2 >= 0) & (d3 >= 0) & ~same
+            ears[candidates[~inside.any(axis=1)]] = True
+
+        # 隣り合う耳は同時に刈り取らない
+        chosen = []
+        for index in np.flatnonzero(ears):
+            if chosen and index - chosen[-1] < 2:
+                continue
+            if chosen and index == len(points) - 1 and chosen[0] == 0:
+                continue
+            chosen.append(index)
+        if not chosen:
+            # 数値誤差で耳が見つからない場合は最も凸な頂点を刈り取る
+            chosen = [int(cross.argmax())]
+
+        chosen = np.array(chosen[:len(remaining) - 3])
+        count = len(remaining)
+        triangles.append(np.stack([remaining[(chosen - 1) % count], remaining[chosen],
+                                   remaining[(chosen + 1) % count]], axis=1))
+        remaining = np.delete(remaining, chosen)
+
+    triangles.append(remaining[None, :])
+    return np.concatenate(triangles).astype(np.uint32)
+
+
+def extrude_polygons(polygons: List[np.ndarray], image_shape: tuple, thickness: float) -> HeightmapMesh:
+    """輪郭（ピクセル座標の(行, 列)）を2x2のプレーン上で三角形分割し、厚み方向に押し出す"""
+    height, width = image_shape
+    positions, normals, uvs, indices = [], [], [], []
+    offset = 0
+    half = thickness / 2.0
+
+    def add(p: np.ndarray, n: np.ndarray, uv: np.ndarray, tris: np.ndarray):
+        nonlocal offset
+        positions.append(p)
+        normals.append(np.broadcast_to(n, p.shape))
+        uvs.append(uv)
+        indices.append(tris + offset)
+        offset += len(p)
+
+    for points in polygons:
+        u = (points[:, 1] + 0.5) / width
+        v = (points[:, 0] + 0.5) / height
+        x, y = u * 2.0 - 1.0, 1.0 - v * 2.0
+        uv = np.stack([u, v], axis=1)
+        caps = triangulate_polygon(np.stack([x, y], axis=1))
+        count = len(points)
+
+        # 表（+Z）と裏（-Z、巻き順を反転）。Blender座標 (x, y, z) を Y-up の (x, z, -y) で格納
+        add(np.stack([x, np.full(count, half), -y], axis=1), np.array([0, 1, 0]), uv, caps)
+        add(np.stack([x, np.full(count, -half), -y], axis=1), np.array([0, -1, 0]), uv, caps[:, ::-1])
+
+        # 側面は辺ごとに4頂点（法線は辺の外向き）
+        following = np.roll(np.arange(count), -1)
+        dx, dy = x[following] - x, y[following] - y
+        length = np.maximum(np.hypot(dx, dy), 1e-12)
+        side_normal = np.stack([dy / length, np.zeros(count), dx / length], axis=1)  # (dy, -dx, 0) をY-upへ
+        corners = [(np.arange(count), half), (following, half), (following, -half), (np.arange(count), -half)]
+        side_positions = np.stack([np.stack([x[i], np.full(count, z), -y[i]], axis=1)
+                                   for i, z in corners], axis=1).reshape(-1, 3)
+        side_uvs = np.stack([uv[i] for i, _ in corners], axis=1).reshape(-1, 2)
+        base = np.arange(count)[:, None] * 4
+        side_tris = (base + np.array([[0, 3, 2, 0, 2, 1]])).reshape(-1, 3)
+        add(side_positions, np.repeat(side_normal, 4, axis=0), side_uvs, side_tris)
+
+    return HeightmapMesh(
+        positions=np.ascontiguousarray(np.concatenate(positions), dtype="<f4"),
+        normals=np.ascontiguousarray(np.concatenate(normals), dtype="<f4"),
+        uvs=np.ascontiguousarray(np.concatenate(uvs), dtype="<f4"),
+        indices=np.concatenate(indices).astype(np.uint32),
+    )
+
+
+def build_silhouette_mesh(image_path: str, poly_limit: int, thickness: float = 0.1) -> Optional[HeightmapMesh]:
+    """被写体の輪郭を押し出したメッシュを作成（被写体が見つからなければNone）
+
+    輪郭の頂点数 N に対して三角形数はおよそ 4N なので、
+    三角形数が poly_limit 以下になるまで簡略化の許容誤差を広げる。
+    """
+    rgb, alpha = load_image_array(image_path, SILHOUETTE_RESOLUTION)
+    mask = subject_mask(rgb, alpha)
+    min_area = MIN_ISLAND_RATIO * mask.size
+    contours = [c for c in trace_contours(mask) if polygon_area(to_xy(c)) >= min_area]
+    if not contours:
+        return None
+
+    tolerance = 0.5
+    while True:
+        polygons = [simplify_contour(c, tolerance) for c in contours]
+        polygons = [p for p in polygons if len(p) >= 3 and polygon_area(to_xy(p)) > 0]
+        triangles = sum(4 * len(p) - 4 for p in polygons)
+        if triangles <= poly_limit or tolerance > max(mask.shape):
+            break
+        tolerance *= 1.5
+
+    return extrude_polygons(polygons, mask.shape, thickness)
+
+
+@contextmanager
+def timed(stages: Dict[str, float], name: str):
+    """with ブロックの所要時間（秒）を stages[name] に加算"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = round(stages.get(name, 0.0) + time.perf_counter() - started, 4)
+
+
+def encode_texture(image_path: str, texture_size: int) -> bytes:
+    """埋め込み用のPNGを作成（サイズ内のPNGは再エンコードせずにそのまま使う）"""
+    with Image.open(image_path) as image:
+        if image.format == "PNG" and max(image.size) <= texture_size:
+            return Path(image_path).read_bytes()
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.thumbnail((texture_size, texture_size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+
+def _pad4(length: int) -> int:
+    return (4 - length % 4) % 4
+
+
+def write_glb(mesh: HeightmapMesh, output_path: str, texture_png: Optional[bytes] = None,
+              name: str = "mesh", surface_pngs: Optional[Dict[str, bytes]] = None):
+    """メッシュとテクスチャを1つのGLBに書き出す（配列はコピーせずにバイナリチャンクへ書き込む）
+
+    surface_pngs の normal / occlusion はマテリアルの normalTexture / occlusionTexture になる。
+    """
+    index_type = np.dtype("<u2") if mesh.vertex_count <= 0xFFFF else np.dtype("<u4")
+    indices = mesh.indices.astype(index_type, copy=False)
+
+    # 画像ごとのマテリアルのスロット
+    images = {}
+    if texture_png is not None:
+        images["baseColorTexture"] = texture_png
+    for key, slot in (("normal", "normalTexture"), ("occlusion", "occlusionTexture")):
+        if surface_pngs and key in surface_pngs:
+            images[slot] = surface_pngs[key]
+
+    blobs = [mesh.positions, mesh.normals, mesh.uvs, indices] + list(images.values())
+
+    buffer_views = []
+    offset = 0
+    for i, blob in enumerate(blobs):
+        length = len(memoryview(blob).cast("B"))
+        view = {"buffer": 0, "byteOffset": offset, "byteLength": length}
+        if i < 3:
+            view["target"] = TARGET_ARRAY_BUFFER
+        elif i == 3:
+            view["target"] = TARGET_ELEMENT_ARRAY_BUFFER
+        buffer_views.append(view)
+        offset += length + _pad4(length)
+
+    accessors = [
+        {"bufferView": 0, "componentType": COMPONENT_FLOAT, "count": mesh.vertex_count, "type": "VEC3",
+         "min": mesh.positions.min(axis=0).tolist(), "max": mesh.positions.max(axis=0).tolist()},
+        {"bufferView": 1, "componentType": COMPONENT_FLOAT, "count": mesh.vertex_count, "type": "VEC3"},
+        {"bufferView": 2, "componentType": COMPONENT_FLOAT, "count": mesh.vertex_count, "type": "VEC2"},
+        {"bufferView": 3, "count": indices.size, "type": "SCALAR",
+         "componentType": COMPONENT_UNSIGNED_SHORT if index_type.itemsize == 2 else COMPONENT_UNSIGNED_INT},
+    ]
+
+    material = {
+        "name": "ImageMaterial",
+        "pbrMetallicRoughness": {"metallicFactor": 0.0, "roughnessFactor": 0.5},
+        "doubleSided": True
+    }
+    gltf = {
+        "asset": {"version": "2.0", "generator": "GAAAGS heightmap_mesh"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0, "name": name}],
+        "meshes": [{"name": name, "primitives": [{
+            "attributes": {"POSITION": 0, "NORMAL": 1, "TEXCOORD_0": 2},
+            "indices": 3,
+            "material": 0
+        }]}],
+        "materials": [material],
+        "accessors": accessors,
+        "bufferViews": buffer_views,
+        "buffers": [{"byteLength": offset}]
+    }
+    for index, slot in enumerate(images):
+        if slot == "baseColorTexture":
+            material["pbrMetallicRoughness"][slot] = {"index": index}
+        else:
+            material[slot] = {"index": index}
+    if images:
+        gltf["textures"] = [{"sampler": 0, "source": index} for index in range(len(images))]
+        gltf["samplers"] = [{"magFilter": 9729, "minFilter": 9987}]
+        gltf["images"] = [{"bufferView": 4 + index, "mimeType": "image/png"} for index in range(len(images))]
+
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * _pad4(len(json_chunk))
+    total_length = 12 + 8 + len(json_chunk) + 8 + offset
+
+    with open(output_path, "wb") as f:
+        f.write(struct.pack("<4sII", GLB_MAGIC, 2, total_length))
+        f.write(struct.pack("<II", len(json_chunk), GLB_CHUNK_JSON))
+        f.write(json_chunk)
+        f.write(struct.pack("<II", offset, GLB_CHUNK_BIN))
+        for blob in blobs:
+            data = memoryview(blob).cast("B")
+            f.write(data)
+            f.write(b"\0" * _pad4(len(data)))
+
+
+def write_obj(mesh: HeightmapMesh, output_path: str, texture_path: Optional[str] = None,
+              name: str = "mesh", normal_map_path: Optional[str] = None):
+    """メッシュをOBJ（とテクスチャ参照用のMTL）に書き出す"""
+    output_path = Path(output_path)
+    mtl_path = output_path.with_suffix(".mtl")
+
+    with open(mtl_path, "w", encoding="utf-8") as f:
+        f.write("newmtl ImageMaterial\nKd 1.000000 1.000000 1.000000\n")
+        if texture_path:
+            f.write(f"map_Kd {os.path.relpath(texture_path, output_path.parent)}\n")
+        if normal_map_path:
+            f.write(f"map_Bump -bm 1.000000 {os.path.relpath(normal_map_path, output_path.parent)}\n")
+
+    # OBJのUV原点は左下
+    uvs = mesh.uvs.copy()
+    uvs[:, 1] = 1.0 - uvs[:, 1]
+    faces = np.repeat(mesh.indices.astype(np.int64) + 1, 3, axis=1)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(f"# GAAAGS heightmap_mesh\nmtllib {mtl_path.name}\no {name}\n")
+        f.write(("v %.6f %.6f %.6f\n" * mesh.vertex_count) % tuple(mesh.positions.ravel().tolist()))
+        f.write(("vt %.6f %.6f\n" * mesh.vertex_count) % tuple(uvs.ravel().tolist()))
+        f.write(("vn %.6f %.6f %.6f\n" * mesh.vertex_count) % tuple(mesh.normals.ravel().tolist()))
+        f.write("usemtl ImageMaterial\ns off\n")
+        f.write(("f %d/%d/%d %d/%d/%d %d/%d/%d\n" * mesh.triangle_count) % tuple(faces.ravel().tolist()))
+
+
+def lod_path(output_path: str, level: str) -> str:
+    """LODの出力パス（出力先フォルダ/LODレベル/ファイル名）"""
+    path = os.path.join(os.path.dirname(output_path), level, os.path.basename(output_path))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def convert_image(image_path: str, output_path: str, export_format: str = "gltf",
+                  poly_limit: int = 5000, displacement_strength: float = 0.1,
+                  texture_size: int = 1024, lod_levels: Optional[Dict[str, float]] = None,
+                  mesh_mode: str = "plane", thickness: float = 0.1,
+                  surface_detail: str = "displacement") -> Dict:
+    """画像を3Dモデルに変換して書き出す
+
+    plane モードで displacement_strength が0の場合はディスプレースメントなしの平面になる。
+    silhouette モードは被写体の輪郭を thickness の厚みで押し出す（被写体がなければ平面）。
+    surface_detail が normal_map の場合はメッシュを変形せず、displacement_strength 相当の
+    ノーマルマップとAOをマテリアルに付ける。
+    lod_levels を指定すると output_path と同じフォルダの <LODレベル>/ 以下にLODも書き出す。
+    LODは mesh_simplify のQEMで簡略化し、三角形数と元のメッシュからの誤差を lod_stats に返す。
+    戻り値は頂点数・三角形数・LODの出力パスと統計のほか、処理段階ごとの所要時間（stages）、
+    元のメッシュとLODの頂点数・面数（meshes）、テクスチャの大きさ（texture）。
+    """
+    export_format = export_format.lower()
+    if export_format not in SUPPORTED_FORMATS:
+        raise ValueError(f"未対応のエクスポート形式です: {export_format}")
+    if mesh_mode not in MESH_MODES:
+        raise ValueError(f"未対応のメッシュモードです: {mesh_mode}")
+    if surface_detail not in SURFACE_DETAILS:
+        raise ValueError(f"未対応の凹凸表現です: {surface_detail}")
+
+    name = Path(output_path).stem
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    stages: Dict[str, float] = {}
+
+    with timed(stages, "load"):
+        texture_png = encode_texture(image_path, texture_size)
+        texture_path = None
+        if export_format == "obj":
+            texture_path = str(Path(output_path).with_suffix(".png"))
+            Path(texture_path).write_bytes(texture_png)
+        with Image.open(image_path) as image:
+            image.load()
+        with Image.open(io.BytesIO(texture_png)) as texture:
+            texture_width, texture_height = texture.size
+
+    surface_pngs, surface_paths = {}, {}
+    if surface_detail == "normal_map" and displacement_strength:
+        with timed(stages, "surface_maps"):
+            maps = bake_surface_maps(image_path, texture_size, displacement_strength)
+            if export_format == "gltf":
+                surface_pngs = maps.png_bytes()
+            else:
+                surface_paths = maps.save(Path(output_path).parent, name)
+        displacement_strength = 0.0
+
+    def write(mesh: HeightmapMesh, path: str):
+        with timed(stages, "export"):
+            if export_format == "gltf":
+                write_glb(mesh, path, texture_png, name, surface_pngs)
+            else:
+                write_obj(mesh, path, texture_path, name, surface_paths.get("normal"))
+
+    mesh = None
+    if mesh_mode == "silhouette":
+        with timed(stages, "extrude"):
+            mesh = build_silhouette_mesh(image_path, poly_limit, thickness)
+    if mesh is None:
+        with timed(stages, "displace"):
+            mesh = build_mesh(image, poly_limit, displacement_strength if mesh_mode == "plane" else 0.0)
+    write(mesh, output_path)
+    meshes = {"base": {"vertices": mesh.vertex_count, "faces": mesh.triangle_count}}
+
+    # LODは元のメッシュを1回の縮約でまとめて簡略化する
+    lods, lod_stats = {}, {}
+    lod_levels = lod_levels or {}
+    simplified = []
+    if lod_levels:
+        with timed(stages, "lod"):
+            simplified = simplify_mesh_levels(mesh, list(lod_levels.values()))
+    for level, (lod, error) in zip(lod_levels, simplified):
+        lods[level] = lod_path(output_path, level)
+        write(lod, lods[level])
+        lod_stats[level] = {"triangle_count": lod.triangle_count, "error": round(error, 6)}
+        meshes[level] = {"vertices": lod.vertex_count, "faces": lod.triangle_count}
+
+    return {
+        "vertex_count": mesh.vertex_count,
+        "triangle_count": mesh.triangle_count,
+        "lods": lods,
+        "lod_stats": lod_stats,
+        "stages": stages,
+        "meshes": meshes,
+        "texture": {"width": texture_width, "height": texture_height}
+    }
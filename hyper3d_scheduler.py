@@ -0,0 +1,346 @@
+"""
+GAAAGS Hyper3D 生成ジョブのスケジューラ
+生成ジョブを同時実行数の上限まで投入し、1つのイベントループ上の1つのポーリングタスクで全ジョブの状態を確認する。
+完了したジョブはすぐに呼び出し元へ返すので、インポート・エクスポートを他のジョブの生成中に進められる。
+
+ポーリング間隔はジョブごとに min_interval から backoff 倍ずつ max_interval まで延ばし、
+完了したジョブの所要時間の中央値が分かれば、その時刻まで確認を待つ。
+
+    python hyper3d_scheduler.py items.yaml --max-in-flight 4 --server "python fake_blender_mcp.py --hyper3d-seconds 3"
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+# 既定の同時実行数・ポーリング間隔（秒）・タイムアウト（秒）
+DEFAULT_MAX_IN_FLIGHT = 4
+MIN_POLL_INTERVAL = 2.0
+MAX_POLL_INTERVAL = 30.0
+POLL_BACKOFF = 1.5
+DEFAULT_TIMEOUT = 300.0
+
+# 所要時間の見積もりに使う直近の完了ジョブ数
+DURATION_HISTORY = 20
+
+DONE_STATES = {"Done", "COMPLETED"}
+FAILED_STATES = {"Failed", "Canceled", "FAILED", "CANCELED", "ERROR"}
+
+
+class Hyper3DError(Exception):
+    """生成ジョブの投入・確認の失敗"""
+    pass
+
+
+@dataclass
+class Hyper3DJob:
+    """1つの生成ジョブ"""
+    name: str
+    prompt: str
+    task_uuid: Optional[str] = None
+    subscription_key: Optional[str] = None
+    request_id: Optional[str] = None
+    status: str = "pending"  # pending / running / done / failed
+    submitted_at: float = 0.0
+    finished_at: float = 0.0
+    polls: int = 0
+    error: Optional[str] = None
+    timeout: float = DEFAULT_TIMEOUT
+    interval: float = MIN_POLL_INTERVAL
+    next_poll: float = 0.0
+    future: Optional[asyncio.Future] = field(default=None, repr=False)
+
+    @property
+    def seconds(self) -> float:
+        """投入から完了までの時間"""
+        return round(self.finished_at - self.submitted_at, 3) if self.finished_at else 0.0
+
+    def poll_arguments(self) -> Dict:
+        """poll_rodin_job_status の引数（MAIN_SITE は subscription_key、FAL_AI は request_id）"""
+        if self.subscription_key:
+            return {"subscription_key": self.subscription_key}
+        return {"request_id": self.request_id}
+
+    def import_arguments(self) -> Dict:
+        """import_generated_asset の引数"""
+        if self.task_uuid:
+            return {"name": self.name, "task_uuid": self.task_uuid}
+        return {"name": self.name, "request_id": self.request_id}
+
+    def to_dict(self) -> Dict:
+        """レポート用"""
+        data = {key: value for key, value in asdict(self).items()
+                if key not in ("future", "interval", "next_poll", "submitted_at", "finished_at")}
+        data["seconds"] = self.seconds
+        return data
+
+
+def parse_status(text: str) -> List[str]:
+    """poll_rodin_job_status の結果から状態の一覧を取り出す"""
+    try:
+        status = json.loads(text)
+    except ValueError:
+        return [text.strip()]
+    if isinstance(status, list):
+        return [str(state) for state in status]
+    if isinstance(status, dict):
+        return [str(state) for state in status.get("status_list") or [status.get("status")]]
+    return [str(status)]
+
+
+class Hyper3DScheduler:
+    """Hyper3D の生成ジョブを投入し、まとめてポーリングする
+
+    max_in_flight は投入から完了までのジョブ数の上限。ポーリングは1つのタスクが担当し、
+    確認の時刻になったジョブだけをまとめて問い合わせる。
+    """
+
+    def __init__(self, session, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 min_interval: float = MIN_POLL_INTERVAL, max_interval: float = MAX_POLL_INTERVAL,
+                 backoff: float = POLL_BACKOFF, timeout: float = DEFAULT_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.session = session
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.timeout = timeout
+        self.clock = clock
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.poll_requests = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running: Dict[int, Hyper3DJob] = {}
+        self._durations: List[float] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    async def call(self, tool: str, arguments: Dict) -> str:
+        """ツールを呼び出してテキストを返す（エラーの結果は Hyper3DError にする）"""
+        result = await self.session.call_tool(tool, arguments)
+        text = "\n".join(getattr(item, "text", "") for item in getattr(result, "content", None) or [])
+        if getattr(result, "isError", None) or getattr(result, "is_error", False) or text.startswith("Error"):
+            raise Hyper3DError(f"{tool}: {text[:300]}")
+        return text
+
+    def _ensure_started(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+            self._wakeup = asyncio.Event()
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll_loop())
+
+    async def submit(self, name: str, prompt: str, timeout: Optional[float] = None,
+                     bbox_condition: Optional[List[float]] = None) -> Hyper3DJob:
+        """ジョブを投入する（実行中のジョブが上限に達していれば空くまで待つ）"""
+        self._ensure_started()
+        job = Hyper3DJob(name=name, prompt=prompt, timeout=timeout or self.timeout,
+                         future=asyncio.get_running_loop().create_future())
+        await self._slots.acquire()
+        arguments = {"text_prompt": prompt}
+        if bbox_condition:
+            arguments["bbox_condition"] = bbox_condition
+        try:
+            response = json.loads(await self.call("generate_hyper3d_model_via_text", arguments))
+        except (Hyper3DError, ValueError) as e:
+            self._finish(job, "failed", f"生成の依頼に失敗しました: {e}")
+            return job
+        except BaseException:
+            self._slots.release()
+            raise
+        job.task_uuid = response.get("task_uuid")
+        job.subscription_key = response.get("subscription_key")
+        job.request_id = response.get("request_id")
+        if not (job.subscription_key or job.request_id):
+            self._finish(job, "failed", f"生成の依頼に失敗しました: {response}")
+            return job
+
+        self.submitted += 1
+        job.status = "running"
+        job.submitted_at = self.clock()
+        job.interval = self.min_interval
+        job.next_poll = job.submitted_at + self._next_interval(job, job.submitted_at)
+        self._running[id(job)] = job
+        self._wakeup.set()
+        return job
+
+    async def wait(self, job: Hyper3DJob) -> Hyper3DJob:
+        """ジョブの完了を待つ（失敗したら Hyper3DError）"""
+        await job.future
+        if job.status == "failed":
+            raise Hyper3DError(f"{job.name}: {job.error}")
+        return job
+
+    async def generate(self, name: str, prompt: str, timeout: Optional[float] = None) -> Hyper3DJob:
+        """投入して完了まで待つ"""
+        return await self.wait(await self.submit(name, prompt, timeout))
+
+    async def generate_all(self, items: Iterable[Dict], timeout: Optional[float] = None) -> AsyncIterator[Hyper3DJob]:
+        """アイテム（name, prompt）のジョブを投入し、完了した順に返す（失敗したジョブも status="failed" で返す）"""
+        async def run(item):
+            job = await self.submit(item["name"], item["prompt"], timeout)
+            await job.future
+            return job
+
+        # アイテムの順に投入する（as_completed にコルーチンを渡すと順序が不定になる）
+        tasks = [asyncio.ensure_future(run(item)) for item in items]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _next_interval(self, job: Hyper3DJob, now: float) -> float:
+        """次の確認までの時間（間隔を延ばしつつ、見積もった完了時刻より前には確認しない）"""
+        interval = job.interval
+        job.interval = min(job.interval * self.backoff, self.max_interval)
+        if self._durations:
+            remaining = statistics.median(self._durations) - (now - job.submitted_at)
+            if remaining > interval:
+                interval = min(remaining, self.max_interval)
+        return interval
+
+    def _finish(self, job: Hyper3DJob, status: str, error: Optional[str] = None):
+        job.status = status
+        job.error = error
+        job.finished_at = self.clock() if job.submitted_at else 0.0
+        self._running.pop(id(job), None)
+        if status == "done":
+            self.completed += 1
+            self._durations = (self._durations + [job.finished_at - job.submitted_at])[-DURATION_HISTORY:]
+        else:
+            self.failed += 1
+        self._slots.release()
+        if not job.future.done():
+            job.future.set_result(job)
+
+    async def _poll(self, job: Hyper3DJob):
+        """1つのジョブの状態を確認して、完了・失敗・次の確認時刻を決める"""
+        job.polls += 1
+        self.poll_requests += 1
+        try:
+            states = parse_status(await self.call("poll_rodin_job_status", job.poll_arguments()))
+        except Exception as e:
+            # 確認の失敗（通信エラーを含む）は一時的なものとして扱い、タイムアウトまで確認を続ける
+            job.error = f"{type(e).__name__}: {e}"
+            states = []
+        now = self.clock()
+        if states and all(state in DONE_STATES for state in states):
+            self._finish(job, "done")
+        elif any(state in FAILED_STATES for state in states):
+            self._finish(job, "failed", f"Hyper3D の生成に失敗しました: {states}")
+        elif now - job.submitted_at > job.timeout:
+            self._finish(job, "failed", f"Hyper3D の生成がタイムアウトしました（{job.timeout}秒）")
+        else:
+            job.next_poll = now + self._next_interval(job, now)
+
+    async def _poll_loop(self):
+        try:
+            while True:
+                if not self._running:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                now = self.clock()
+                due = [job for job in self._running.values() if job.next_poll <= now]
+                if due:
+                    await asyncio.gather(*(self._poll(job) for job in due))
+                    continue
+                # 次の確認時刻まで、または新しいジョブが投入されるまで待つ
+                self._wakeup.clear()
+                delay = min(job.next_poll for job in self._running.values()) - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # ポーリングが止まったら、完了を待っているジョブが残らないよう全て失敗にする
+            for job in list(self._running.values()):
+                reason = f"（最後のエラー: {job.error}）" if job.error else ""
+                self._finish(job, "failed", f"ポーリングが停止しました{reason}")
+
+    async def close(self):
+        """ポーリングを止め、実行中のジョブを失敗にする"""
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        for job in list(self._running.values()):
+            self._finish(job, "failed", "スケジューラを終了しました")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    def stats(self) -> Dict:
+        """投入・完了・失敗したジョブ数とポーリング回数"""
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": len(self._running),
+            "poll_requests": self.poll_requests,
+            "median_seconds": round(statistics.median(self._durations), 3) if self._durations else None
+        }
+
+
+async def generate_items(items: List[Dict], server_command: str = "uvx blender-mcp",
+                         max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, min_interval: float = MIN_POLL_INTERVAL,
+                         timeout: float = DEFAULT_TIMEOUT, import_assets: bool = True) -> Dict:
+    """blender-mcp に接続してアイテムを生成し、完了した順にインポートする"""
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    command, *args = server_command.split()
+    started = time.perf_counter()
+    jobs = []
+    async with stdio_client(StdioServerParameters(command=command, args=args)) as (r, w):
+        async with ClientSession(r, w) as session:
+            await session.initialize()
+            async with Hyper3DScheduler(session, max_in_flight, min_interval, timeout=timeout) as scheduler:
+                async for job in scheduler.generate_all(items):
+                    if job.status == "done" and import_assets:
+                        await scheduler.call("import_generated_asset", job.import_arguments())
+                    mark = "✓" if job.status == "done" else "✗"
+                    print(f"{mark} {job.name} ({job.seconds}秒, 確認 {job.polls}回)"
+                          + (f": {job.error}" if job.status == "failed" else ""))
+                    jobs.append(job.to_dict())
+                stats = scheduler.stats()
+    return {"elapsed_seconds": round(time.perf_counter() - started, 3), "jobs": jobs, **stats}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Hyper3D の生成ジョブを並列に実行")
+    parser.add_argument("items", nargs="?", default="items.yaml", help="アイテムリスト（items.yaml）")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="同時に生成するジョブ数")
+    parser.add_argument("--min-interval", type=float, default=MIN_POLL_INTERVAL, help="最短のポーリング間隔（秒）")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="1ジョブのタイムアウト（秒）")
+    parser.add_argument("--server", default="uvx blender-mcp", help="blender-mcp の起動コマンド")
+    parser.add_argument("--no-import", action="store_true", help="生成だけ行いインポートしない")
+    parser.add_argument("--report", help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+
+    with open(args.items, "r", encoding="utf-8") as f:
+        items = yaml.safe_load(f)["items"]
+    result = asyncio.run(generate_items(items, args.server, args.max_in_flight, args.min_interval,
+                                        args.timeout, not args.no_import))
+    print(f"\n完了 {result['completed']} / 失敗 {result['failed']}（{result['elapsed_seconds']}秒, "
+          f"確認 {result['poll_requests']}回）")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
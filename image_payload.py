@@ -0,0 +1,179 @@
+"""
+GAAAGS Claudeへ送る画像の前処理
+モデルが使える解像度まで縮小し、PNG/JPEG のうち小さい方で再エンコードして正しい media_type を付ける。
+結果は画像の内容ハッシュと設定をキーにキャッシュし、同じ画像を再送するときはエンコードし直さない
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from PIL import Image
+
+from conversion_cache import file_hash
+
+# Claudeの画像入力で縮小されずに使われる大きさ（長辺と総画素数）
+MAX_EDGE = 1568
+MAX_PIXELS = 1_150_000
+
+# JPEG の品質と、JPEG を選ぶのに必要な縮小率（PNGに対して）
+JPEG_QUALITY = 90
+JPEG_MIN_SAVING = 0.7
+
+# 元ファイルをそのまま送れる形式
+MEDIA_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "GIF": "image/gif"}
+
+# エンコード方法が変わったらキャッシュを無効にするためのバージョン
+PAYLOAD_VERSION = 1
+
+
+@dataclass
+class ImagePayload:
+    """base64 エンコード済みの画像"""
+    data: str
+    media_type: str
+    width: int
+    height: int
+    original_bytes: int
+    encoded_bytes: int
+    seconds: float = 0.0
+    cached: bool = False
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.encoded_bytes
+
+    def summary(self) -> Dict:
+        """ログ・レポート用（画像データを除く）"""
+        return {key: value for key, value in asdict(self).items() if key != "data"}
+
+
+def target_size(width: int, height: int, max_edge: int = MAX_EDGE, max_pixels: int = MAX_PIXELS):
+    """長辺と総画素数の上限に収まる大きさ（縦横比を保つ）"""
+    scale = min(1.0, max_edge / max(width, height), (max_pixels / (width * height)) ** 0.5)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def has_transparency(image: Image.Image) -> bool:
+    """実際に透明な画素があるか"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        return image.convert("RGBA").getchannel("A").getextrema()[0] < 255
+    return False
+
+
+def encode_image(path: str, max_edge: int = MAX_EDGE, max_pixels: int = MAX_PIXELS) -> ImagePayload:
+    """画像を縮小・再エンコードして base64 にする
+
+    透明な画素があればPNG、なければPNGとJPEGを比べてJPEGが十分小さい場合だけJPEG（ピクセルアートはPNGのまま）。
+    縮小が不要で元ファイルの方が小さければ、元ファイルをそのまま使う。
+    """
+    started = time.perf_counter()
+    raw = Path(path).read_bytes()
+    with Image.open(io.BytesIO(raw)) as image:
+        source_format = image.format
+        size = target_size(image.width, image.height, max_edge, max_pixels)
+        resized = size != image.size
+        transparent = has_transparency(image)
+        image = image.convert("RGBA" if transparent else "RGB")
+        if resized:
+            image = image.resize(size, Image.LANCZOS)
+
+    candidates = {}
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    candidates["image/png"] = buffer.getvalue()
+    if not transparent:
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        if len(buffer.getvalue()) < len(candidates["image/png"]) * JPEG_MIN_SAVING:
+            candidates = {"image/jpeg": buffer.getvalue()}
+    media_type, encoded = min(candidates.items(), key=lambda item: len(item[1]))
+    if not resized and source_format in MEDIA_TYPES and len(raw) <= len(encoded):
+        media_type, encoded = MEDIA_TYPES[source_format], raw
+
+    return ImagePayload(
+        data=base64.b64encode(encoded).decode(),
+        media_type=media_type,
+        width=size[0],
+        height=size[1],
+        original_bytes=len(raw),
+        encoded_bytes=len(encoded),
+        seconds=round(time.perf_counter() - started, 4)
+    )
+
+
+class ImagePayloadCache:
+    """エンコード済み画像のキャッシュ（メモリと cache_dir/<キー>.json）
+
+    キーは画像の内容ハッシュと縮小の設定。画像のハッシュは (パス, サイズ, 更新時刻) が同じ間はメモリ上の値を使う。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.hits = 0
+        self.misses = 0
+        self._memory: Dict[str, ImagePayload] = {}
+        self._hashes: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def key(self, path: str, max_edge: int, max_pixels: int) -> str:
+        """キャッシュキー"""
+        resolved = str(Path(path).resolve())
+        stat = os.stat(resolved)
+        with self._lock:
+            cached = self._hashes.get(resolved)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            digest = cached[2]
+        else:
+            digest = file_hash(Path(resolved))
+            with self._lock:
+                self._hashes[resolved] = (stat.st_size, stat.st_mtime_ns, digest)
+        payload = f"{digest}:{max_edge}:{max_pixels}:{PAYLOAD_VERSION}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self, key: str) -> Optional[ImagePayload]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.cache_dir / f"{key}.json", "r", encoding="utf-8") as f:
+                return ImagePayload(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def _save(self, key: str, payload: ImagePayload):
+        if self.cache_dir is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(payload), f)
+        os.replace(temp_path, self.cache_dir / f"{key}.json")
+
+    def get(self, path: str, max_edge: int = MAX_EDGE, max_pixels: int = MAX_PIXELS) -> ImagePayload:
+        """エンコード済みの画像を返す（キャッシュになければエンコードして保存）"""
+        started = time.perf_counter()
+        key = self.key(path, max_edge, max_pixels)
+        with self._lock:
+            payload = self._memory.get(key)
+        payload = payload or self._load(key)
+        if payload is not None:
+            with self._lock:
+                self._memory[key] = payload
+                self.hits += 1
+            return ImagePayload(**dict(asdict(payload), cached=True,
+                                       seconds=round(time.perf_counter() - started, 4)))
+
+        payload = encode_image(path, max_edge, max_pixels)
+        self._save(key, payload)
+        with self._lock:
+            self._memory[key] = payload
+            self.misses += 1
+        return payload
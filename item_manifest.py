@@ -0,0 +1,104 @@
+"""
+GAAAGS アイテム生成のマニフェスト
+items.yaml のアイテムごとに、prompt・metadata・エクスポート設定のハッシュと、書き出したファイルのパスとハッシュを記録する。
+内容が変わっておらず、書き出したファイルが残っていて内容も一致するアイテムは、次回の実行で生成・エクスポートを省略できる
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+from conversion_cache import file_hash
+
+# 記録の形式やハッシュの対象が変わったら既存の記録を無効にするためのバージョン
+MANIFEST_VERSION = 1
+
+DEFAULT_MANIFEST_FILE = "generation_manifest.json"
+
+
+def item_fingerprint(item: Dict, settings: Dict) -> str:
+    """アイテムの名前・prompt・metadata と出力に影響する設定のハッシュ"""
+    payload = json.dumps({
+        "name": item.get("name"),
+        "prompt": item.get("prompt"),
+        "metadata": item.get("metadata"),
+        "settings": settings,
+        "version": MANIFEST_VERSION
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ItemManifest:
+    """アイテム名 → {fingerprint, output_path, output_hash, output_size, updated_at} の記録（JSONファイル）"""
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_FILE):
+        self.path = Path(path)
+        self.items: Dict[str, Dict] = self._load()
+        self.unchanged = 0
+        self.changed = 0
+        self._dirty = False
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("items", {})
+
+    def is_current(self, name: str, fingerprint: str) -> bool:
+        """前回と同じ内容で、書き出したファイルが残っていて内容も一致すれば True"""
+        entry = self.items.get(name)
+        current = False
+        if entry and entry.get("fingerprint") == fingerprint:
+            output = Path(entry.get("output_path", ""))
+            current = (output.is_file() and output.stat().st_size == entry.get("output_size")
+                       and file_hash(output) == entry.get("output_hash"))
+        if current:
+            self.unchanged += 1
+        else:
+            self.changed += 1
+        return current
+
+    def record(self, name: str, fingerprint: str, output_path: str) -> bool:
+        """書き出したファイルを記録する（ファイルが見つからなければ記録を消して False）"""
+        output = Path(output_path).expanduser()
+        if not output.is_file():
+            self.forget(name)
+            return False
+        self.items[name] = {
+            "fingerprint": fingerprint,
+            "output_path": str(output.resolve()),
+            "output_hash": file_hash(output),
+            "output_size": output.stat().st_size,
+            "updated_at": datetime.now().isoformat()
+        }
+        self._dirty = True
+        return True
+
+    def forget(self, name: str):
+        if self.items.pop(name, None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """変更があれば保存する（一時ファイルに書いてから置き換える）"""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "items": self.items}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+    def stats(self) -> Dict:
+        """変更なし・変更ありと判定したアイテム数と記録数"""
+        return {"unchanged": self.unchanged, "changed": self.changed, "recorded": len(self.items)}
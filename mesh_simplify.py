@@ -0,0 +1,207 @@
+"""
+GAAAGS メッシュ簡略化
+Blenderのデシメート修飾子を使わずに、二次誤差（QEM）に基づくエッジ縮約でNumPyの頂点・面配列を簡略化する
+- 縮約先は辺の端点のどちらか（頂点属性のUV・法線をそのまま使える）
+- 境界辺（UVの継ぎ目で頂点が分かれている辺を含む）には垂直な拘束平面を加えて形を保つ
+- 面の裏返りと非多様体になる縮約は行わない
+"""
+
+import heapq
+from dataclasses import dataclass
+from typing import List, Sequence, Set
+
+import numpy as np
+
+# 境界辺の拘束平面の重み（面の二次誤差に対する倍率）
+BOUNDARY_WEIGHT = 100.0
+
+# 縮約後の面の法線がこれより元の向きからずれる場合は裏返りとみなす（cos）
+FLIP_THRESHOLD = 0.2
+
+
+@dataclass
+class SimplifiedMesh:
+    """簡略化の結果"""
+    indices: np.ndarray  # (M, 3) 元の頂点配列の中での番号ではなく、kept で詰め直した番号
+    kept: np.ndarray  # 残った元の頂点番号（positions[kept] などで属性を取り出す）
+    error: float  # 縮約した頂点の元の面からの距離（RMS）の最大値（モデル座標の単位）
+
+    @property
+    def triangle_count(self) -> int:
+        return len(self.indices)
+
+
+def _cross(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(N, 3) 同士の外積（小さな配列では np.cross より速い）"""
+    return np.stack([a[:, 1] * b[:, 2] - a[:, 2] * b[:, 1],
+                     a[:, 2] * b[:, 0] - a[:, 0] * b[:, 2],
+                     a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]], axis=1)
+
+
+def face_quadrics(positions: np.ndarray, faces: np.ndarray):
+    """面ごとの平面の二次誤差行列（面積で重み付け）と面積、単位法線"""
+    a, b, c = positions[faces[:, 0]], positions[faces[:, 1]], positions[faces[:, 2]]
+    cross = np.cross(b - a, c - a)
+    double_area = np.linalg.norm(cross, axis=1)
+    normals = cross / np.maximum(double_area, 1e-20)[:, None]
+    planes = np.concatenate([normals, -(normals * a).sum(axis=1, keepdims=True)], axis=1)
+    area = double_area / 2.0
+    quadrics = area[:, None, None] * planes[:, :, None] * planes[:, None, :]
+    return quadrics, area, normals
+
+
+def boundary_quadrics(positions: np.ndarray, faces: np.ndarray, face_normals: np.ndarray,
+                      vertex_count: int):
+    """境界辺に沿った拘束平面の二次誤差を頂点ごとに集計"""
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    owner = np.tile(np.arange(len(faces)), 3)
+    keys = np.sort(edges, axis=1)
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    boundary = counts[inverse.ravel()] == 1
+
+    quadrics = np.zeros((vertex_count, 4, 4))
+    if boundary.any():
+        start, end = positions[edges[boundary, 0]], positions[edges[boundary, 1]]
+        direction = end - start
+        length_sq = (direction ** 2).sum(axis=1)
+        normals = np.cross(direction, face_normals[owner[boundary]])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-20)[:, None]
+        planes = np.concatenate([normals, -(normals * start).sum(axis=1, keepdims=True)], axis=1)
+        weighted = (BOUNDARY_WEIGHT * length_sq)[:, None, None] * planes[:, :, None] * planes[:, None, :]
+        np.add.at(quadrics, edges[boundary, 0], weighted)
+        np.add.at(quadrics, edges[boundary, 1], weighted)
+    return quadrics, np.unique(edges[boundary])
+
+
+def simplify(positions: np.ndarray, faces: np.ndarray, target_triangles: int) -> SimplifiedMesh:
+    """三角形数が target_triangles 以下になるまで、誤差の小さい辺から縮約する"""
+    return simplify_levels(positions, faces, [target_triangles])[0]
+
+
+def simplify_levels(positions: np.ndarray, faces: np.ndarray,
+                    targets: Sequence[int]) -> List[SimplifiedMesh]:
+    """1回の縮約の過程で、三角形数がそれぞれの目標以下になった時点の結果を取り出す（LOD一括生成用）
+
+    結果は targets と同じ順で、誤差は元のメッシュに対する値。
+    縮約できる辺がなくなった場合は目標より多い三角形数で返す。
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    vertex_count = len(positions)
+
+    quadrics, area, face_normals = face_quadrics(positions, faces)
+    surface_q = np.zeros((vertex_count, 4, 4))
+    np.add.at(surface_q, faces.ravel(), np.repeat(quadrics, 3, axis=0))
+    vertex_area = np.zeros(vertex_count)
+    np.add.at(vertex_area, faces.ravel(), np.repeat(area, 3))
+    # 縮約の順序は重み付きの境界の拘束込み、報告する誤差は重みなしで求める
+    extra_q, boundary_vertices = boundary_quadrics(positions, faces, face_normals, vertex_count)
+    vertex_q = surface_q + extra_q
+    error_q = surface_q + extra_q / BOUNDARY_WEIGHT
+    on_boundary = np.zeros(vertex_count, dtype=bool)
+    on_boundary[boundary_vertices] = True
+
+    homogeneous = np.concatenate([positions, np.ones((vertex_count, 1))], axis=1)
+    face_list = faces.tolist()
+    vertex_faces: List[Set[int]] = [set() for _ in range(vertex_count)]
+    for face, corners in enumerate(face_list):
+        for vertex in corners:
+            vertex_faces[vertex].add(face)
+    face_alive = np.ones(len(faces), dtype=bool)
+    alive_count = len(faces)
+    version = np.zeros(vertex_count, dtype=np.int64)
+
+    def collapse_costs(source: np.ndarray, target: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """source を target の位置へ縮約したときの二次誤差（面積あたり）"""
+        point = homogeneous[target]
+        costs = np.maximum(np.einsum("ni,nij,nj->n", point, q[source] + q[target], point), 0.0)
+        return costs / np.maximum(vertex_area[source] + vertex_area[target], 1e-20)
+
+    def neighbors(vertex: int) -> Set[int]:
+        return {v for f in vertex_faces[vertex] for v in face_list[f]} - {vertex}
+
+    def push(edges: np.ndarray):
+        """辺の両方向の縮約候補をまとめてヒープに入れる（境界の頂点は境界から動かさない）"""
+        for source, target in ((edges[:, 0], edges[:, 1]), (edges[:, 1], edges[:, 0])):
+            allowed = ~(on_boundary[source] & ~on_boundary[target])
+            source, target = source[allowed], target[allowed]
+            costs = collapse_costs(source, target, vertex_q)
+            for entry in zip(costs.tolist(), source.tolist(), target.tolist(),
+                             version[source].tolist(), version[target].tolist()):
+                heapq.heappush(heap, entry)
+
+    heap = []
+    push(np.unique(np.sort(np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]]),
+                           axis=1), axis=0))
+
+    def snapshot() -> SimplifiedMesh:
+        remaining = np.array(face_list, dtype=np.int64).reshape(-1, 3)[face_alive]
+        kept = np.unique(remaining)
+        remap = np.full(vertex_count, -1, dtype=np.int64)
+        remap[kept] = np.arange(len(kept))
+        return SimplifiedMesh(
+            indices=remap[remaining].astype(np.uint32),
+            kept=kept,
+            error=float(np.sqrt(max_error)),
+        )
+
+    results = {}
+    pending = sorted(set(targets), reverse=True)
+    max_error = 0.0
+    while pending:
+        if alive_count <= pending[0]:
+            results[pending.pop(0)] = snapshot()
+            continue
+        if not heap:
+            break
+        cost, source, target, source_version, target_version = heapq.heappop(heap)
+        if version[source] != source_version or version[target] != target_version:
+            continue
+        shared = vertex_faces[source] & vertex_faces[target]
+        if not shared:
+            continue
+
+        # 境界の頂点同士は境界辺に沿ってのみ縮約する（内部の辺で潰すと穴が閉じる）
+        if on_boundary[source] and on_boundary[target] and len(shared) != 1:
+            continue
+
+        # 多様体を保つ（共有する隣接頂点は縮約する辺の両側の面の頂点だけ）
+        if len(neighbors(source) & neighbors(target)) > len(shared):
+            continue
+
+        # 裏返りの確認
+        moved = list(vertex_faces[source] - shared)
+        if moved:
+            corners = np.array([face_list[f] for f in moved])
+            new_corners = np.where(corners == source, target, corners)
+            # 縮約前後の面の法線（前半が縮約前、後半が縮約後）
+            triangles = positions[np.concatenate([corners, new_corners])]
+            normals = _cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+            before, after = normals[:len(moved)], normals[len(moved):]
+            length = np.sqrt((before * before).sum(axis=1) * (after * after).sum(axis=1))
+            if (length <= 1e-20).any() or ((before * after).sum(axis=1) < FLIP_THRESHOLD * length).any():
+                continue
+            for face, corners in zip(moved, new_corners.tolist()):
+                face_list[face] = corners
+
+        max_error = max(max_error, float(collapse_costs(np.array([source]), np.array([target]), error_q)[0]))
+        for face in shared:
+            face_alive[face] = False
+            for vertex in face_list[face]:
+                vertex_faces[vertex].discard(face)
+        alive_count -= len(shared)
+        vertex_faces[target] |= set(moved)
+        vertex_faces[source] = set()
+        vertex_q[target] += vertex_q[source]
+        error_q[target] += error_q[source]
+        vertex_area[target] += vertex_area[source]
+        version[source] += 1
+        version[target] += 1
+
+        around = np.fromiter(neighbors(target), dtype=np.int64)
+        push(np.stack([around, np.full(len(around), target)], axis=1))
+
+    final = snapshot() if pending else None
+    for target in pending:
+        results[target] = final
+    return [results[target] for target in targets]
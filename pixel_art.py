@@ -0,0 +1,202 @@
+"""
+GAAAGS ピクセルアート後処理
+art_style が pixel の世界観向けに、ニアレストネイバー縮小とプロジェクト共通パレットへの減色を行う
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from quality_scorer import subject_mask
+
+# 背景色（パレットの0番に予約し、保存時は透過色にする）
+BACKGROUND_COLOR = (255, 255, 255)
+
+
+@dataclass
+class PixelArtResult:
+    """ピクセルアート後処理の結果"""
+    palette: List[Tuple[int, int, int]]  # 0番は背景色
+    output_paths: Dict[str, str]  # 元画像パス -> 出力パス
+    palette_path: str
+
+
+def downscale_nearest(image_path: str, grid_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """長辺が grid_size になるようニアレストネイバーで縮小し、RGB配列と被写体マスクを返す"""
+    with Image.open(image_path) as image:
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        scale = grid_size / max(image.size)
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        small = np.asarray(image.resize(size, Image.NEAREST), dtype=np.uint8)
+
+    rgb = small[..., :3]
+    alpha = small[..., 3].astype(np.float32) / 255.0 if has_alpha else None
+    mask = subject_mask(rgb.astype(np.float32) / 255.0, alpha)
+    return rgb, mask
+
+
+def kmeans_palette(pixels: np.ndarray, colors: int, iterations: int = 12, seed: int = 0) -> np.ndarray:
+    """ベクトル化したk-means（k-means++初期化）で代表色を求める"""
+    pixels = pixels.astype(np.float32)
+    if len(pixels) == 0:
+        return np.zeros((0, 3), dtype=np.uint8)
+    unique = np.unique(pixels, axis=0)
+    if len(unique) <= colors:
+        return unique.astype(np.uint8)
+
+    rng = np.random.default_rng(seed)
+    centers = np.empty((colors, 3), dtype=np.float32)
+    centers[0] = pixels[rng.integers(len(pixels))]
+    closest = ((pixels - centers[0]) ** 2).sum(axis=1)
+    for k in range(1, colors):
+        probabilities = closest / closest.sum() if closest.sum() > 0 else None
+        centers[k] = pixels[rng.choice(len(pixels), p=probabilities)]
+        closest = np.minimum(closest, ((pixels - centers[k]) ** 2).sum(axis=1))
+
+    for _ in range(iterations):
+        labels = nearest_palette_index(pixels, centers)
+        counts = np.bincount(labels, minlength=colors).astype(np.float32)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, pixels)
+        updated = np.where(counts[:, None] > 0, sums / np.maximum(counts, 1)[:, None], centers)
+        if np.allclose(updated, centers, atol=0.5):
+            centers = updated
+            break
+        centers = updated
+
+    return np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+
+
+def nearest_palette_index(pixels: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    """各ピクセルに最も近いパレット色のインデックスを返す"""
+    pixels = pixels.astype(np.float32)
+    palette = palette.astype(np.float32)
+    # |p - c|^2 = |p|^2 - 2 p・c + |c|^2（|p|^2 は比較に不要）
+    distances = -2.0 * pixels @ palette.T + (palette ** 2).sum(axis=1)
+    return distances.argmin(axis=1)
+
+
+def quantize_image(rgb: np.ndarray, mask: np.ndarray, palette: np.ndarray) -> Image.Image:
+    """共通パレットで減色したパレットモード(P)画像を作成（背景は0番）"""
+    indices = np.zeros(mask.shape, dtype=np.uint8)
+    if mask.any():
+        # 0番（背景色）を除いた色から最近傍を選ぶ
+        indices[mask] = nearest_palette_index(rgb[mask], palette[1:]) + 1
+
+    image = Image.fromarray(indices, mode="P")
+    image.putpalette(palette.astype(np.uint8).flatten().tolist())
+    return image
+
+
+def _downscale_job(job: Tuple[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """プロセスプールから呼ばれる縮小ジョブ"""
+    return downscale_nearest(*job)
+
+
+def _quantize_job(job: Tuple[np.ndarray, np.ndarray, np.ndarray, str]) -> str:
+    """プロセスプールから呼ばれる減色・保存ジョブ"""
+    rgb, mask, palette, output_path = job
+    quantize_image(rgb, mask, palette).save(output_path, optimize=True, transparency=0)
+    return output_path
+
+
+class PixelArtProcessor:
+    """ピクセルアート後処理"""
+
+    def __init__(self, grid_size: int = 64, palette_size: int = 16,
+                 max_workers: Optional[int] = None, sample_pixels: int = 50000):
+        self.grid_size = grid_size
+        self.palette_size = palette_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.sample_pixels = sample_pixels
+
+    def _map(self, func, jobs: list) -> list:
+        """ジョブ数に応じて直列またはプロセスプールで実行"""
+        if self.max_workers <= 1 or len(jobs) <= 2:
+            return [func(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            return list(executor.map(func, jobs))
+
+    def downscale_all(self, image_paths: Sequence[str]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """全アセットを並列でグリッドサイズに縮小"""
+        return self._map(_downscale_job, [(str(path), self.grid_size) for path in image_paths])
+
+    def fit_palette(self, downscaled: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        """全アセットの被写体ピクセルから共通パレットを1回だけ作成（0番は背景色）"""
+        pixels = [rgb[mask] for rgb, mask in downscaled if mask.any()]
+        pixels = np.concatenate(pixels) if pixels else np.zeros((0, 3), dtype=np.uint8)
+
+        if len(pixels) > self.sample_pixels:
+            rng = np.random.default_rng(0)
+            pixels = pixels[rng.choice(len(pixels), self.sample_pixels, replace=False)]
+
+        colors = kmeans_palette(pixels, self.palette_size - 1)
+        return np.vstack([np.array([BACKGROUND_COLOR], dtype=np.uint8), colors])
+
+    def process_project(self, image_paths: Sequence[str], output_dir: Path,
+                        palette: Optional[np.ndarray] = None) -> PixelArtResult:
+        """アセット一式を共通パレットでピクセルアート化して output_dir に保存"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        image_paths = [str(path) for path in image_paths]
+
+        downscaled = self.downscale_all(image_paths)
+        if palette is None:
+            palette = self.fit_palette(downscaled)
+
+        jobs = [
+            (rgb, mask, palette, str(output_dir / f"{Path(path).stem}.png"))
+            for path, (rgb, mask) in zip(image_paths, downscaled)
+        ]
+        output_paths = self._map(_quantize_job, jobs)
+
+        palette_colors = [tuple(int(c) for c in color) for color in palette]
+        palette_path = output_dir / "palette.json"
+        with open(palette_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "grid_size": self.grid_size,
+                "colors": ["#%02x%02x%02x" % color for color in palette_colors],
+            }, f, ensure_ascii=False, indent=2)
+
+        return PixelArtResult(
+            palette=palette_colors,
+            output_paths=dict(zip(image_paths, output_paths)),
+            palette_path=str(palette_path),
+        )
+
+
+# パレットの色数の範囲（0番の背景色 + 被写体の色1色以上、PNGのパレットは256色まで）
+MIN_PALETTE_COLORS = 2
+MAX_PALETTE_COLORS = 256
+
+
+def load_palette(palette_path: str, grid_size: Optional[int] = None) -> np.ndarray:
+    """palette.json からパレット配列を読み込む（0番は背景色として透過される）
+
+    色数が 2〜256 でない、色が #rrggbb 形式でない、grid_size を渡したときに
+    ファイルの grid_size と異なる場合は ValueError にする。
+    """
+    with open(palette_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    colors = data.get("colors") if isinstance(data, dict) else None
+    if not isinstance(colors, list) or not MIN_PALETTE_COLORS <= len(colors) <= MAX_PALETTE_COLORS:
+        raise ValueError(f"パレットは{MIN_PALETTE_COLORS}〜{MAX_PALETTE_COLORS}色で指定してください"
+                         f"（0番は背景色）: {palette_path}")
+    try:
+        palette = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in colors
+                            if isinstance(c, str) and len(c) == 7 and c[0] == "#"], dtype=np.uint8)
+    except ValueError:
+        palette = np.zeros((0, 3), dtype=np.uint8)
+    if len(palette) != len(colors):
+        raise ValueError(f"パレットの色は #rrggbb 形式で指定してください: {palette_path}")
+    if grid_size is not None and data.get("grid_size", grid_size) != grid_size:
+        raise ValueError(f"パレットのグリッドサイズ（{data['grid_size']}）が"
+                         f"後処理のグリッドサイズ（{grid_size}）と異なります: {palette_path}")
+    return palette
@@ -0,0 +1,383 @@
+"""
+GAAAGS 画像品質自動評価
+生成画像をNumPyでベクトル化して採点し、quality_evaluations テーブル形式の評価結果を作成
+"""
+
+import json
+import os
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# 評価基準（quality_criteria テーブルの行に対応）
+# threshold は個別基準の最低点（0.00-5.00）。下回ると不合格。
+QUALITY_CRITERIA = {
+    "sharpness": {
+        "criteria_id": "auto-sharpness",
+        "criteria_name": "シャープネス",
+        "category": "technical",
+        "weight": 1.00,
+        "threshold": 2.0,
+        "suggestion": "ぼやけています。プロンプトに 'sharp focus, detailed' を追加してください",
+    },
+    "background_purity": {
+        "criteria_id": "auto-background-purity",
+        "criteria_name": "背景の純度",
+        "category": "technical",
+        "weight": 1.00,
+        "threshold": 2.5,
+        "suggestion": "背景が白一色ではありません。'plain white background' を強調してください",
+    },
+    "subject_coverage": {
+        "criteria_id": "auto-subject-coverage",
+        "criteria_name": "被写体の占有率",
+        "category": "usability",
+        "weight": 0.75,
+        "threshold": 1.5,
+        "suggestion": "被写体が小さすぎるか大きすぎます。'full view, centered' を指定してください",
+    },
+    "subject_centering": {
+        "criteria_id": "auto-subject-centering",
+        "criteria_name": "被写体の中央配置",
+        "category": "usability",
+        "weight": 0.50,
+        "threshold": 1.5,
+        "suggestion": "被写体が中央からずれています",
+    },
+    "palette_adherence": {
+        "criteria_id": "auto-palette-adherence",
+        "criteria_name": "カラーパレット適合度",
+        "category": "consistency",
+        "weight": 0.75,
+        "threshold": 1.5,
+        "suggestion": "世界観のカラーパレットと色調が合っていません",
+    },
+}
+
+# WorldSetting.color_palette ごとの目標色調（HSVの明度・彩度の平均、任意で色相）
+PALETTE_TARGETS = {
+    "dark": {"value": 0.30, "saturation": 0.45},
+    "bright": {"value": 0.75, "saturation": 0.55},
+    "vibrant": {"value": 0.65, "saturation": 0.80},
+    "cool": {"value": 0.55, "saturation": 0.45, "hue": 0.58},
+    "natural": {"value": 0.55, "saturation": 0.35},
+}
+
+# 解析用の最大辺サイズ（これ以上は縮小してから評価）
+ANALYSIS_SIZE = 256
+# 背景とみなす色距離（0-1のRGB空間）
+BACKGROUND_TOLERANCE = 0.12
+# シャープネス満点とみなすラプラシアン分散（0-255スケール）
+SHARPNESS_REFERENCE = 400.0
+
+
+@dataclass
+class AssetQualityScore:
+    """アセット1件分の自動品質評価結果"""
+    asset_id: str
+    image_path: str
+    scores: Dict[str, float]  # 基準名 -> 0.00-5.00
+    details: Dict[str, float]  # 生の計測値
+    overall: float
+    passed: bool
+    evaluated_at: datetime
+
+    def failed_criteria(self) -> List[str]:
+        """最低点を下回った基準名を返す"""
+        return [
+            name for name, score in self.scores.items()
+            if score < QUALITY_CRITERIA[name]["threshold"]
+        ]
+
+    def to_evaluation_rows(self) -> List[Dict]:
+        """quality_evaluations テーブルの行形式に変換"""
+        failed = set(self.failed_criteria())
+        rows = []
+        for name, score in self.scores.items():
+            criteria = QUALITY_CRITERIA[name]
+            rows.append({
+                "evaluation_id": str(uuid.uuid4()),
+                "asset_id": self.asset_id,
+                "criteria_id": criteria["criteria_id"],
+                "score": round(score, 2),
+                "evaluation_method": "auto",
+                "evaluator": None,
+                "evaluation_details": {k: v for k, v in self.details.items() if k.startswith(name)},
+                "improvement_suggestions": criteria["suggestion"] if name in failed else None,
+                "evaluated_at": self.evaluated_at.isoformat(),
+            })
+        return rows
+
+    def to_dict(self) -> Dict:
+        """JSON保存用の辞書に変換"""
+        data = asdict(self)
+        data["evaluated_at"] = self.evaluated_at.isoformat()
+        return data
+
+
+def load_image_array(image_path: str, max_size: int = ANALYSIS_SIZE) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """画像を解析用に縮小し、RGB(0-1)とアルファ(0-1またはNone)の配列で返す"""
+    with Image.open(image_path) as image:
+        image.draft("RGB", (max_size, max_size))
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        image.thumbnail((max_size, max_size), Image.BILINEAR)
+        array = np.asarray(image, dtype=np.float32) / 255.0
+
+    if has_alpha:
+        return array[..., :3], array[..., 3]
+    return array, None
+
+
+def _border_mask(height: int, width: int, ratio: float = 0.04) -> np.ndarray:
+    """画像の外周部分のマスクを作成"""
+    bh = max(1, int(height * ratio))
+    bw = max(1, int(width * ratio))
+    mask = np.zeros((height, width), dtype=bool)
+    mask[:bh, :] = True
+    mask[-bh:, :] = True
+    mask[:, :bw] = True
+    mask[:, -bw:] = True
+    return mask
+
+
+def subject_mask(rgb: np.ndarray, alpha: Optional[np.ndarray] = None) -> np.ndarray:
+    """背景以外（被写体）のマスクを推定"""
+    if alpha is not None and alpha.min() < 0.5:
+        return alpha > 0.5
+
+    border = _border_mask(*rgb.shape[:2])
+    background = np.median(rgb[border], axis=0)
+    distance = np.linalg.norm(rgb - background, axis=-1) / np.sqrt(3)
+    return distance > BACKGROUND_TOLERANCE
+
+
+def laplacian_variance(gray: np.ndarray, mask: Optional[np.ndarray] = None) -> float:
+    """4近傍ラプラシアンの分散（0-255スケール）"""
+    if gray.shape[0] < 3 or gray.shape[1] < 3:
+        return 0.0
+    g = gray * 255.0
+    lap = (g[:-2, 1:-1] + g[2:, 1:-1] + g[1:-1, :-2] + g[1:-1, 2:]) - 4.0 * g[1:-1, 1:-1]
+    if mask is not None:
+        inner = mask[1:-1, 1:-1]
+        if inner.sum() >= 64:
+            lap = lap[inner]
+    return float(lap.var())
+
+
+def rgb_to_hsv(rgb: np.ndarray) -> np.ndarray:
+    """RGB(0-1)配列をHSV(0-1)配列に変換"""
+    maxc = rgb.max(axis=-1)
+    minc = rgb.min(axis=-1)
+    delta = maxc - minc
+    saturation = np.where(maxc > 0, delta / np.maximum(maxc, 1e-6), 0.0)
+
+    safe = np.maximum(delta, 1e-6)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    hue = np.where(
+        maxc == r, ((g - b) / safe) % 6.0,
+        np.where(maxc == g, (b - r) / safe + 2.0, (r - g) / safe + 4.0)
+    ) / 6.0
+    hue = np.where(delta > 0, hue, 0.0)
+    return np.stack([hue, saturation, maxc], axis=-1)
+
+
+def _plateau_score(value: float, low: float, high: float, zero_low: float, zero_high: float) -> float:
+    """low-high で満点、zero_low/zero_high で0点になる台形スコア（0-5）"""
+    if low <= value <= high:
+        return 5.0
+    if value < low:
+        span = max(low - zero_low, 1e-6)
+        return float(np.clip((value - zero_low) / span, 0.0, 1.0) * 5.0)
+    span = max(zero_high - high, 1e-6)
+    return float(np.clip((zero_high - value) / span, 0.0, 1.0) * 5.0)
+
+
+class QualityScorer:
+    """画像品質の自動評価"""
+
+    def __init__(self, pass_threshold: float = 3.0, max_workers: Optional[int] = None):
+        self.pass_threshold = pass_threshold
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def evaluate_arrays(self, rgb: np.ndarray, alpha: Optional[np.ndarray],
+                        color_palette: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """配列から各基準のスコアと計測値を計算"""
+        height, width = rgb.shape[:2]
+        mask = subject_mask(rgb, alpha)
+        gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+        scores = {}
+        details = {}
+
+        # シャープネス（被写体領域のラプラシアン分散）
+        lap_var = laplacian_variance(gray, mask)
+        details["sharpness_laplacian_variance"] = lap_var
+        scores["sharpness"] = float(5.0 * min(1.0, np.log1p(lap_var) / np.log1p(SHARPNESS_REFERENCE)))
+
+        # 背景の純度（外周が白または透明である割合）
+        border = _border_mask(height, width)
+        if alpha is not None and alpha.min() < 0.5:
+            pure = alpha[border] < 0.1
+        else:
+            whiteness = np.linalg.norm(1.0 - rgb[border], axis=-1) / np.sqrt(3)
+            pure = whiteness < BACKGROUND_TOLERANCE
+        purity = float(pure.mean())
+        details["background_purity_ratio"] = purity
+        scores["background_purity"] = purity * 5.0
+
+        # 被写体の占有率と中央配置
+        coverage = float(mask.mean())
+        details["subject_coverage_ratio"] = coverage
+        scores["subject_coverage"] = _plateau_score(coverage, 0.15, 0.75, 0.01, 0.98)
+
+        if mask.any():
+            ys, xs = np.nonzero(mask)
+            offset_x = xs.mean() / max(width - 1, 1) - 0.5
+            offset_y = ys.mean() / max(height - 1, 1) - 0.5
+            offset = float(np.hypot(offset_x, offset_y))
+        else:
+            offset = 0.5
+        details["subject_centering_offset"] = offset
+        scores["subject_centering"] = float(5.0 * (1.0 - min(1.0, offset / 0.35)))
+
+        # カラーパレット適合度（被写体部分のHSV統計と目標値の距離）
+        target = PALETTE_TARGETS.get((color_palette or "").lower())
+        if target is not None:
+            pixels = rgb[mask] if mask.sum() >= 64 else rgb.reshape(-1, 3)
+            hsv = rgb_to_hsv(pixels)
+            mean_s = float(hsv[:, 1].mean())
+            mean_v = float(hsv[:, 2].mean())
+            distance = abs(mean_v - target["value"]) + abs(mean_s - target["saturation"])
+            details["palette_adherence_mean_saturation"] = mean_s
+            details["palette_adherence_mean_value"] = mean_v
+            if "hue" in target:
+                # 彩度で重み付けした色相の円周平均
+                angle = hsv[:, 0] * 2 * np.pi
+                weight = hsv[:, 1] + 1e-6
+                mean_hue = float((np.arctan2((np.sin(angle) * weight).sum(),
+                                             (np.cos(angle) * weight).sum()) / (2 * np.pi)) % 1.0)
+                hue_distance = min(abs(mean_hue - target["hue"]), 1.0 - abs(mean_hue - target["hue"]))
+                details["palette_adherence_mean_hue"] = mean_hue
+                distance += hue_distance
+            scores["palette_adherence"] = float(5.0 * max(0.0, 1.0 - distance / 0.8))
+
+        return scores, details
+
+    def score_image(self, image_path: str, color_palette: Optional[str] = None,
+                    asset_id: Optional[str] = None) -> AssetQualityScore:
+        """1枚の画像を評価"""
+        rgb, alpha = load_image_array(image_path)
+        scores, details = self.evaluate_arrays(rgb, alpha, color_palette)
+
+        total_weight = sum(QUALITY_CRITERIA[name]["weight"] for name in scores)
+        overall = sum(score * QUALITY_CRITERIA[name]["weight"] for name, score in scores.items()) / total_weight
+        passed = overall >= self.pass_threshold and all(
+            score >= QUALITY_CRITERIA[name]["threshold"] for name, score in scores.items()
+        )
+
+        return AssetQualityScore(
+            asset_id=asset_id or Path(image_path).stem,
+            image_path=str(image_path),
+            scores={name: round(score, 2) for name, score in scores.items()},
+            details=details,
+            overall=round(float(overall), 2),
+            passed=passed,
+            evaluated_at=datetime.now(),
+        )
+
+    def score_batch(self, image_paths: Sequence[str], color_palette: Optional[str] = None,
+                    asset_ids: Optional[Sequence[str]] = None) -> List[AssetQualityScore]:
+        """複数画像をCPUコア数に応じて並列評価"""
+        asset_ids = list(asset_ids) if asset_ids else [None] * len(image_paths)
+        jobs = [(str(path), color_palette, asset_id, self.pass_threshold)
+                for path, asset_id in zip(image_paths, asset_ids)]
+
+        # 少数ならプロセス起動のコストの方が大きいので直列で評価
+        if self.max_workers <= 1 or len(jobs) <= 2:
+            return [_score_job(job) for job in jobs]
+
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs))) as executor:
+            return list(executor.map(_score_job, jobs, chunksize=max(1, len(jobs) // (self.max_workers * 4))))
+
+    def score_project(self, project_dir: Path) -> List[AssetQualityScore]:
+        """プロジェクトフォルダ内の全アセットを評価して quality_evaluations.json を保存"""
+        project_dir = Path(project_dir)
+        color_palette = None
+        world_name = project_dir.name
+        setting_path = project_dir / "world_setting.json"
+        if setting_path.exists():
+            with open(setting_path, "r", encoding="utf-8") as f:
+                setting = json.load(f)
+            color_palette = setting.get("color_palette")
+            world_name = setting.get("name", world_name)
+
+        image_paths = sorted((project_dir / "assets").glob("*.png"))
+        asset_ids = [f"{world_name}_{path.stem}" for path in image_paths]
+        results = self.score_batch(image_paths, color_palette, asset_ids)
+        save_quality_evaluations(results, project_dir)
+        return results
+
+
+def _score_job(job: Tuple[str, Optional[str], Optional[str], float]) -> AssetQualityScore:
+    """プロセスプールから呼ばれる評価ジョブ"""
+    image_path, color_palette, asset_id, pass_threshold = job
+    return QualityScorer(pass_threshold=pass_threshold, max_workers=1).score_image(
+        image_path, color_palette, asset_id
+    )
+
+
+def save_quality_evaluations(results: List[AssetQualityScore], project_dir: Path) -> Path:
+    """評価結果を quality_evaluations.json として保存"""
+    output_path = Path(project_dir) / "quality_evaluations.json"
+    data = {
+        "criteria": [
+            {
+                "criteria_id": criteria["criteria_id"],
+                "criteria_name": criteria["criteria_name"],
+                "category": criteria["category"],
+                "weight": criteria["weight"],
+                "evaluation_method": "auto",
+                "threshold_values": {"min_score": criteria["threshold"]},
+            }
+            for criteria in QUALITY_CRITERIA.values()
+        ],
+        "assets": [result.to_dict() for result in results],
+        "evaluations": [row for result in results for row in result.to_evaluation_rows()],
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return output_path
+
+
+def main():
+    """既存プロジェクトの一括評価"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="GAAAGS 画像品質自動評価")
+    parser.add_argument("project_dirs", nargs="+", help="評価するプロジェクトフォルダ")
+    parser.add_argument("--threshold", type=float, default=3.0, help="合格ライン（0-5）")
+    parser.add_argument("--workers", type=int, default=None, help="並列プロセス数")
+    args = parser.parse_args()
+
+    scorer = QualityScorer(pass_threshold=args.threshold, max_workers=args.workers)
+    failed = 0
+    for project_dir in args.project_dirs:
+        results = scorer.score_project(Path(project_dir))
+        print(f"=== {project_dir} ===")
+        for result in results:
+            mark = "✓" if result.passed else "✗"
+            print(f"{mark} {Path(result.image_path).stem}: {result.overall:.2f} {result.scores}")
+            failed += 0 if result.passed else 1
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ setup(
     install_requires=[
         "google-generativeai>=0.3.0",
         "Pillow>=10.0.0",
+        "numpy>=1.24.0",
         "python-dotenv>=1.0.0",
     ],
     python_requires=">=3.8",
@@ -0,0 +1,115 @@
+"""
+GAAAGS サーフェスマップ生成
+元画像の輝度を高さとみなし、Sobelフィルタでタンジェント空間ノーマルマップ（と任意でAO・ハイトマップ）を作成
+ジオメトリのディスプレースメントの代わりにマテリアルへ接続して凹凸を表現する
+"""
+
+import io
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+# AOの遮蔽を調べる範囲（テクスチャ幅に対する比率）
+OCCLUSION_RADIUS_RATIO = 0.02
+
+
+@dataclass
+class SurfaceMaps:
+    """ベイク済みのサーフェスマップ（8bit配列）"""
+    normal: np.ndarray  # (H, W, 3) タンジェント空間（OpenGL / glTF 形式、緑=+Y）
+    occlusion: Optional[np.ndarray] = None  # (H, W)
+    height: Optional[np.ndarray] = None  # (H, W)
+
+    def images(self) -> Dict[str, Image.Image]:
+        """マップ名 -> PIL画像"""
+        images = {"normal": Image.fromarray(self.normal)}
+        if self.occlusion is not None:
+            images["occlusion"] = Image.fromarray(self.occlusion)
+        if self.height is not None:
+            images["height"] = Image.fromarray(self.height)
+        return images
+
+    def png_bytes(self) -> Dict[str, bytes]:
+        """マップ名 -> PNGのバイト列（GLB埋め込み用）"""
+        encoded = {}
+        for name, image in self.images().items():
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+            encoded[name] = buffer.getvalue()
+        return encoded
+
+    def save(self, output_dir: Path, stem: str) -> Dict[str, str]:
+        """<stem>_<マップ名>.png として保存し、マップ名 -> パスを返す"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        paths = {}
+        for name, image in self.images().items():
+            path = output_dir / f"{stem}_{name}.png"
+            image.save(path)
+            paths[name] = str(path)
+        return paths
+
+
+def load_height(image_path: str, texture_size: int) -> np.ndarray:
+    """輝度を高さ（0〜1）として読み込む（長辺は texture_size まで縮小）"""
+    with Image.open(image_path) as image:
+        image = image.convert("L")
+        image.thumbnail((texture_size, texture_size), Image.LANCZOS)
+        return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def sobel(height: np.ndarray):
+    """3x3 Sobelフィルタで列方向・行方向の勾配を求める（端は複製でパディング）"""
+    p = np.pad(height, 1, mode="edge")
+    gx = (p[:-2, 2:] + 2 * p[1:-1, 2:] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[1:-1, :-2] + p[2:, :-2])
+    gy = (p[2:, :-2] + 2 * p[2:, 1:-1] + p[2:, 2:]) - (p[:-2, :-2] + 2 * p[:-2, 1:-1] + p[:-2, 2:])
+    return gx, gy
+
+
+def normal_map(height: np.ndarray, strength: float) -> np.ndarray:
+    """高さからタンジェント空間ノーマルマップを作成
+
+    strength はディスプレースメント強度と同じ単位（幅2のプレーン上での高さ）で、
+    同じ強度でディスプレースメントした面と同じ傾きになる。
+    """
+    gx, gy = sobel(height)
+    # Sobelは1ピクセルあたりの勾配の8倍。幅2のプレーン上での傾きに換算する
+    rows, cols = height.shape
+    scale_x = strength * cols / 2.0 / 8.0
+    scale_y = strength * rows / 2.0 / 8.0
+    # 画像の下方向（行）が +Y の逆向きになるので gy の符号を反転する
+    normal = np.stack([-gx * scale_x, gy * scale_y, np.ones_like(height)], axis=-1)
+    normal /= np.linalg.norm(normal, axis=-1, keepdims=True)
+    return np.clip(np.rint((normal + 1.0) * 127.5), 0, 255).astype(np.uint8)
+
+
+def box_blur(values: np.ndarray, radius: int) -> np.ndarray:
+    """積分画像を使った半径 radius のボックスブラー"""
+    size = 2 * radius + 1
+    padded = np.pad(values.astype(np.float64), radius, mode="edge")
+    integral = np.pad(padded.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    total = (integral[size:, size:] - integral[:-size, size:]
+             - integral[size:, :-size] + integral[:-size, :-size])
+    return total / (size * size)
+
+
+def ambient_occlusion(height: np.ndarray, strength: float) -> np.ndarray:
+    """周囲より低い（くぼんだ）部分を暗くする簡易AO"""
+    radius = max(1, int(height.shape[1] * OCCLUSION_RADIUS_RATIO))
+    cavity = np.clip(box_blur(height, radius) - height, 0.0, None)
+    occlusion = 1.0 - np.clip(cavity * (4.0 + 40.0 * strength), 0.0, 1.0)
+    return np.rint(occlusion * 255).astype(np.uint8)
+
+
+def bake_surface_maps(image_path: str, texture_size: int = 1024, strength: float = 0.1,
+                      occlusion: bool = True, height: bool = False) -> SurfaceMaps:
+    """画像からノーマルマップ（と任意でAO・ハイトマップ）を作成"""
+    heights = load_height(image_path, texture_size)
+    return SurfaceMaps(
+        normal=normal_map(heights, strength),
+        occlusion=ambient_occlusion(heights, strength) if occlusion else None,
+        height=np.rint(heights * 255).astype(np.uint8) if height else None,
+    )
@@ -0,0 +1,216 @@
+"""
+3d_eval（BlenderMCPConverter）のテスト
+"""
+import importlib.util
+import json
+import sys
+import time
+import pytest
+from pathlib import Path
+from PIL import Image
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def load_3d_eval():
+    """ファイル名が数字で始まるためimportlibで読み込む"""
+    spec = importlib.util.spec_from_file_location("eval_3d", ROOT / "3d_eval.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def eval_3d():
+    """3d_evalモジュールのフィクスチャ"""
+    return load_3d_eval()
+
+@pytest.fixture
+def converter(eval_3d, tmp_path, monkeypatch):
+    """Blenderを起動できないパスを指定したコンバーター（スクリプトは一時フォルダに書き出す）"""
+    monkeypatch.chdir(tmp_path)
+    return eval_3d.BlenderMCPConverter(blender_path=str(tmp_path / "no-blender"))
+
+@pytest.fixture
+def image_path(tmp_path):
+    """テスト用画像"""
+    path = tmp_path / "asset.png"
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(path)
+    return path
+
+def test_fast_backend_skips_blender(eval_3d, converter, image_path, tmp_path):
+    """低・中品質の gltf はBlenderなしで変換できるテスト"""
+    output_path = tmp_path / "out" / "asset.glb"
+    settings = eval_3d.ConversionSettings(quality="medium", export_format="gltf")
+
+    assert converter.convert_to_3d(str(image_path), str(output_path), settings) == str(output_path)
+    assert output_path.read_bytes()[:4] == b"glTF"
+    with open(output_path.with_name("asset.metadata.json"), "r", encoding="utf-8") as f:
+        assert json.load(f)["conversion_info"]["backend"] == "heightmap_mesh"
+
+def test_gltf_is_written_as_glb(eval_3d, image_path, tmp_path, monkeypatch):
+    """高速バックエンドでも gltf は Blender と同じく <画像名>.glb に書き出されるテスト"""
+    monkeypatch.chdir(tmp_path)
+    converter = eval_3d.BlenderMCPConverter(blender_path=str(tmp_path / "no-blender"), fast_backend=True)
+    settings = eval_3d.ConversionSettings(quality="low", export_format="gltf")
+
+    output_path = tmp_path / "single" / "asset.gltf"
+    result = converter.convert_to_3d(str(image_path), str(output_path), settings)
+    assert result == str(output_path.with_suffix(".glb"))
+    assert not output_path.exists()
+    assert (tmp_path / "single" / "low" / "asset.glb").read_bytes()[:4] == b"glTF"
+
+    converter.batch_convert([image_path], str(tmp_path / "batch"), settings, max_workers=1)
+    assert (tmp_path / "batch" / "low" / "asset.glb").read_bytes()[:4] == b"glTF"
+    assert not list((tmp_path / "batch").rglob("*.gltf"))
+
+def test_high_quality_uses_blender(eval_3d, converter, image_path, tmp_path):
+    """高品質とfbxはBlenderで変換するテスト"""
+    assert not converter.uses_fast_backend("high", ["gltf"])
+    assert not converter.uses_fast_backend("low", ["fbx"])
+    # Blenderが存在しないので失敗する
+    settings = eval_3d.ConversionSettings(quality="high", export_format="gltf")
+    assert converter.convert_to_3d(str(image_path), str(tmp_path / "high.glb"), settings) is None
+
+def test_silhouette_always_uses_fast_backend(eval_3d, converter, image_path, tmp_path):
+    """silhouette モードは高品質でもBlenderを使わないテスト"""
+    settings = eval_3d.ConversionSettings(quality="high", export_format="obj", mesh_mode="silhouette")
+    output_path = tmp_path / "out" / "asset.obj"
+    assert converter.convert_to_3d(str(image_path), str(output_path), settings) == str(output_path)
+
+def test_silhouette_rejects_unsupported_format(eval_3d, converter, image_path, tmp_path):
+    """silhouette と heightmap_mesh が書き出せないフォーマットの組み合わせはエラーになるテスト"""
+    with pytest.raises(ValueError, match="silhouette"):
+        eval_3d.ConversionSettings(quality="low", export_format="fbx", mesh_mode="silhouette")
+    settings = eval_3d.ConversionSettings(quality="low", export_format="obj", mesh_mode="silhouette")
+    with pytest.raises(ValueError, match="fbx"):
+        converter.convert_all_qualities(str(image_path), str(tmp_path / "out"), settings=settings,
+                                        formats=["obj", "fbx"])
+
+def test_normal_map_skips_displacement(eval_3d, converter, image_path, tmp_path):
+    """normal_map では中品質もローポリになり、メタデータに記録されるテスト"""
+    settings = eval_3d.ConversionSettings(quality="medium", export_format="gltf",
+                                          surface_detail="normal_map")
+    output_path = tmp_path / "out" / "asset.glb"
+    assert converter.convert_to_3d(str(image_path), str(output_path), settings)
+    with open(output_path.with_name("asset.metadata.json"), "r", encoding="utf-8") as f:
+        assert json.load(f)["conversion_info"]["settings_used"]["surface_detail"] == "normal_map"
+
+def test_cache_restores_conversion(eval_3d, image_path, tmp_path, monkeypatch):
+    """2回目の変換はキャッシュから出力ファイルとメタデータを復元するテスト"""
+    monkeypatch.chdir(tmp_path)
+    converter = eval_3d.BlenderMCPConverter(blender_path=str(tmp_path / "no-blender"),
+                                            cache_dir=str(tmp_path / "cache"))
+    settings = eval_3d.ConversionSettings(quality="low", export_format="obj")
+    first = tmp_path / "first" / "asset.obj"
+    assert converter.convert_to_3d(str(image_path), str(first), settings)
+
+    monkeypatch.setattr(converter, "run_fast_backend", lambda *args: pytest.fail("再変換された"))
+    second = tmp_path / "second" / "asset.obj"
+    assert converter.convert_to_3d(str(image_path), str(second), settings) == str(second)
+    assert second.read_bytes() == first.read_bytes()
+    assert (second.parent / "asset.mtl").exists()
+    assert (second.parent / "low" / "asset.obj").exists()
+    with open(second.with_name("asset.metadata.json"), "r", encoding="utf-8") as f:
+        assert json.load(f)["conversion_info"]["cache_hit"] is True
+    assert converter.cache.stats()["hits"] == 1
+
+def test_blender_receives_prepared_textures(eval_3d, converter, image_path, tmp_path, monkeypatch):
+    """Blenderには縮小済みテクスチャとディスプレースメント用画像のパスを渡し、変換後に中間ファイルを消すテスト"""
+    received = {}
+    def fake_run_blender(image, output, settings_dict, timeout=300):
+        received.update(settings_dict)
+        with Image.open(settings_dict["color_texture"]) as color:
+            received["color_size"] = color.size
+        received["displacement_exists"] = Path(settings_dict["displacement_texture"]).exists()
+        return False
+    monkeypatch.setattr(converter, "run_blender", fake_run_blender)
+
+    settings = eval_3d.ConversionSettings(quality="high", export_format="fbx", texture_size=32)
+    try:
+        assert converter.convert_to_3d(str(image_path), str(tmp_path / "out" / "asset.fbx"), settings) is None
+        assert received["color_size"] == (32, 32) and received["displacement_exists"]
+        # FBXはテクスチャを埋め込むので中間ファイルは出力先に残らない
+        assert not Path(received["color_texture"]).exists()
+        assert not Path(received["displacement_texture"]).exists()
+        assert not list((tmp_path / "out").glob("asset_*.png"))
+
+        # OBJ は MTL から参照されるカラーテクスチャだけを出力先に置く
+        obj_settings = eval_3d.ConversionSettings(quality="high", export_format="obj", texture_size=32)
+        assert converter.convert_to_3d(str(image_path), str(tmp_path / "obj" / "asset.obj"), obj_settings) is None
+        assert Path(received["color_texture"]) == tmp_path / "obj" / "asset_color.png"
+        assert not Path(received["displacement_texture"]).exists()
+        # 1件ずつの変換ではプロセスプールを起動しない
+        assert converter.texture_pool is None
+    finally:
+        converter.close()
+
+FAKE_BLENDER = """#!{python}
+import json, sys, time
+job = json.loads(sys.argv[sys.argv.index('--job') + 1])
+print("Blender (fake)", flush=True)
+print("GAAAGS_EVENT " + json.dumps({{"event": "stage_start", "stage": "optimize"}}), flush=True)
+if job.get("hang"):
+    time.sleep(30)
+print("GAAAGS_EVENT " + json.dumps({{"event": "poly_count", "object": "Plane", "polygons": 1234}}), flush=True)
+print("GAAAGS_RESULT " + json.dumps({{"status": "ok"}}), flush=True)
+"""
+
+@pytest.fixture
+def fake_blender(tmp_path):
+    """進捗イベントと応答行を出力する偽のBlender"""
+    path = tmp_path / "fake-blender"
+    path.write_text(FAKE_BLENDER.format(python=sys.executable), encoding="utf-8")
+    path.chmod(0o755)
+    return path
+
+def test_blender_job_streams_events(eval_3d, fake_blender, tmp_path, monkeypatch):
+    """Blenderの出力を1行ずつ読み、進捗イベントをコールバックへ渡すテスト"""
+    monkeypatch.chdir(tmp_path)
+    converter = eval_3d.BlenderMCPConverter(blender_path=str(fake_blender), on_event=None)
+    events = []
+    assert converter.run_blender_job({"command": "convert"}, timeout=30, on_event=events.append) == {"status": "ok"}
+    assert [event["event"] for event in events] == ["stage_start", "poly_count"]
+    assert events[1]["polygons"] == 1234
+
+def test_stalled_blender_is_killed(eval_3d, fake_blender, tmp_path, monkeypatch):
+    """出力が途絶えたBlenderは固定のタイムアウトより前に打ち切るテスト"""
+    monkeypatch.chdir(tmp_path)
+    converter = eval_3d.BlenderMCPConverter(blender_path=str(fake_blender), stall_timeout=0.5,
+                                            on_event=None)
+    started = time.time()
+    with pytest.raises(TimeoutError):
+        converter.run_blender_job({"command": "convert", "hang": True}, timeout=30)
+    assert time.time() - started < 10
+
+def test_metadata_records_measured_metrics(eval_3d, converter, image_path, tmp_path):
+    """メタデータに実際のポリゴン数・段階ごとの所要時間・出力サイズを記録するテスト"""
+    settings = eval_3d.ConversionSettings(quality="medium", export_format="gltf")
+    output_path = tmp_path / "out" / "asset.glb"
+    metrics = {}
+    assert converter.convert_to_3d(str(image_path), str(output_path), settings, metrics=metrics)
+
+    with open(output_path.with_name("asset.metadata.json"), "r", encoding="utf-8") as f:
+        metadata = json.load(f)
+    assert metadata["model_info"]["polygon_count"] == metrics["meshes"]["base"]["faces"]
+    assert metadata["model_info"]["polygon_limit"] == settings.poly_limit
+    assert metadata["conversion_info"]["metrics"] == metrics
+    assert metrics["output_bytes"]["asset.glb"] == output_path.stat().st_size
+    assert "low/asset.glb" in metrics["output_bytes"]
+    assert "export" in metrics["stages"]
+    assert not any(name.endswith(".metadata.json") for name in metrics["output_bytes"])
+
+def test_batch_report_aggregates_metrics(eval_3d, converter, image_path, tmp_path):
+    """バッチの集計に段階ごとの平均所要時間とボトルネックが入るテスト"""
+    second = tmp_path / "second.png"
+    Image.new("RGB", (32, 32), (10, 20, 30)).save(second)
+    settings = eval_3d.ConversionSettings(quality="low", export_format="obj")
+    converter.batch_convert([image_path, second], str(tmp_path / "batch"), settings, max_workers=2)
+
+    stats = converter.last_report.to_dict()["per_quality"]["low"]
+    assert stats["measured"] == 2
+    assert stats["bottleneck_stage"] in stats["avg_stage_seconds"]
+    assert stats["avg_output_bytes"] > 0
+    # 並列に変換しても画像ごとのメタデータが残る
+    saved = {path.name: json.loads(path.read_text(encoding="utf-8"))
+             for path in (tmp_path / "batch").rglob("*.metadata.json")}
+    assert set(saved) == {"asset.metadata.json", "second.metadata.json"}
+    assert saved["second.metadata.json"]["model_info"]["name"] == "second"
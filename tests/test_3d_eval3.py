@@ -0,0 +1,199 @@
+"""
+3d_eval3（Claude⇄Blender MCPループ）のテスト
+"""
+import asyncio
+import importlib.util
+import pytest
+from pathlib import Path
+from PIL import Image
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.fixture
+def eval3(monkeypatch):
+    """ファイル名が数字で始まるためimportlibで読み込む（APIキーはダミー）"""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    spec = importlib.util.spec_from_file_location("eval_3d3", ROOT / "3d_eval3.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.payload_cache = module.ImagePayloadCache()  # エンコード済み画像はメモリだけに保存
+    return module
+
+class FakeSession:
+    """call_toolの開始・終了順を記録するMCPセッション"""
+
+    def __init__(self, delay: float = 0.05, fail: str = None):
+        self.delay = delay
+        self.fail = fail
+        self.events = []
+
+    async def call_tool(self, name, arguments):
+        self.events.append(("start", name))
+        await asyncio.sleep(self.delay)
+        self.events.append(("end", name))
+        if name == self.fail:
+            raise RuntimeError("接続が切れました")
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"{name}:ok")], isError=False)
+
+def tool_use(index: int, name: str):
+    """tool_useブロック"""
+    return SimpleNamespace(type="tool_use", id=f"toolu_{index}", name=name, input={})
+
+def test_read_only_tools_run_concurrently(eval3):
+    """連続する読み取り専用ツールは並列、シーンを変更するツールは順番に実行されるテスト"""
+    blocks = [tool_use(0, "get_scene_info"), tool_use(1, "get_object_info"),
+              tool_use(2, "execute_blender_code"), tool_use(3, "get_scene_info")]
+    session = FakeSession()
+    results = asyncio.run(eval3.run_tool_calls(session, blocks))
+
+    # 結果は応答の順番どおりで、すべて1つのユーザーメッセージに入れられる
+    assert [r["tool_use_id"] for r in results] == ["toolu_0", "toolu_1", "toolu_2", "toolu_3"]
+    assert results[0]["content"] == [{"type": "text", "text": "get_scene_info:ok"}]
+    # 最初の2つは同時に開始し、execute_blender_code は前のツールの完了後に開始する
+    assert session.events[:2] == [("start", "get_scene_info"), ("start", "get_object_info")]
+    code_start = session.events.index(("start", "execute_blender_code"))
+    assert session.events[code_start - 1][0] == "end"
+    assert session.events[-2:] == [("start", "get_scene_info"), ("end", "get_scene_info")]
+
+def test_tool_error_is_returned_as_result(eval3):
+    """ツールの例外は他の結果を失わずにis_errorとして返るテスト"""
+    blocks = [tool_use(0, "get_scene_info"), tool_use(1, "get_object_info")]
+    results = asyncio.run(eval3.run_tool_calls(FakeSession(fail="get_object_info"), blocks))
+
+    assert results[0]["is_error"] is False
+    assert results[1]["is_error"] is True
+    assert "接続が切れました" in results[1]["content"]
+
+class CollectionErrorSession(FakeSession):
+    """コレクションを切り替えるコードがエラーを返すMCPセッション"""
+
+    async def call_tool(self, name, arguments):
+        if name == "execute_blender_code" and "active_layer_collection" in arguments.get("code", ""):
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text="Error executing code: KeyError")],
+                                   isError=False)
+        return await super().call_tool(name, arguments)
+
+def test_collection_activation_failure(eval3):
+    """コレクションを切り替えられなければ例外になり、シーンを変更するツールは実行されないテスト"""
+    session = CollectionErrorSession()
+    with pytest.raises(RuntimeError, match="コレクションを切り替えられません"):
+        asyncio.run(eval3.activate_collection(session, "Item0"))
+
+    blocks = [tool_use(0, "get_scene_info"), tool_use(1, "execute_blender_code")]
+    results = asyncio.run(eval3.run_tool_calls(session, blocks, asyncio.Lock(), collection="Item0"))
+    assert results[0]["is_error"] is False
+    assert results[1]["is_error"] is True and "KeyError" in results[1]["content"]
+    assert ("start", "execute_blender_code") not in session.events
+
+def tool_turn(index: int, text: str):
+    """tool_resultを1件含むユーザーメッセージ"""
+    return {"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"toolu_{index}",
+                                         "content": [{"type": "text", "text": text}]}]}
+
+def test_compact_history_summarizes_old_results(eval3):
+    """上限を超えたら直近以外の大きなツール結果が要約されるテスト"""
+    messages = [{"role": "user", "content": [{"type": "text", "text": "画像"}]}]
+    for i in range(4):
+        messages.append({"role": "assistant", "content": []})
+        messages.append(tool_turn(i, "x" * 5000))
+
+    assert eval3.compact_history(messages, budget_chars=50000) == 0
+    assert eval3.compact_history(messages, budget_chars=10000, keep_recent=2) == 2
+    assert messages[2]["content"][0]["content"].startswith("x" * eval3.SUMMARY_CHARS)
+    assert "5000文字" in messages[2]["content"][0]["content"]
+    assert messages[8]["content"][0]["content"][0]["text"] == "x" * 5000
+    # 初回の画像ターンは変更しない
+    assert messages[0]["content"][0]["text"] == "画像"
+
+def test_cache_breakpoint_moves_to_latest_results(eval3):
+    """キャッシュのブレークポイントは最新のツール結果だけに付くテスト"""
+    messages = [{"role": "user", "content": [{"type": "text", "text": "画像"}]}, tool_turn(0, "a")]
+    eval3.mark_cache_breakpoint(messages)
+    messages.append(tool_turn(1, "b"))
+    eval3.mark_cache_breakpoint(messages)
+
+    assert "cache_control" not in messages[1]["content"][-1]
+    assert messages[2]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+
+class FakeMessages:
+    """tool_useを1回返してから最終回答を返すClaudeクライアントのmessages"""
+
+    def __init__(self, slow_image: str = None):
+        self.slow_image = slow_image
+        self.requests = []
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        messages = kwargs["messages"]
+        if self.slow_image and self.slow_image in messages[0]["content"][1]["text"]:
+            await asyncio.sleep(10)
+        usage = SimpleNamespace(input_tokens=10, cache_read_input_tokens=0, cache_creation_input_tokens=0)
+        if len(messages) == 1:
+            content = [SimpleNamespace(type="tool_use", id="toolu_0", name="execute_blender_code",
+                                       input={"code": "pass"})]
+            return SimpleNamespace(content=content, stop_reason="tool_use", usage=usage)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="完成しました")],
+                               stop_reason="end_turn", usage=usage)
+
+class FakeToolSession(FakeSession):
+    """ツール一覧と execute_blender_code の引数を記録するMCPセッション"""
+
+    def __init__(self):
+        super().__init__(delay=0.01)
+        self.codes = []
+
+    async def list_tools(self):
+        tool = SimpleNamespace(name="execute_blender_code", description="", inputSchema={"type": "object"})
+        return SimpleNamespace(tools=[tool])
+
+    async def call_tool(self, name, arguments):
+        self.codes.append(arguments.get("code"))
+        return await super().call_tool(name, arguments)
+
+def test_batch_shares_session_and_isolates_collections(eval3, tmp_path):
+    """1つのセッションで複数画像を処理し、会話ごとのコレクションとタイムアウトを扱うテスト"""
+    images = []
+    for name in ("a", "b", "slow"):
+        path = tmp_path / f"{name}.png"
+        Image.new("RGB", (32, 32), (200, 120, 40)).save(path)
+        images.append((str(path), "3Dモデル化して"))
+    session = FakeToolSession()
+    client = SimpleNamespace(messages=FakeMessages(slow_image="slow.png"))
+
+    report = asyncio.run(eval3.run_batch_agents(session, client, images, concurrency=3, timeout=0.5))
+
+    assert (report["total"], report["succeeded"], report["failed"]) == (3, 2, 1)
+    results = {Path(r["image_path"]).stem: r for r in report["results"]}
+    assert results["a"]["answer"] == "完成しました"
+    assert "タイムアウト" in results["slow"]["error"]
+    # シーンを変更するツールの前に会話ごとのコレクションがアクティブにされる
+    assert any("agent_000_a" in (code or "") for code in session.codes)
+    assert any("agent_001_b" in (code or "") for code in session.codes)
+    assert any("agent_000_a" in request["messages"][0]["content"][1]["text"]
+               for request in client.messages.requests)
+
+def test_collect_images_from_manifest(eval3, tmp_path):
+    """マニフェストのエントリごとのプロンプトのテスト"""
+    (tmp_path / "images.json").write_text(
+        '{"images": ["a.png", {"path": "b.png", "prompt": "剣を作って"}]}', encoding="utf-8")
+    images = eval3.collect_images(str(tmp_path / "images.json"), "既定")
+    assert images == [(str(tmp_path / "a.png"), "既定"), (str(tmp_path / "b.png"), "剣を作って")]
+
+def test_batch_records_and_replays_traces(eval3, tmp_path):
+    """バッチで保存したトレースをLLMなしで別の画像に再実行するテスト"""
+    images = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.png"
+        Image.new("RGB", (32, 32), (200, 120, 40)).save(path)
+        images.append((str(path), "3Dモデル化して"))
+    client = SimpleNamespace(messages=FakeMessages())
+    report = asyncio.run(eval3.run_batch_agents(FakeToolSession(), client, images[:1],
+                                                trace_dir=str(tmp_path / "traces")))
+    trace_path = report["results"][0]["trace_path"]
+
+    session = FakeToolSession()
+    replay = asyncio.run(eval3.run_batch_replays(session, eval3.load_trace(trace_path), images))
+    assert (replay["total"], replay["succeeded"]) == (2, 2)
+    assert len(client.messages.requests) == 2  # 再実行ではClaudeを呼ばない
+    assert sum(1 for code in session.codes if code == "pass") == 2
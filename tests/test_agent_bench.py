@@ -0,0 +1,24 @@
+"""
+agent_bench（代替MCPサーバーとスクリプト化したClaudeによる負荷試験）のテスト
+"""
+import asyncio
+from agent_bench import DEFAULT_SCRIPT, run_benchmark
+
+def test_benchmark_runs_sessions_over_fake_server(tmp_path):
+    """代替サーバーに対して全セッションが最後まで実行されるテスト"""
+    result = asyncio.run(run_benchmark(sessions=4, concurrency_levels=[1, 2], work_dir=str(tmp_path)))
+
+    assert [s["concurrency"] for s in result["scenarios"]] == [1, 2]
+    for scenario in result["scenarios"]:
+        assert scenario["succeeded"] == 4
+        assert scenario["llm_requests"] == 4 * (len(DEFAULT_SCRIPT) + 1)
+        assert scenario["tool_errors"] == 0
+        assert scenario["peak_traced_mb"] > 0
+
+def test_fake_server_failures_reach_the_agent(tmp_path):
+    """代替サーバーの疑似的な失敗はis_errorのツール結果として会話に返るテスト"""
+    result = asyncio.run(run_benchmark(sessions=2, concurrency_levels=[2], failure_rate=1.0,
+                                       work_dir=str(tmp_path)))
+    scenario = result["scenarios"][0]
+    assert scenario["succeeded"] == 2
+    assert scenario["tool_errors"] == scenario["tool_calls"]
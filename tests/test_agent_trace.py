@@ -0,0 +1,68 @@
+"""
+agent_traceモジュールのテスト
+"""
+import asyncio
+import pytest
+from types import SimpleNamespace
+from agent_trace import ToolTrace, load_trace, replay_calls, replay_trace, trace_params
+
+class RecordingSession:
+    """call_toolの引数を記録し、指定したツールだけ失敗させるMCPセッション"""
+
+    def __init__(self, fail: str = None):
+        self.fail = fail
+        self.calls = []
+
+    async def call_tool(self, name, arguments):
+        self.calls.append((name, arguments))
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text="ok")], isError=name == self.fail)
+
+def tool_result(text: str, is_error: bool = False):
+    """tool_resultブロック"""
+    return {"type": "tool_result", "tool_use_id": "toolu_0", "content": [{"type": "text", "text": text}],
+            "is_error": is_error}
+
+@pytest.fixture
+def trace_file(tmp_path):
+    """画像パスとコレクション名を含むツール呼び出しを記録したトレース"""
+    image_path = str(tmp_path / "sword.png")
+    trace = ToolTrace(image_path, "3Dモデル化して", trace_params(image_path, "agent_000_sword"))
+    trace.record("get_scene_info", {}, tool_result("{}"), 0.1, 1)
+    trace.record("execute_blender_code", {"code": f"load({image_path!r}, 'agent_000_sword')"},
+                 tool_result("ok"), 0.5, 1)
+    trace.record("execute_blender_code", {"code": "broken("}, tool_result("SyntaxError", True), 0.1, 2)
+    trace.record("set_texture", {"object_name": "Plane", "texture_id": "rock"}, tool_result("ok"), 0.2, 3)
+    path = tmp_path / "trace.json"
+    trace.save(str(path))
+    return path
+
+def test_trace_saved_with_placeholders(trace_file, tmp_path):
+    """保存したトレースでは画像パスとコレクション名がプレースホルダになるテスト"""
+    trace = load_trace(str(trace_file))
+    code = trace["calls"][1]["input"]["code"]
+    assert code == "load('{{image_path}}', '{{collection}}')"
+    assert str(tmp_path) not in trace_file.read_text(encoding="utf-8").split('"calls"')[1]
+    assert trace["total_seconds"] == pytest.approx(0.9)
+    assert trace["calls"][2]["is_error"] is True
+
+def test_replay_substitutes_params(trace_file, tmp_path):
+    """再実行では失敗した呼び出しと読み取り専用ツールを除き、新しい値で実行するテスト"""
+    trace = load_trace(str(trace_file))
+    session = RecordingSession()
+    new_image = str(tmp_path / "shield.png")
+    result = asyncio.run(replay_trace(session, trace, trace_params(new_image, "agent_001_shield")))
+
+    assert result["success"] is True
+    assert [name for name, _ in session.calls] == ["execute_blender_code", "set_texture"]
+    assert session.calls[0][1]["code"] == f"load({new_image!r}, 'agent_001_shield')"
+
+def test_replay_stops_on_error(trace_file, tmp_path):
+    """再実行中にツールが失敗したら止まり、パラメータが足りなければエラーになるテスト"""
+    trace = load_trace(str(trace_file))
+    session = RecordingSession(fail="execute_blender_code")
+    result = asyncio.run(replay_trace(session, trace, trace_params(str(tmp_path / "a.png"), "c")))
+    assert result["success"] is False
+    assert len(session.calls) == 1
+
+    with pytest.raises(ValueError):
+        replay_calls(trace, trace_params(str(tmp_path / "a.png")))
@@ -69,6 +69,106 @@ def test_get_asset_specs_modern(asset_pipeline, world_setting):
     assert specs[3].name == "車"
     assert specs[4].name == "スマートウォッチ"
 
+class FakeImageGenerator:
+    """候補ごとに品質の異なる画像を書き出す画像生成のスタブ"""
+    
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = 0
+    
+    def generate_image(self, prompt, output_path):
+        from PIL import Image, ImageDraw
+        box = self.boxes[min(self.calls, len(self.boxes) - 1)]
+        self.calls += 1
+        img = Image.new("RGB", (256, 256), "white")
+        draw = ImageDraw.Draw(img)
+        for offset in range(0, box[2] - box[0], 8):
+            draw.rectangle([box[0] + offset, box[1], box[0] + offset + 3, box[3]], fill=(250, 180, 40))
+        img.save(output_path)
+        return True
+
+def test_generate_best_of_n(asset_pipeline, world_setting, tmp_path):
+    """複数候補から最良の画像が採用されるテスト"""
+    # 1枚目は端に寄った不合格候補、2枚目は中央の合格候補
+    asset_pipeline.image_generator = FakeImageGenerator([(0, 0, 60, 256), (64, 64, 192, 192)])
+    asset_pipeline.candidate_parallelism = 1
+    image_path = tmp_path / "剣.png"
+    
+    score = asset_pipeline.generate_best_of_n("prompt", image_path, world_setting, 2)
+    
+    assert score is not None and score.passed
+    assert image_path.exists()
+    assert sorted(p.name for p in (tmp_path / "candidates").glob("*.png")) == ["剣_1.png", "剣_2.png"]
+
+def test_generate_best_of_n_cancels_remaining(asset_pipeline, world_setting, tmp_path):
+    """合格候補が出たら残りの候補をキャンセルするテスト"""
+    generator = FakeImageGenerator([(64, 64, 192, 192)])
+    asset_pipeline.image_generator = generator
+    asset_pipeline.candidate_parallelism = 1
+    asset_pipeline.accept_score = 3.0
+    
+    score = asset_pipeline.generate_best_of_n("prompt", tmp_path / "剣.png", world_setting, 4)
+    
+    assert score is not None
+    assert generator.calls == 1
+
+def test_generate_best_of_n_keeps_in_flight(asset_pipeline, world_setting, tmp_path, capsys):
+    """合格後も生成中だった候補は捨てずに評価・記録されるテスト"""
+    import threading
+
+    class ConcurrentImageGenerator(FakeImageGenerator):
+        """2件が同時に生成中になってから書き出す画像生成のスタブ"""
+        barrier = threading.Barrier(2)
+
+        def generate_image(self, prompt, output_path):
+            self.barrier.wait(timeout=5)
+            return super().generate_image(prompt, output_path)
+
+    generator = ConcurrentImageGenerator([(64, 64, 192, 192)])
+    asset_pipeline.image_generator = generator
+    asset_pipeline.candidate_parallelism = 2
+    asset_pipeline.accept_score = 3.0
+
+    score = asset_pipeline.generate_best_of_n("prompt", tmp_path / "剣.png", world_setting, 4)
+    output = capsys.readouterr().out
+
+    assert score is not None and generator.calls == 2
+    assert "候補 剣_1.png" in output and "候補 剣_2.png" in output
+    assert "2候補中" in output
+
+def test_postprocess_pixel_art_reuses_palette(asset_pipeline, tmp_path):
+    """use_pixel_palette で読み込んだ palette.json がピクセルアート化に再利用されるテスト"""
+    import json
+    from types import SimpleNamespace
+
+    FakeImageGenerator([(64, 64, 192, 192)]).generate_image("prompt", tmp_path / "剣.png")
+    colors = ["#ffffff", "#102030", "#fab428"]
+    palette_path = tmp_path / "palette.json"
+    palette_path.write_text(json.dumps({"grid_size": 64, "colors": colors}), encoding="utf-8")
+    asset_pipeline.use_pixel_palette(str(palette_path))
+
+    assets = [SimpleNamespace(status="generated", image_path=str(tmp_path / "剣.png"))]
+    asset_pipeline.postprocess_pixel_art(assets, tmp_path / "project")
+
+    saved = json.loads((tmp_path / "project" / "pixel_assets" / "palette.json").read_text(encoding="utf-8"))
+    assert saved["colors"] == colors
+
+def test_use_pixel_palette_rejects_invalid_file(asset_pipeline, tmp_path):
+    """色数・形式・グリッドサイズが合わないパレットは生成前に設定エラーになるテスト"""
+    import json
+
+    palette_path = tmp_path / "palette.json"
+    for data in ({"colors": ["#ffffff"]},
+                 {"colors": ["#ffffff"] * 257},
+                 {"colors": ["#ffffff", "red"]},
+                 {"grid_size": 32, "colors": ["#ffffff", "#102030"]}):
+        palette_path.write_text(json.dumps(data), encoding="utf-8")
+        with pytest.raises(ConfigurationError):
+            asset_pipeline.use_pixel_palette(str(palette_path))
+    with pytest.raises(ConfigurationError):
+        asset_pipeline.use_pixel_palette(str(tmp_path / "missing.json"))
+    assert asset_pipeline.pixel_palette is None
+
 def test_process_world(asset_pipeline, world_setting):
     """世界観処理テスト"""
     assets = asset_pipeline.process_world(world_setting)
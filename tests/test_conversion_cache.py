@@ -0,0 +1,58 @@
+"""
+conversion_cacheモジュールのテスト
+"""
+import os
+import pytest
+from conversion_cache import ConversionCache
+
+@pytest.fixture
+def output_dir(tmp_path):
+    """変換結果を模したファイル（モデル本体とLOD）"""
+    directory = tmp_path / "out"
+    (directory / "low").mkdir(parents=True)
+    (directory / "model.glb").write_bytes(b"glTF" + b"\0" * 96)
+    (directory / "low" / "model.glb").write_bytes(b"glTF" + b"\0" * 16)
+    return directory
+
+def test_key_depends_on_content_and_settings(tmp_path):
+    """キーは画像の内容と設定で変わり、ファイルのパスでは変わらないテスト"""
+    cache = ConversionCache(str(tmp_path / "cache"))
+    first, second = tmp_path / "a.png", tmp_path / "b.png"
+    first.write_bytes(b"image")
+    second.write_bytes(b"image")
+
+    key = cache.key(str(first), "model.glb", {"quality": "low"}, "v1")
+    assert cache.key(str(second), "model.glb", {"quality": "low"}, "v1") == key
+    assert cache.key(str(first), "model.glb", {"quality": "medium"}, "v1") != key
+    assert cache.key(str(first), "model.glb", {"quality": "low"}, "v2") != key
+
+    second.write_bytes(b"changed")
+    os.utime(second, ns=(1, 1))
+    assert cache.key(str(second), "model.glb", {"quality": "low"}, "v1") != key
+
+def test_store_and_restore(tmp_path, output_dir):
+    """保存した出力ファイルとメタデータが別のフォルダに復元され、再起動後も使えるテスト"""
+    cache = ConversionCache(str(tmp_path / "cache"))
+    files = [output_dir / "model.glb", output_dir / "low" / "model.glb"]
+    assert cache.restore("key", output_dir) is None
+    cache.store("key", output_dir, files, {"model_info": {"name": "model"}})
+
+    reopened = ConversionCache(str(tmp_path / "cache"))
+    restored_dir = tmp_path / "restored"
+    assert reopened.restore("key", restored_dir) == {"model_info": {"name": "model"}}
+    assert (restored_dir / "low" / "model.glb").read_bytes() == files[1].read_bytes()
+    assert reopened.stats()["hits"] == 1
+
+def test_evicts_least_recently_used(tmp_path, output_dir):
+    """上限を超えると最後に使ってから最も時間が経ったエントリを削除するテスト"""
+    files = [output_dir / "model.glb"]
+    cache = ConversionCache(str(tmp_path / "cache"), max_bytes=250)
+    cache.store("first", output_dir, files, {})
+    cache.store("second", output_dir, files, {})
+    assert cache.restore("first", tmp_path / "restored") is not None
+
+    cache.store("third", output_dir, files, {})
+    assert cache.stats()["entries"] == 2
+    assert cache.total_bytes <= 250
+    assert cache.restore("second", tmp_path / "restored") is None
+    assert not (cache.entries_dir / "second").exists()
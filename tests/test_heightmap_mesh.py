@@ -0,0 +1,151 @@
+"""
+heightmap_meshモジュールのテスト
+"""
+import json
+import struct
+import numpy as np
+import pytest
+from pathlib import Path
+from PIL import Image, ImageDraw
+from heightmap_mesh import (build_mesh, convert_image, polygon_area, to_xy, trace_contours,
+                            triangulate_polygon, LOD_LEVELS)
+
+def make_gradient_image(path: Path, size: int = 128) -> Path:
+    """左から右へ明るくなるテスト画像を作成"""
+    row = np.linspace(0, 255, size, dtype=np.uint8)
+    Image.fromarray(np.tile(row, (size, 1))).convert("RGB").save(path)
+    return path
+
+def read_glb(path: Path):
+    """GLBのJSONチャンクとバイナリチャンクを読み込む"""
+    data = path.read_bytes()
+    magic, version, length = struct.unpack("<4sII", data[:12])
+    assert magic == b"glTF" and version == 2 and length == len(data)
+    json_length, _ = struct.unpack("<II", data[12:20])
+    gltf = json.loads(data[20:20 + json_length])
+    binary = data[28 + json_length:]
+    return gltf, binary
+
+def test_build_mesh_respects_poly_limit(tmp_path):
+    """三角形数の上限と高さ・法線のテスト"""
+    with Image.open(make_gradient_image(tmp_path / "gradient.png")) as image:
+        mesh = build_mesh(image, poly_limit=1000, strength=0.2)
+        flat = build_mesh(image, poly_limit=1000, strength=0.0)
+
+    assert 0 < mesh.triangle_count <= 1000
+    assert mesh.indices.max() < mesh.vertex_count
+    # 明るい右端ほど高い（Y-up）
+    right = mesh.positions[:, 0] > 0.9
+    left = mesh.positions[:, 0] < -0.9
+    assert mesh.positions[right, 1].mean() > mesh.positions[left, 1].mean()
+    assert np.allclose(np.linalg.norm(mesh.normals, axis=1), 1.0, atol=1e-5)
+    # 強度0は1枚のプレーン
+    assert flat.triangle_count == 2
+
+def test_convert_glb(tmp_path):
+    """GLBの構造とLOD出力のテスト"""
+    image_path = make_gradient_image(tmp_path / "gradient.png")
+    output_path = tmp_path / "out" / "model.glb"
+    result = convert_image(str(image_path), str(output_path), "gltf", poly_limit=2000,
+                           displacement_strength=0.1, lod_levels=LOD_LEVELS)
+
+    gltf, binary = read_glb(output_path)
+    primitive = gltf["meshes"][0]["primitives"][0]
+    accessors = gltf["accessors"]
+    assert accessors[primitive["attributes"]["POSITION"]]["count"] == result["vertex_count"]
+    assert accessors[primitive["indices"]]["count"] == result["triangle_count"] * 3
+    assert gltf["images"][0]["mimeType"] == "image/png"
+    assert len(binary) == gltf["buffers"][0]["byteLength"]
+
+    # LODは元メッシュより三角形が少なく、誤差が記録される
+    low_gltf, _ = read_glb(Path(result["lods"]["low"]))
+    low_indices = low_gltf["accessors"][low_gltf["meshes"][0]["primitives"][0]["indices"]]
+    assert low_indices["count"] < accessors[primitive["indices"]]["count"]
+    assert low_indices["count"] == result["lod_stats"]["low"]["triangle_count"] * 3
+    assert result["lod_stats"]["high"]["error"] == 0.0
+    assert result["lod_stats"]["low"]["error"] >= result["lod_stats"]["medium"]["error"]
+    # 実際の頂点数・面数とテクスチャの大きさ、段階ごとの所要時間
+    assert result["meshes"]["base"]["faces"] == result["triangle_count"]
+    assert result["meshes"]["low"]["faces"] == result["lod_stats"]["low"]["triangle_count"]
+    assert result["texture"] == {"width": 128, "height": 128}
+    assert {"load", "displace", "lod", "export"} <= set(result["stages"])
+
+def test_convert_obj(tmp_path):
+    """OBJ・MTL・テクスチャ出力のテスト"""
+    image_path = make_gradient_image(tmp_path / "gradient.png")
+    output_path = tmp_path / "out" / "model.obj"
+    result = convert_image(str(image_path), str(output_path), "obj", poly_limit=500)
+
+    lines = output_path.read_text(encoding="utf-8").splitlines()
+    assert sum(line.startswith("v ") for line in lines) == result["vertex_count"]
+    assert sum(line.startswith("f ") for line in lines) == result["triangle_count"]
+    assert "map_Kd model.png" in (tmp_path / "out" / "model.mtl").read_text(encoding="utf-8")
+    assert (tmp_path / "out" / "model.png").exists()
+
+def test_unsupported_format(tmp_path):
+    """未対応フォーマットのテスト"""
+    image_path = make_gradient_image(tmp_path / "gradient.png")
+    with pytest.raises(ValueError):
+        convert_image(str(image_path), str(tmp_path / "model.fbx"), "fbx")
+
+def make_sprite_image(path: Path) -> Path:
+    """白背景に円と三角形の被写体を描いたテスト画像を作成"""
+    img = Image.new("RGB", (256, 256), "white")
+    draw = ImageDraw.Draw(img)
+    draw.ellipse([40, 40, 200, 200], fill=(200, 50, 50))
+    draw.polygon([(60, 150), (128, 250), (196, 150)], fill=(20, 120, 30))
+    img.save(path)
+    return path
+
+def test_trace_contours_drops_holes():
+    """マーチングスクエアの外周抽出（穴は含めない）テスト"""
+    mask = np.zeros((6, 6), dtype=bool)
+    mask[1:4, 1:5] = True
+    mask[2, 2] = False
+    contours = trace_contours(mask)
+    assert len(contours) == 1
+    assert polygon_area(to_xy(contours[0])) == pytest.approx(11.5)
+
+def test_triangulate_polygon():
+    """耳刈り取り法で凹多角形が正しく分割されるテスト"""
+    xy = np.array([[0, 0], [4, 0], [4, 4], [2, 1], [0, 4]], dtype=np.float64)
+    triangles = triangulate_polygon(xy)
+    a, b, c = xy[triangles[:, 0]], xy[triangles[:, 1]], xy[triangles[:, 2]]
+    areas = 0.5 * ((b - a)[:, 0] * (c - a)[:, 1] - (b - a)[:, 1] * (c - a)[:, 0])
+    assert len(triangles) == 3
+    assert (areas > 0).all()
+    assert areas.sum() == pytest.approx(polygon_area(xy))
+
+def test_silhouette_mode(tmp_path):
+    """silhouette モードは被写体だけをメッシュ化するテスト"""
+    image_path = make_sprite_image(tmp_path / "sprite.png")
+    plane = convert_image(str(image_path), str(tmp_path / "plane.glb"), "gltf", poly_limit=5000)
+    silhouette = convert_image(str(image_path), str(tmp_path / "silhouette.glb"), "gltf",
+                               poly_limit=5000, mesh_mode="silhouette", thickness=0.1)
+
+    assert silhouette["triangle_count"] <= 5000
+    assert silhouette["triangle_count"] < plane["triangle_count"]
+    gltf, _ = read_glb(tmp_path / "silhouette.glb")
+    position = gltf["accessors"][0]
+    # 厚み方向（Y-up）に押し出され、背景の角には頂点がない
+    assert position["max"][1] - position["min"][1] == pytest.approx(0.1)
+    assert position["max"][0] < 0.95 and position["min"][0] > -0.95
+
+def test_silhouette_without_subject(tmp_path):
+    """被写体がない画像は平面にフォールバックするテスト"""
+    image_path = tmp_path / "blank.png"
+    Image.new("RGB", (64, 64), "white").save(image_path)
+    result = convert_image(str(image_path), str(tmp_path / "blank.glb"), "gltf", mesh_mode="silhouette")
+    assert result["triangle_count"] == 2
+
+def test_normal_map_surface_detail(tmp_path):
+    """normal_map ではメッシュを変形せずにノーマルマップとAOを付けるテスト"""
+    image_path = make_gradient_image(tmp_path / "gradient.png")
+    result = convert_image(str(image_path), str(tmp_path / "model.glb"), "gltf",
+                           displacement_strength=0.1, surface_detail="normal_map")
+
+    assert result["triangle_count"] == 2
+    gltf, _ = read_glb(tmp_path / "model.glb")
+    material = gltf["materials"][0]
+    assert "normalTexture" in material and "occlusionTexture" in material
+    assert len(gltf["images"]) == 3
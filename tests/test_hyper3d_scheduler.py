@@ -0,0 +1,148 @@
+"""
+hyper3d_schedulerモジュールのテスト
+"""
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+from hyper3d_scheduler import Hyper3DError, Hyper3DScheduler
+
+ROOT = Path(__file__).resolve().parent.parent
+
+class StubJobServer:
+    """プロンプトで指定した秒数後に完了する Hyper3D のジョブサーバー（"fail" を含むプロンプトは失敗する）"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.running = 0
+        self.peak = 0
+        self.polls = 0
+
+    async def call_tool(self, name, arguments=None):
+        if name == "generate_hyper3d_model_via_text":
+            key = f"job{len(self.jobs)}"
+            prompt = arguments["text_prompt"]
+            seconds = float(prompt.split()[-1]) if prompt[-1].isdigit() else 0.0
+            self.jobs[key] = {"ready_at": time.monotonic() + seconds, "fail": "fail" in prompt, "done": False}
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            text = json.dumps({"task_uuid": key, "subscription_key": key})
+        else:
+            self.polls += 1
+            job = self.jobs[arguments["subscription_key"]]
+            if job["fail"]:
+                state = "Failed"
+            elif time.monotonic() >= job["ready_at"]:
+                state = "Done"
+            else:
+                state = "Generating"
+            if state != "Generating" and not job["done"]:
+                job["done"] = True
+                self.running -= 1
+            text = json.dumps({"status_list": [state]})
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=text)], isError=False)
+
+def test_jobs_run_concurrently_and_finish_in_completion_order():
+    """上限までのジョブが同時に生成され、完了した順に返されるテスト"""
+    server = StubJobServer()
+    items = [{"name": f"Item{i}", "prompt": f"model {seconds}"} for i, seconds in enumerate([0.3, 0.1, 0.2, 0.1, 0.2, 0.1])]
+
+    async def scenario():
+        async with Hyper3DScheduler(server, max_in_flight=3, min_interval=0.02, max_interval=0.1) as scheduler:
+            started = time.perf_counter()
+            names = [job.name async for job in scheduler.generate_all(items)]
+            return names, time.perf_counter() - started, scheduler.stats()
+
+    names, elapsed, stats = asyncio.run(scenario())
+    assert sorted(names) == sorted(item["name"] for item in items)
+    assert names[0] in ("Item1", "Item3") and names.index("Item0") > names.index("Item1")
+    assert server.peak == 3
+    # 逐次なら 1.0秒かかる
+    assert elapsed < 0.7
+    assert stats["completed"] == 6 and stats["failed"] == 0 and stats["running"] == 0
+    assert stats["poll_requests"] == server.polls
+
+def test_poll_interval_adapts():
+    """確認の間隔が延び、完了したジョブの所要時間より前には確認しないテスト"""
+    server = StubJobServer()
+
+    async def scenario():
+        async with Hyper3DScheduler(server, max_in_flight=2, min_interval=0.01, max_interval=1.0, backoff=2.0) as scheduler:
+            first = await scheduler.generate("First", "model 0.3")
+            second = await scheduler.generate("Second", "model 0.3")
+            return first, second
+
+    first, second = asyncio.run(scenario())
+    # 0.01, 0.02, 0.04, ... と延ばすので 0.3秒のジョブでも確認は数回
+    assert 3 <= first.polls <= 6
+    # 2回目は前回の所要時間まで待ってから確認する
+    assert second.polls < first.polls
+    assert first.seconds >= 0.3
+
+def test_failures_and_timeouts_release_slots():
+    """失敗・タイムアウトしたジョブがエラーになり、枠が空いて次のジョブが実行されるテスト"""
+    server = StubJobServer()
+
+    async def scenario():
+        async with Hyper3DScheduler(server, max_in_flight=1, min_interval=0.01, max_interval=0.02) as scheduler:
+            with pytest.raises(Hyper3DError):
+                await scheduler.generate("Broken", "fail")
+            with pytest.raises(Hyper3DError, match="タイムアウト"):
+                await scheduler.generate("Slow", "model 5", timeout=0.1)
+            job = await scheduler.generate("Quick", "model 0.05")
+            return job, scheduler.stats()
+
+    job, stats = asyncio.run(scenario())
+    assert job.status == "done"
+    assert (stats["completed"], stats["failed"]) == (1, 2)
+
+def test_stub_blender_mcp_server():
+    """blender-mcp 代替サーバーで生成したモデルを完了した順にインポートできるテスト"""
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    async def scenario():
+        server = StdioServerParameters(command=sys.executable,
+                                       args=[str(ROOT / "fake_blender_mcp.py"), "--hyper3d-seconds", "0.3"])
+        async with stdio_client(server) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                async with Hyper3DScheduler(session, max_in_flight=4, min_interval=0.05) as scheduler:
+                    started = time.perf_counter()
+                    imported = []
+                    async for job in scheduler.generate_all([{"name": f"Item{i}", "prompt": "chair"} for i in range(4)]):
+                        imported.append(json.loads(await scheduler.call("import_generated_asset", job.import_arguments())))
+                    return imported, time.perf_counter() - started
+
+    imported, elapsed = asyncio.run(scenario())
+    assert all(result["succeed"] for result in imported)
+    assert sorted(result["name"] for result in imported) == [f"Item{i}" for i in range(4)]
+    assert elapsed < 1.0  # 逐次なら 1.2秒以上
+
+class BrokenPollServer(StubJobServer):
+    """状態確認で通信エラーを出すジョブサーバー"""
+
+    async def call_tool(self, name, arguments=None):
+        if name == "poll_rodin_job_status":
+            raise ConnectionError("connection lost")
+        return await super().call_tool(name, arguments)
+
+def test_transport_errors_do_not_stop_polling():
+    """状態確認の通信エラーでもポーリングが止まらず、ジョブがタイムアウトで失敗するテスト"""
+    async def scenario():
+        async with Hyper3DScheduler(BrokenPollServer(), min_interval=0.01, max_interval=0.02) as scheduler:
+            with pytest.raises(Hyper3DError, match="タイムアウト"):
+                await asyncio.wait_for(scheduler.generate("Lost", "model 0.1", timeout=0.1), 2)
+            assert not scheduler._poller.done()
+            job = await scheduler.submit("Pending", "model 0.1", timeout=10)
+            await asyncio.sleep(0.05)
+            scheduler._poller.cancel()
+            await asyncio.wait_for(job.future, 1)
+            return job
+
+    job = asyncio.run(scenario())
+    # ポーリングが止まると実行中のジョブは失敗になる
+    assert job.status == "failed" and "ポーリングが停止" in job.error and "ConnectionError" in job.error
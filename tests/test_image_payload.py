@@ -0,0 +1,56 @@
+"""
+image_payloadモジュールのテスト
+"""
+import base64
+import io
+import numpy as np
+from PIL import Image
+from image_payload import MAX_EDGE, ImagePayloadCache, encode_image, target_size
+
+def make_photo(path, size=(3000, 2000)):
+    """JPEGの方が小さくなる写真風の画像（ノイズ入りのグラデーション）"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, size[0])[None, :, None]
+    pixels = np.clip(x + rng.normal(0, 20, (size[1], size[0], 3)), 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path)
+    return path
+
+def test_large_photo_is_downsized_to_jpeg(tmp_path):
+    """大きな写真は上限まで縮小してJPEGで送るテスト"""
+    payload = encode_image(str(make_photo(tmp_path / "photo.png")))
+
+    assert payload.media_type == "image/jpeg"
+    assert (payload.width, payload.height) == target_size(3000, 2000)
+    assert max(payload.width, payload.height) <= MAX_EDGE
+    assert payload.encoded_bytes < payload.original_bytes / 4
+    with Image.open(io.BytesIO(base64.b64decode(payload.data))) as image:
+        assert image.format == "JPEG" and image.size == (payload.width, payload.height)
+
+def test_transparent_and_small_images_keep_png(tmp_path):
+    """透明な画像はPNGのまま、小さい画像は縮小せず元ファイルより大きくならないテスト"""
+    sprite = tmp_path / "sprite.png"
+    image = Image.new("RGBA", (2000, 2000), (0, 0, 0, 0))
+    image.paste((200, 50, 50, 255), (500, 500, 1500, 1500))
+    image.save(sprite)
+    payload = encode_image(str(sprite))
+    assert payload.media_type == "image/png"
+    assert max(payload.width, payload.height) <= MAX_EDGE
+
+    small = tmp_path / "small.png"
+    Image.new("RGB", (64, 64), (10, 20, 30)).save(small)
+    payload = encode_image(str(small))
+    assert payload.media_type == "image/png"
+    assert (payload.width, payload.height) == (64, 64)
+    assert payload.encoded_bytes <= small.stat().st_size
+
+def test_cache_reuses_encoded_payload(tmp_path):
+    """同じ内容の画像はディスクのキャッシュから返されるテスト"""
+    photo = make_photo(tmp_path / "photo.png", size=(1800, 1200))
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(photo.read_bytes())
+
+    first = ImagePayloadCache(str(tmp_path / "cache")).get(str(photo))
+    cache = ImagePayloadCache(str(tmp_path / "cache"))
+    second = cache.get(str(copy))
+    assert first.cached is False and second.cached is True
+    assert second.data == first.data and cache.hits == 1
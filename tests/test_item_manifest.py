@@ -0,0 +1,37 @@
+"""
+item_manifestモジュールのテスト
+"""
+from item_manifest import ItemManifest, item_fingerprint
+
+ITEM = {"name": "LongSword", "prompt": "A longsword", "metadata": {"type": "weapon", "size": {"length": "long"}}}
+SETTINGS = {"export": {"export_format": "glb"}, "export_options": {"include_materials": True}}
+
+def test_fingerprint_covers_prompt_metadata_and_settings():
+    """prompt・metadata・エクスポート設定のどれが変わってもハッシュが変わるテスト"""
+    base = item_fingerprint(ITEM, SETTINGS)
+    assert item_fingerprint(dict(ITEM, metadata=dict(ITEM["metadata"])), dict(SETTINGS)) == base
+    assert item_fingerprint(dict(ITEM, prompt="A short sword"), SETTINGS) != base
+    assert item_fingerprint(dict(ITEM, metadata={"type": "weapon", "size": {"length": "short"}}), SETTINGS) != base
+    assert item_fingerprint(ITEM, dict(SETTINGS, export={"export_format": "obj"})) != base
+
+def test_output_must_exist_and_match(tmp_path):
+    """書き出したファイルが残っていて内容が一致する間だけ変更なしと判定され、保存・再読み込みできるテスト"""
+    output = tmp_path / "out" / "LongSword.glb"
+    output.parent.mkdir()
+    output.write_bytes(b"glb-data")
+    fingerprint = item_fingerprint(ITEM, SETTINGS)
+
+    manifest = ItemManifest(str(tmp_path / "manifest.json"))
+    assert not manifest.is_current("LongSword", fingerprint)
+    assert manifest.record("LongSword", fingerprint, str(output))
+    assert not manifest.record("Missing", fingerprint, str(tmp_path / "missing.glb"))
+    manifest.save()
+
+    reloaded = ItemManifest(str(tmp_path / "manifest.json"))
+    assert reloaded.is_current("LongSword", fingerprint)
+    assert not reloaded.is_current("LongSword", item_fingerprint(dict(ITEM, prompt="edited"), SETTINGS))
+    output.write_bytes(b"glb-DATA")
+    assert not reloaded.is_current("LongSword", fingerprint)
+    output.unlink()
+    assert not reloaded.is_current("LongSword", fingerprint)
+    assert reloaded.stats() == {"unchanged": 1, "changed": 3, "recorded": 1}
@@ -0,0 +1,51 @@
+"""
+mesh_simplifyモジュールのテスト
+"""
+import numpy as np
+import pytest
+from heightmap_mesh import build_grid
+from mesh_simplify import simplify, simplify_levels
+
+def make_bumpy_grid(cells: int = 30, strength: float = 0.2):
+    """中央が盛り上がったグリッドメッシュ"""
+    y, x = np.mgrid[-1:1:complex(cells + 1), -1:1:complex(cells + 1)]
+    heights = np.exp(-(x ** 2 + y ** 2) * 4).astype(np.float32)
+    return build_grid(heights, strength)
+
+def face_normals(positions, indices):
+    a, b, c = positions[indices[:, 0]], positions[indices[:, 1]], positions[indices[:, 2]]
+    return np.cross(b - a, c - a)
+
+def test_flat_grid_collapses_without_error():
+    """平面は境界を保ったまま2枚の三角形まで簡略化できるテスト"""
+    mesh = build_grid(np.full((11, 11), 0.5, dtype=np.float32), 0.1)
+    result = simplify(mesh.positions, mesh.indices, 2)
+
+    assert result.triangle_count == 2
+    assert result.error == pytest.approx(0.0, abs=1e-6)
+    corners = mesh.positions[result.kept]
+    assert np.allclose(np.abs(corners[:, [0, 2]]), 1.0)
+
+def test_simplify_levels():
+    """LODの一括生成で三角形数と誤差が単調になるテスト"""
+    mesh = make_bumpy_grid()
+    levels = simplify_levels(mesh.positions, mesh.indices, [1000, 400, 100])
+
+    counts = [level.triangle_count for level in levels]
+    errors = [level.error for level in levels]
+    assert counts[0] <= 1000 and counts[1] <= 400 and counts[2] <= 100
+    assert errors == sorted(errors)
+    assert errors[-1] > 0
+    for level in levels:
+        assert level.indices.max() < len(level.kept)
+        # 面が裏返らない（すべて上向き）
+        normals = face_normals(mesh.positions[level.kept], level.indices)
+        assert (normals[:, 1] > 0).all()
+
+def test_boundary_is_preserved():
+    """境界の頂点が境界の外へ動かないテスト"""
+    mesh = make_bumpy_grid()
+    result = simplify(mesh.positions, mesh.indices, 200)
+    kept = mesh.positions[result.kept]
+    assert kept[:, 0].min() == pytest.approx(-1.0) and kept[:, 0].max() == pytest.approx(1.0)
+    assert kept[:, 2].min() == pytest.approx(-1.0) and kept[:, 2].max() == pytest.approx(1.0)
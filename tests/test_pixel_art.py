@@ -0,0 +1,53 @@
+"""
+PixelArtProcessorクラスのテスト
+"""
+import numpy as np
+import pytest
+from pathlib import Path
+from PIL import Image, ImageDraw
+from pixel_art import PixelArtProcessor, kmeans_palette, load_palette, BACKGROUND_COLOR
+
+def make_sprite(path: Path, colors: list) -> Path:
+    """白背景に色帯のある被写体を描いたテスト画像を作成"""
+    img = Image.new("RGB", (512, 512), "white")
+    draw = ImageDraw.Draw(img)
+    for i, color in enumerate(colors):
+        draw.rectangle([128, 128 + i * 64, 384, 192 + i * 64], fill=color)
+    img.save(path)
+    return path
+
+@pytest.fixture
+def processor():
+    """PixelArtProcessorのフィクスチャ"""
+    return PixelArtProcessor(grid_size=32, palette_size=8, max_workers=2)
+
+def test_kmeans_palette():
+    """k-meansで代表色が求まるテスト"""
+    rng = np.random.default_rng(1)
+    red = rng.normal((220, 30, 30), 5, size=(200, 3))
+    blue = rng.normal((30, 30, 220), 5, size=(200, 3))
+    palette = kmeans_palette(np.clip(np.vstack([red, blue]), 0, 255), 2)
+    
+    assert palette.shape == (2, 3)
+    reds = sorted(palette[:, 0].tolist())
+    assert reds[0] < 60 and reds[1] > 180
+
+def test_process_project(processor, tmp_path):
+    """プロジェクト共通パレットでの後処理テスト"""
+    paths = [
+        make_sprite(tmp_path / "a.png", [(200, 40, 40), (40, 160, 40)]),
+        make_sprite(tmp_path / "b.png", [(40, 40, 200)]),
+        make_sprite(tmp_path / "c.png", [(200, 40, 40), (240, 220, 60)]),
+    ]
+    result = processor.process_project(paths, tmp_path / "pixel")
+    
+    assert result.palette[0] == BACKGROUND_COLOR
+    assert len(result.palette) <= 8
+    for output_path in result.output_paths.values():
+        with Image.open(output_path) as image:
+            assert image.mode == "P"
+            assert max(image.size) == 32
+            # 全アセットで同じパレットを共有
+            assert image.getpalette()[:len(result.palette) * 3] == [c for color in result.palette for c in color]
+    
+    assert np.array_equal(load_palette(result.palette_path), np.array(result.palette, dtype=np.uint8))
@@ -0,0 +1,84 @@
+"""
+QualityScorerクラスのテスト
+"""
+import json
+import numpy as np
+import pytest
+from pathlib import Path
+from PIL import Image, ImageFilter
+from quality_scorer import QualityScorer, QUALITY_CRITERIA
+
+def make_asset_image(path: Path, size: int = 256, box: tuple = (64, 64, 192, 192),
+                     color: tuple = (240, 200, 60), blur: float = 0.0) -> Path:
+    """白背景に模様付きの被写体を描いたテスト画像を作成"""
+    img = Image.new("RGB", (size, size), "white")
+    x0, y0, x1, y1 = box
+    rng = np.random.default_rng(0)
+    noise = rng.integers(-60, 60, size=(y1 - y0, x1 - x0, 3))
+    patch = np.clip(np.array(color)[None, None, :] + noise, 0, 255).astype(np.uint8)
+    img.paste(Image.fromarray(patch), (x0, y0))
+    if blur:
+        img = img.filter(ImageFilter.GaussianBlur(blur))
+    img.save(path)
+    return path
+
+@pytest.fixture
+def scorer():
+    """QualityScorerのフィクスチャ"""
+    return QualityScorer(max_workers=2)
+
+def test_score_good_image(scorer, tmp_path):
+    """中央に被写体がある白背景画像の評価テスト"""
+    image_path = make_asset_image(tmp_path / "good.png")
+    result = scorer.score_image(str(image_path), "bright", "world_good")
+
+    assert result.asset_id == "world_good"
+    assert set(result.scores) == set(QUALITY_CRITERIA)
+    assert result.scores["background_purity"] == pytest.approx(5.0)
+    assert result.scores["subject_centering"] > 4.5
+    assert result.passed
+
+def test_score_blurred_image(scorer, tmp_path):
+    """ぼやけた画像のシャープネスが下がるテスト"""
+    sharp = scorer.score_image(str(make_asset_image(tmp_path / "sharp.png")))
+    blurred = scorer.score_image(str(make_asset_image(tmp_path / "blur.png", blur=6)))
+    assert blurred.scores["sharpness"] < sharp.scores["sharpness"]
+
+def test_score_off_center_and_dirty_background(scorer, tmp_path):
+    """被写体のずれと背景汚れの検出テスト"""
+    image_path = make_asset_image(tmp_path / "bad.png", box=(0, 0, 90, 256))
+    result = scorer.score_image(str(image_path))
+    assert result.scores["background_purity"] < 5.0
+    assert result.scores["subject_centering"] < 3.0
+    assert "subject_centering" in result.failed_criteria()
+
+def test_palette_adherence(scorer, tmp_path):
+    """カラーパレット適合度のテスト"""
+    image_path = make_asset_image(tmp_path / "dark.png", color=(30, 30, 40))
+    dark = scorer.score_image(str(image_path), "dark")
+    bright = scorer.score_image(str(image_path), "bright")
+    unknown = scorer.score_image(str(image_path), "unknown")
+
+    assert dark.scores["palette_adherence"] > bright.scores["palette_adherence"]
+    assert "palette_adherence" not in unknown.scores
+
+def test_score_project(scorer, tmp_path):
+    """プロジェクト一括評価と quality_evaluations.json 出力のテスト"""
+    project_dir = tmp_path / "project"
+    (project_dir / "assets").mkdir(parents=True)
+    with open(project_dir / "world_setting.json", "w", encoding="utf-8") as f:
+        json.dump({"name": "テスト世界", "color_palette": "bright"}, f)
+    for i in range(4):
+        make_asset_image(project_dir / "assets" / f"asset{i}.png")
+
+    results = scorer.score_project(project_dir)
+    assert len(results) == 4
+    assert results[0].asset_id == "テスト世界_asset0"
+
+    with open(project_dir / "quality_evaluations.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    assert len(data["criteria"]) == len(QUALITY_CRITERIA)
+    assert len(data["evaluations"]) == 4 * len(QUALITY_CRITERIA)
+    row = data["evaluations"][0]
+    assert row["evaluation_method"] == "auto"
+    assert 0.0 <= row["score"] <= 5.0
@@ -0,0 +1,39 @@
+"""
+surface_mapsモジュールのテスト
+"""
+import numpy as np
+from pathlib import Path
+from PIL import Image
+from surface_maps import ambient_occlusion, bake_surface_maps, normal_map
+
+def test_flat_height_points_up():
+    """平らな高さはノーマルが真上（128, 128, 255）になるテスト"""
+    normal = normal_map(np.full((16, 16), 0.5, dtype=np.float32), strength=0.2)
+    assert (normal == [128, 128, 255]).all()
+
+def test_slope_direction():
+    """右・上に向かって高くなる面はノーマルが左・下に傾くテスト（緑=+Y）"""
+    ramp = np.tile(np.linspace(0, 1, 32, dtype=np.float32), (32, 1))
+    assert normal_map(ramp, 0.1)[8:-8, 8:-8, 0].max() < 128
+    # 行が小さい（画像の上）ほど高い
+    upward = ramp.T[::-1].copy()
+    assert normal_map(upward, 0.1)[8:-8, 8:-8, 1].max() < 128
+
+def test_ambient_occlusion_darkens_cavities():
+    """くぼみだけが暗くなるテスト"""
+    height = np.ones((256, 256), dtype=np.float32)
+    height[126:130, 126:130] = 0.0
+    occlusion = ambient_occlusion(height, 0.1)
+    assert occlusion[128, 128] < 128
+    assert occlusion[10, 10] == 255
+
+def test_bake_and_save(tmp_path):
+    """マップのベイクと保存のテスト"""
+    image_path = tmp_path / "asset.png"
+    Image.new("RGB", (300, 200), (90, 90, 90)).save(image_path)
+    maps = bake_surface_maps(str(image_path), texture_size=128, height=True)
+
+    assert maps.normal.shape == (85, 128, 3)
+    paths = maps.save(tmp_path / "maps", "asset")
+    assert set(paths) == {"normal", "occlusion", "height"}
+    assert Path(paths["normal"]).name == "asset_normal.png"
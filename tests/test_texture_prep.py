@@ -0,0 +1,37 @@
+"""
+texture_prepモジュールのテスト
+"""
+import numpy as np
+from PIL import Image
+from texture_prep import prepare_texture
+
+def test_prepare_texture_resizes_and_builds_displacement(tmp_path):
+    """長辺を texture_size に縮小し、16bitの輝度画像を作るテスト"""
+    image_path = tmp_path / "wide.png"
+    row = np.linspace(0, 255, 400, dtype=np.uint8)
+    Image.fromarray(np.tile(row, (200, 1))).convert("RGB").save(image_path)
+
+    prepared = prepare_texture(str(image_path), str(tmp_path / "out"), texture_size=100)
+
+    assert prepared.size == (100, 50)
+    with Image.open(prepared.color_path) as color:
+        assert color.size == (100, 50) and color.mode == "RGB"
+    with Image.open(prepared.displacement_path) as displacement:
+        heights = np.asarray(displacement)
+    assert displacement.size == (100, 50)
+    assert heights.max() > 255
+    # 左から右へ明るくなる
+    assert heights[:, -1].mean() > heights[:, 0].mean()
+    assert prepared.settings()["displacement_texture"] == prepared.displacement_path
+
+def test_prepare_texture_keeps_small_images_and_alpha(tmp_path):
+    """texture_size 以下の画像は拡大せず、透過を残すテスト"""
+    image_path = tmp_path / "sprite.png"
+    Image.new("RGBA", (32, 16), (255, 0, 0, 0)).save(image_path)
+
+    prepared = prepare_texture(str(image_path), str(tmp_path), texture_size=1024, name="model")
+
+    assert prepared.size == (32, 16)
+    assert prepared.color_path.endswith("model_color.png")
+    with Image.open(prepared.color_path) as color:
+        assert color.mode == "RGBA"
@@ -0,0 +1,76 @@
+"""
+tool_cacheモジュールのテスト
+"""
+import asyncio
+from types import SimpleNamespace
+from mcp.types import ListToolsResult, Tool
+from tool_cache import CachingSession
+
+class CountingSession:
+    """ツールごとの呼び出し回数を数えるMCPセッション"""
+
+    def __init__(self):
+        self.calls = []
+        self.list_calls = 0
+
+    async def call_tool(self, name, arguments=None):
+        self.calls.append(name)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=f"{name}:{len(self.calls)}")],
+                               isError=name == "get_object_info" and arguments.get("object_name") == "missing")
+
+    async def list_tools(self):
+        self.list_calls += 1
+        return ListToolsResult(tools=[Tool(name="get_scene_info", description="scene",
+                                           inputSchema={"type": "object", "properties": {}})])
+
+def test_read_only_results_cached_until_mutation():
+    """読み取り専用ツールはシーンを変更するツールが実行されるまで再利用されるテスト"""
+    inner = CountingSession()
+    session = CachingSession(inner)
+
+    async def scenario():
+        first = await session.call_tool("get_scene_info", {})
+        second = await session.call_tool("get_scene_info", {})
+        await session.call_tool("execute_blender_code", {"code": "pass"})
+        third = await session.call_tool("get_scene_info", {})
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert second is first and third is not first
+    assert inner.calls == ["get_scene_info", "execute_blender_code", "get_scene_info"]
+    assert (session.hits, session.misses, session.invalidations) == (1, 2, 1)
+
+def test_concurrent_calls_share_one_request():
+    """同時に実行された同じ呼び出しは1回だけ送られ、エラーと状態確認は保存されないテスト"""
+    inner = CountingSession()
+    session = CachingSession(inner)
+
+    async def scenario():
+        await asyncio.gather(*(session.call_tool("get_hyper3d_status", {}) for _ in range(5)))
+        await session.call_tool("get_object_info", {"object_name": "missing"})
+        await session.call_tool("get_object_info", {"object_name": "missing"})
+        await session.call_tool("poll_rodin_job_status", {"subscription_key": "k"})
+        await session.call_tool("poll_rodin_job_status", {"subscription_key": "k"})
+
+    asyncio.run(scenario())
+    assert inner.calls.count("get_hyper3d_status") == 1
+    assert inner.calls.count("get_object_info") == 2
+    assert inner.calls.count("poll_rodin_job_status") == 2
+    # 状態確認はシーンを変更しないのでキャッシュは破棄されない
+    assert session.invalidations == 0
+
+def test_tool_list_cached_by_server_version(tmp_path):
+    """ツール一覧は同じバージョンのサーバーならディスクから読み込まれるテスト"""
+    info = SimpleNamespace(name="BlenderMCP", version="1.2.0")
+    first_inner, second_inner, other_inner = CountingSession(), CountingSession(), CountingSession()
+
+    first = asyncio.run(CachingSession(first_inner, info, str(tmp_path)).list_tools())
+    cached_session = CachingSession(second_inner, info, str(tmp_path))
+    cached = asyncio.run(cached_session.list_tools())
+    asyncio.run(CachingSession(other_inner, SimpleNamespace(name="BlenderMCP", version="1.3.0"),
+                               str(tmp_path)).list_tools())
+
+    assert (first_inner.list_calls, second_inner.list_calls, other_inner.list_calls) == (1, 0, 1)
+    assert cached_session.schema_cached is True
+    assert cached.tools[0].name == first.tools[0].name == "get_scene_info"
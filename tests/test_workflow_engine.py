@@ -0,0 +1,231 @@
+"""
+workflow_engineモジュールのテスト
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+import pytest
+import yaml
+from item_manifest import ItemManifest
+from workflow_engine import McpActions, StepFailed, WorkflowEngine, WorkflowError, load_workflow
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKFLOW = """
+steps:
+  - name: "ファイル確認"
+    action: "check_files"
+    type: "init"
+  - name: "シーン情報取得"
+    action: "get_scene_info"
+    type: "check"
+  - name: "Hyper3Dの状態確認"
+    action: "get_hyper3d_status"
+    type: "check"
+  - name: "アイテム処理"
+    action: "process_items"
+    type: "loop"
+    loop_settings:
+      target: "items"
+      for_each:
+        - step: "generate"
+          action: "generate_hyper3d_model"
+          params: {use_item_prompt: true, wait_for_completion: true, timeout: 5}
+        - step: "import"
+          action: "import_generated_asset"
+          params:
+            use_item_name: true
+            position: {type: "incremental", x_offset: "${placement.x_offset}", y: "${placement.initial_position.y}"}
+        - step: "export"
+          action: "export_individual_asset"
+          params:
+            target_object: "${current_item.name}"
+            export_format: "glb"
+            output_path: "${export_settings.output_directory}/${current_item.name}.glb"
+generation:
+  error_handling:
+    continue_on_error: true
+    log_errors: true
+    error_log_file: "{log}"
+    export_errors: {skip_on_failure: true, retry_count: 2, fallback_format: "obj"}
+placement:
+  x_offset: 5.0
+  initial_position: {x: 1.0, y: 2.0, z: 0.0}
+export_settings:
+  output_directory: "{output}/assets_${date}"
+  date_format: "YYYYMMDD-HHMM"
+  naming_convention: {pattern: "${item_name}"}
+items_config:
+  external_file: "items.yaml"
+"""
+
+@pytest.fixture
+def workflow_file(tmp_path):
+    """4アイテムのワークフロー定義とアイテムリスト"""
+    items = [{"name": f"Item{i}", "prompt": f"prompt {i}"} for i in range(4)]
+    (tmp_path / "items.yaml").write_text(yaml.safe_dump({"items": items}), encoding="utf-8")
+    path = tmp_path / "workflow.yaml"
+    path.write_text(WORKFLOW.replace("{log}", str(tmp_path / "errors.log")).replace("{output}", str(tmp_path)),
+                    encoding="utf-8")
+    return path
+
+class FakeActions:
+    """資源ごとの同時実行数を記録するアクション（fail に含む手順は失敗する）"""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.running = {}
+        self.peak = {}
+
+    def action(self, resource, delay):
+        async def run(context):
+            key = f"{context.step.id}:{context.params.get('export_format', '')}"
+            self.running[resource] = self.running.get(resource, 0) + 1
+            self.peak[resource] = max(self.peak.get(resource, 0), self.running[resource])
+            try:
+                await asyncio.sleep(delay)
+                if context.step.id in self.fail or key in self.fail:
+                    raise StepFailed(f"{key} の失敗")
+                return {"id": context.step.id}
+            finally:
+                self.running[resource] -= 1
+        return run
+
+    def as_dict(self):
+        return {
+            "check_files": self.action("local", 0),
+            "get_scene_info": self.action("blender", 0.01),
+            "get_hyper3d_status": self.action("blender", 0.01),
+            "generate_hyper3d_model": self.action("remote", 0.1),
+            "import_generated_asset": self.action("blender", 0.02),
+            "export_individual_asset": self.action("blender", 0.02),
+        }
+
+def test_variables_resolved_up_front(workflow_file):
+    """変数が読み込み時に解決され、アイテムごとの手順の依存関係が作られるテスト"""
+    workflow = load_workflow(str(workflow_file), now=datetime(2025, 5, 28, 18, 5))
+
+    export = workflow.steps["Item2:export"]
+    assert export.params["target_object"] == "Item2"
+    assert export.params["output_path"] == f"{workflow_file.parent}/assets_20250528-1805/Item2.glb"
+    assert (export.retries, export.fallback, export.skip_on_failure) == (2, {"export_format": "obj"}, True)
+    # 文字列全体が変数なら元の型のまま
+    assert workflow.steps["Item0:import"].params["position"]["x_offset"] == 5.0
+    # アイテムごとの変数は全体の設定ではそのまま残る
+    assert workflow.config["export_settings"]["naming_convention"]["pattern"] == "${item_name}"
+    assert workflow.steps["Item1:generate"].deps == ["check_files", "get_scene_info", "get_hyper3d_status"]
+    assert workflow.steps["get_scene_info"].deps == ["check_files"]
+    assert export.deps == ["Item2:import"]
+
+    workflow_file.write_text(workflow_file.read_text(encoding="utf-8").replace("placement.x_offset", "placement.missing"),
+                             encoding="utf-8")
+    with pytest.raises(WorkflowError):
+        load_workflow(str(workflow_file))
+
+def test_generation_parallel_and_blender_serialized(workflow_file):
+    """生成はmax_remote件まで並列に、Blenderの手順は1件ずつ実行されるテスト"""
+    workflow = load_workflow(str(workflow_file))
+    actions = FakeActions()
+    report = asyncio.run(WorkflowEngine(workflow, actions.as_dict(), max_remote=3, log=lambda message: None).run())
+
+    assert report["succeeded"] == len(workflow.steps) and report["failed"] == 0
+    assert actions.peak == {"local": 1, "blender": 1, "remote": 3}
+    # 逐次実行なら 0.4秒以上かかる生成が重なって実行される
+    assert report["elapsed_seconds"] < report["busy_seconds"]
+    assert report["action_seconds"]["generate_hyper3d_model"] >= 0.4
+    assert all(step["seconds"] > 0 for step in report["steps"] if step["action"] != "check_files")
+
+def test_retry_fallback_and_continue_on_error(workflow_file):
+    """エクスポートはリトライ後にフォールバック形式で保存され、失敗したアイテムの後続だけがスキップされるテスト"""
+    workflow = load_workflow(str(workflow_file))
+    actions = FakeActions(fail={"Item1:export:glb", "Item2:generate"})
+    report = asyncio.run(WorkflowEngine(workflow, actions.as_dict(), log=lambda message: None).run())
+    steps = {step["id"]: step for step in report["steps"]}
+
+    assert steps["Item1:export"]["status"] == "fallback"
+    assert steps["Item1:export"]["attempts"] == 4  # 1回 + リトライ2回 + フォールバック
+    assert steps["Item2:generate"]["status"] == "failed"
+    assert steps["Item2:import"]["status"] == steps["Item2:export"]["status"] == "skipped"
+    assert steps["Item3:export"]["status"] == "succeeded"
+    log = (workflow_file.parent / "errors.log").read_text(encoding="utf-8")
+    assert "Item2:generate" in log and "Item1:export" in log
+
+    workflow.error_handling["continue_on_error"] = False
+    report = asyncio.run(WorkflowEngine(workflow, FakeActions(fail={"check_files"}).as_dict(),
+                                        log=lambda message: None).run())
+    assert report["failed"] == 1 and report["skipped"] == len(workflow.steps) - 1
+
+def test_error_log_relative_to_workflow(workflow_file, tmp_path, monkeypatch):
+    """相対パスのエラーログは実行時のカレントディレクトリではなく手順ファイルのフォルダに書かれるテスト"""
+    workflow_file.write_text(workflow_file.read_text(encoding="utf-8").replace(str(tmp_path / "errors.log"),
+                                                                               "generation_errors.log"),
+                             encoding="utf-8")
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+
+    workflow = load_workflow(str(workflow_file))
+    asyncio.run(WorkflowEngine(workflow, FakeActions(fail={"Item2:generate"}).as_dict(),
+                               log=lambda message: None).run())
+    assert "Item2:generate" in (tmp_path / "generation_errors.log").read_text(encoding="utf-8")
+    assert not list(elsewhere.iterdir())
+
+def test_incremental_run_skips_unchanged_items(workflow_file):
+    """マニフェストと一致するアイテムは省略され、prompt を変えたアイテムと出力が消えたアイテムだけ再生成されるテスト"""
+    async def export(context):
+        path = Path(context.params["output_path"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(context.step.item["prompt"], encoding="utf-8")
+        return {"output_path": str(path)}
+
+    def run():
+        workflow = load_workflow(str(workflow_file))
+        actions = dict(FakeActions().as_dict(), export_individual_asset=export)
+        manifest = ItemManifest(str(workflow_file.parent / "manifest.json"))
+        report = asyncio.run(WorkflowEngine(workflow, actions, log=lambda message: None, manifest=manifest).run())
+        return workflow, {step["id"]: step["status"] for step in report["steps"]}, report
+
+    _, statuses, report = run()
+    assert report["unchanged"] == 0 and report["manifest"]["recorded"] == 4
+
+    _, statuses, report = run()
+    assert report["unchanged"] == 12 and report["succeeded"] == 3  # 初期化・確認の手順だけ実行
+
+    items_path = workflow_file.parent / "items.yaml"
+    items = yaml.safe_load(items_path.read_text(encoding="utf-8"))["items"]
+    items[1]["prompt"] = "edited prompt"
+    items_path.write_text(yaml.safe_dump({"items": items}), encoding="utf-8")
+    _, statuses, _ = run()
+    assert statuses["Item1:generate"] == "succeeded" and statuses["Item3:generate"] == "unchanged"
+    Path(ItemManifest(str(workflow_file.parent / "manifest.json")).items["Item3"]["output_path"]).unlink()
+    _, statuses, report = run()
+    assert statuses["Item0:generate"] == statuses["Item2:export"] == "unchanged"
+    assert statuses["Item3:generate"] == statuses["Item3:export"] == "succeeded"
+    assert report["manifest"] == {"unchanged": 3, "changed": 1, "recorded": 4}
+
+def test_mcp_actions_with_fake_server(workflow_file):
+    """blender-mcp 代替サーバーに対して生成・インポート・エクスポートが実行されるテスト"""
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    workflow = load_workflow(str(workflow_file))
+
+    async def scenario():
+        server = StdioServerParameters(command=sys.executable, args=[str(ROOT / "fake_blender_mcp.py")])
+        async with stdio_client(server) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                async with McpActions(session, poll_interval=0.01) as actions:
+                    engine = WorkflowEngine(workflow, actions.as_dict(), max_remote=4, log=lambda message: None)
+                    report = await engine.run()
+                scene = await session.call_tool("get_scene_info", {})
+                return report, engine.outputs, scene.content[0].text, actions.scheduler._poller
+
+    report, outputs, scene, poller = asyncio.run(scenario())
+    # 自分で作ったスケジューラのポーリングは終了時に止まる
+    assert poller is None
+    assert report["failed"] == 0 and report["succeeded"] == len(workflow.steps)
+    assert outputs["Item3:import"]["location"] == [16.0, 2.0, 0.0]
+    assert outputs["Item0:export"]["output_path"].endswith("Item0.glb")
+    assert all(f'"Item{i}"' in scene for i in range(4))
@@ -0,0 +1,64 @@
+"""
+GAAAGS テクスチャ前処理
+Blenderに渡す前に Pillow/NumPy でテクスチャを texture_size まで縮小し、ディスプレースメント用の高さ画像を作成する
+（Blender内の image.scale と、ディスプレースメント用の同じ画像の再読み込みをなくす）
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# 輝度の重み（ITU-R BT.601、PillowのLモードと同じ）
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+@dataclass
+class PreparedTexture:
+    """前処理済みのテクスチャ"""
+    color_path: str  # <名前>_color.png（texture_size 以下に縮小したカラー）
+    displacement_path: str  # <名前>_displacement.png（16bitグレースケールの輝度）
+    size: Tuple[int, int]
+
+    def settings(self) -> Dict[str, str]:
+        """Blenderスクリプトへ渡す設定"""
+        return {"color_texture": self.color_path, "displacement_texture": self.displacement_path}
+
+
+def resize_texture(image: Image.Image, texture_size: int) -> Image.Image:
+    """長辺が texture_size を超える場合だけ縦横比を保って縮小（Lanczos）"""
+    mode = "RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB"
+    image = image.convert(mode)
+    if max(image.size) > texture_size:
+        image.thumbnail((texture_size, texture_size), Image.LANCZOS)
+    return image
+
+
+def displacement_image(image: Image.Image) -> Image.Image:
+    """カラー画像の輝度を16bitグレースケールにする（8bitの段差がディスプレースメントに出ないように）"""
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32) / 255.0
+    return Image.fromarray(np.rint(rgb @ LUMA_WEIGHTS * 65535.0).astype(np.uint16))
+
+
+def prepare_texture(image_path: str, output_dir: str, texture_size: int = 1024,
+                    name: Optional[str] = None, displacement_dir: Optional[str] = None) -> PreparedTexture:
+    """カラーテクスチャを output_dir に、ディスプレースメント用の高さ画像を displacement_dir（省略時は output_dir）に保存
+
+    ProcessPoolExecutor から呼べるよう、引数と戻り値はpickle可能なものだけにしている。
+    """
+    output_dir = Path(output_dir)
+    displacement_dir = Path(displacement_dir) if displacement_dir else output_dir
+    for directory in (output_dir, displacement_dir):
+        directory.mkdir(parents=True, exist_ok=True)
+    name = name or Path(image_path).stem
+    color_path = output_dir / f"{name}_color.png"
+    displacement_path = displacement_dir / f"{name}_displacement.png"
+
+    with Image.open(image_path) as image:
+        color = resize_texture(image, texture_size)
+    color.save(color_path)
+    displacement_image(color).save(displacement_path)
+
+    return PreparedTexture(str(color_path), str(displacement_path), color.size)
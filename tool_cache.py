@@ -0,0 +1,138 @@
+"""
+GAAAGS MCPツール呼び出しのキャッシュ
+ClientSession を包み、結果の変わらない読み取り専用ツールの結果をシーンを変更するツールが実行されるまで再利用する。
+ツール一覧（list_tools）はサーバー名とバージョンをキーにディスクへ保存し、次のセッションではMCPへ問い合わせない
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from mcp.types import ListToolsResult
+
+# 結果をキャッシュしてよいツール（読み取り専用で、シーンが変わらない限り同じ結果を返す）
+# poll_rodin_job_status は読み取り専用だが時間とともに結果が変わるためキャッシュしない
+CACHEABLE_TOOLS = {
+    "get_scene_info",
+    "get_object_info",
+    "get_polyhaven_categories",
+    "search_polyhaven_assets",
+    "get_polyhaven_status",
+    "get_hyper3d_status",
+}
+
+# 結果に影響しない読み取り専用ツール（シーンを変更せず、キャッシュも無効にしない）
+NON_MUTATING_TOOLS = CACHEABLE_TOOLS | {"poll_rodin_job_status"}
+
+
+def server_key(server_info) -> Optional[str]:
+    """サーバー名とバージョンからツール一覧のキャッシュキーを作成（バージョンが分からなければ None）"""
+    name = getattr(server_info, "name", None)
+    version = getattr(server_info, "version", None)
+    if not name or not version:
+        return None
+    return hashlib.sha256(f"{name}:{version}".encode("utf-8")).hexdigest()[:16]
+
+
+class CachingSession:
+    """call_tool と list_tools をキャッシュする ClientSession のラッパー
+
+    CACHEABLE_TOOLS の結果は (ツール名, 引数) ごとに保存し、NON_MUTATING_TOOLS 以外のツールの実行前後で破棄する。
+    同じ呼び出しが実行中なら完了を待って同じ結果を返す。エラーの結果は保存しない。
+    その他の属性は元のセッションに委ねる。
+    """
+
+    def __init__(self, session, server_info=None, schema_cache_dir: Optional[str] = None,
+                 cacheable: Iterable[str] = CACHEABLE_TOOLS, non_mutating: Iterable[str] = NON_MUTATING_TOOLS):
+        self.session = session
+        self.server_info = server_info
+        self.schema_cache_dir = Path(schema_cache_dir) if schema_cache_dir else None
+        self.cacheable = set(cacheable)
+        self.non_mutating = set(non_mutating) | self.cacheable
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.schema_cached = False
+        self._results: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def invalidate(self):
+        """保存した結果を破棄する（実行中の呼び出しの結果も保存しない）"""
+        self._generation += 1
+        if self._results:
+            self.invalidations += 1
+        self._results.clear()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict] = None, *args, **kwargs):
+        if name not in self.non_mutating:
+            self.invalidate()
+            try:
+                return await self.session.call_tool(name, arguments, *args, **kwargs)
+            finally:
+                self.invalidate()
+        if name not in self.cacheable:
+            return await self.session.call_tool(name, arguments, *args, **kwargs)
+
+        key = json.dumps([name, arguments or {}], sort_keys=True, ensure_ascii=False, default=str)
+        task = self._results.get(key)
+        if task is not None:
+            self.hits += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        generation = self._generation
+        task = asyncio.ensure_future(self.session.call_tool(name, arguments, *args, **kwargs))
+        self._results[key] = task
+        try:
+            result = await asyncio.shield(task)
+        except BaseException:
+            if self._results.get(key) is task:
+                del self._results[key]
+            raise
+        is_error = getattr(result, "isError", None) or getattr(result, "is_error", False)
+        if (is_error or generation != self._generation) and self._results.get(key) is task:
+            del self._results[key]
+        return result
+
+    def _schema_path(self) -> Optional[Path]:
+        key = server_key(self.server_info)
+        if self.schema_cache_dir is None or key is None:
+            return None
+        return self.schema_cache_dir / f"tools_{key}.json"
+
+    async def list_tools(self, *args, **kwargs):
+        """ツール一覧（同じバージョンのサーバーなら保存した一覧を使う）"""
+        path = self._schema_path()
+        if path is not None and path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = ListToolsResult.model_validate(json.load(f))
+                self.schema_cached = True
+                return result
+            except (OSError, ValueError):
+                pass
+
+        result = await self.session.list_tools(*args, **kwargs)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(result.model_dump(mode="json", by_alias=True, exclude_none=True), f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        return result
+
+    def stats(self) -> Dict:
+        """ヒット数・ミス数・破棄した回数"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "schema_cached": self.schema_cached
+        }
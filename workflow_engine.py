@@ -0,0 +1,669 @@
+"""
+GAAAGS 3Dモデル生成ワークフローの実行エンジン
+model_generation.yaml / model_generation_config.yaml の手順を依存関係のグラフにして実行する。
+
+- ${...} の変数は読み込み時に一度だけ解決する（アイテムごとの ${current_item.name} なども含む）
+- init は順番に、check は init の後に並列に、アイテムごとの generate → import → export はアイテム間で並列に実行する
+- Hyper3D の生成（リモート）は max_remote 件まで同時に、Blenderへのインポート・エクスポートはワーカーごとに1件ずつ実行する
+- generation.error_handling の continue_on_error・ログ・エクスポートのリトライとフォールバック形式に従う
+- 手順ごとの所要時間をレポートに記録する
+- --incremental ではマニフェストと比べて、内容が変わっておらず書き出したファイルも残っているアイテムを省略する
+
+    python workflow_engine.py model_generation.yaml --max-remote 4 --incremental
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import yaml
+
+from hyper3d_scheduler import MIN_POLL_INTERVAL, Hyper3DScheduler
+from item_manifest import DEFAULT_MANIFEST_FILE, ItemManifest, item_fingerprint
+
+# ${a.b.c} 形式の変数
+VARIABLE = re.compile(r"\$\{([^}]+)\}")
+
+# アイテムごとに決まる変数（全体の設定ではそのまま残し、アイテムの手順を作るときに解決する）
+ITEM_VARIABLES = {"current_item", "item_name", "item_index"}
+
+# アクションが使う資源（remote: Hyper3D、blender: Blenderのシーン、local: このプロセスだけ）
+ACTION_RESOURCES = {
+    "check_files": "local",
+    "check_blender_connection": "blender",
+    "get_scene_info": "blender",
+    "get_hyper3d_status": "blender",
+    "generate_hyper3d_model": "remote",
+    "import_generated_asset": "blender",
+    "export_individual_asset": "blender",
+    "save_scene": "blender",
+}
+
+# 既定の同時実行数
+DEFAULT_MAX_REMOTE = 4
+DEFAULT_BLENDER_WORKERS = 1
+
+
+class WorkflowError(Exception):
+    """ワークフロー定義の誤り"""
+    pass
+
+
+class StepFailed(Exception):
+    """手順の実行に失敗した"""
+    pass
+
+
+# --- 変数の解決 ---
+
+def strftime_pattern(date_format: str) -> str:
+    """YYYYMMDD-HHMM 形式の日付書式を strftime の書式に変換（HH の後の MM は分）"""
+    pattern, seen_hour = [], False
+    for token in re.findall(r"YYYY|MM|DD|HH|SS|.", date_format):
+        if token == "HH":
+            seen_hour = True
+        pattern.append({"YYYY": "%Y", "DD": "%d", "HH": "%H", "SS": "%S",
+                        "MM": "%M" if seen_hour else "%m"}.get(token, token))
+    return "".join(pattern)
+
+
+def lookup(context: Dict, path: str) -> Any:
+    """ドット区切りのパスで値を取得"""
+    value = context
+    for key in path.strip().split("."):
+        if isinstance(value, dict) and key in value:
+            value = value[key]
+        elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+            value = value[int(key)]
+        else:
+            raise WorkflowError(f"未定義の変数です: ${{{path}}}")
+    return value
+
+
+def resolve(value: Any, context: Dict, _stack: tuple = ()) -> Any:
+    """value 内の ${...} を context の値で置き換える
+
+    文字列全体が1つの変数なら元の型（数値など）のまま、文字列の一部なら文字列として埋め込む。
+    参照先にさらに変数があれば再帰的に解決し、循環していればエラーにする。
+    context にないアイテムごとの変数（ITEM_VARIABLES）は ${...} のまま残す。
+    """
+    if isinstance(value, dict):
+        return {key: resolve(item, context, _stack) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, context, _stack) for item in value]
+    if not isinstance(value, str) or "${" not in value:
+        return value
+
+    def variable(path: str) -> Any:
+        path = path.strip()
+        if path.split(".")[0] in ITEM_VARIABLES and path.split(".")[0] not in context:
+            return f"${{{path}}}"
+        if path in _stack:
+            raise WorkflowError(f"変数が循環しています: {' → '.join(_stack + (path,))}")
+        return resolve(lookup(context, path), context, _stack + (path,))
+
+    whole = VARIABLE.fullmatch(value)
+    if whole:
+        return variable(whole.group(1))
+    return VARIABLE.sub(lambda match: str(variable(match.group(1))), value)
+
+
+# --- ワークフローの読み込み ---
+
+@dataclass
+class Step:
+    """実行する手順（グラフの1ノード）"""
+    id: str
+    action: str
+    name: str
+    params: Dict = field(default_factory=dict)
+    deps: List[str] = field(default_factory=list)
+    resource: str = "blender"
+    item: Optional[Dict] = None
+    item_index: Optional[int] = None
+    retries: int = 0
+    fallback: Optional[Dict] = None  # リトライしても失敗したときに上書きする引数
+    skip_on_failure: bool = False  # 失敗しても後続・全体を止めない
+    always_run: bool = False  # 依存先が失敗しても実行する（後処理）
+
+
+@dataclass
+class Workflow:
+    """読み込んで変数を解決したワークフロー"""
+    path: Path
+    config: Dict
+    items: List[Dict]
+    steps: Dict[str, Step]
+    error_handling: Dict
+
+    def plan(self) -> List[Dict]:
+        """実行計画（手順・資源・依存先）"""
+        return [{"id": s.id, "action": s.action, "resource": s.resource, "deps": s.deps}
+                for s in self.steps.values()]
+
+    def resolve_path(self, file_name: str) -> Path:
+        """手順ファイルに書かれたパス（相対パスは手順ファイルのフォルダから）"""
+        return self.path.parent / Path(file_name).expanduser()
+
+
+def load_items(config: Dict, base_dir: Path, items_path: Optional[str] = None) -> List[Dict]:
+    """アイテムリストを読み込む（items_path の指定 > 埋め込み > items_config.external_file）"""
+    items_config = config.get("items_config", {})
+    source = items_config.get("source")
+    if items_path is None and config.get("items") and source != "external":
+        items = config["items"]
+    else:
+        file_name = items_path or resolve(items_config.get("external_file"), config) \
+            or config.get("files", {}).get("item_list", {}).get("default_file")
+        if not file_name:
+            raise WorkflowError("アイテムリストが指定されていません")
+        # 手順ファイルに書かれたパスは手順ファイルのフォルダからの相対パス
+        path = Path(file_name) if items_path else base_dir / file_name
+        if not path.exists():
+            raise WorkflowError(f"アイテムリストが見つかりません: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            items = (yaml.safe_load(f) or {}).get("items", [])
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("name"):
+            raise WorkflowError(f"アイテム {index + 1} に name がありません")
+    names = [item["name"] for item in items]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise WorkflowError(f"アイテム名が重複しています: {', '.join(duplicates)}")
+    return items
+
+
+def load_workflow(path: str, items_path: Optional[str] = None, now: Optional[datetime] = None) -> Workflow:
+    """手順ファイルを読み込み、変数を解決して手順のグラフを作成"""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        raw = yaml.safe_load(f) or {}
+    if not raw.get("steps"):
+        raise WorkflowError(f"steps がありません: {path}")
+
+    items = load_items(raw, path.parent, items_path)
+    now = now or datetime.now()
+    date_format = raw.get("export_settings", {}).get("date_format", "YYYYMMDD-HHMM")
+    context = dict(raw, items=items, date=now.strftime(strftime_pattern(date_format)))
+    config = resolve({key: value for key, value in raw.items() if key != "steps"}, context)
+    context.update(config)
+
+    error_handling = config.get("generation", {}).get("error_handling", {})
+    export_errors = error_handling.get("export_errors", {})
+    steps: Dict[str, Step] = {}
+    init_ids: List[str] = []
+    before_loop: List[str] = []
+
+    def add(step: Step):
+        if step.id in steps:
+            raise WorkflowError(f"手順が重複しています: {step.id}")
+        steps[step.id] = step
+
+    for definition in raw["steps"]:
+        action = definition.get("action")
+        if not action:
+            raise WorkflowError(f"action がない手順があります: {definition}")
+        kind = definition.get("type", "init")
+        name = definition.get("name", action)
+
+        if kind == "loop":
+            target = definition.get("loop_settings", {}).get("target", "items")
+            loop_items = items if target == "items" else lookup(context, target)
+            for index, item in enumerate(loop_items):
+                item_context = dict(context, current_item=item, item_name=item["name"], item_index=index)
+                previous = list(before_loop)
+                for entry in definition["loop_settings"].get("for_each", []):
+                    step_name = entry.get("step", entry["action"])
+                    is_export = entry["action"] == "export_individual_asset"
+                    step = Step(
+                        id=f"{item['name']}:{step_name}",
+                        action=entry["action"],
+                        name=step_name,
+                        params=resolve(entry.get("params", {}), item_context),
+                        deps=previous,
+                        resource=ACTION_RESOURCES.get(entry["action"], "blender"),
+                        item=item,
+                        item_index=index,
+                        retries=export_errors.get("retry_count", 0) if is_export else 0,
+                        fallback={"export_format": export_errors["fallback_format"]}
+                        if is_export and export_errors.get("fallback_format") else None,
+                        skip_on_failure=is_export and export_errors.get("skip_on_failure", False)
+                    )
+                    add(step)
+                    previous = [step.id]
+            continue
+
+        step = Step(id=action, action=action, name=name, params=resolve(definition.get("params", {}), context),
+                    resource=ACTION_RESOURCES.get(action, "blender"))
+        if kind == "init":
+            step.deps = init_ids[-1:]
+            init_ids.append(step.id)
+        else:
+            step.deps = list(init_ids)
+        add(step)
+        before_loop.append(step.id)
+
+    if config.get("post_processing", {}).get("save_scene"):
+        # 後続のない手順（各アイテムの最後の手順など）がすべて終わってから実行
+        required = {dep for step in steps.values() for dep in step.deps}
+        add(Step(id="save_scene", action="save_scene", name="シーン保存",
+                 deps=[step_id for step_id in steps if step_id not in required], resource="blender",
+                 always_run=True))
+
+    return Workflow(path=path, config=config, items=items, steps=steps, error_handling=error_handling)
+
+
+# --- 実行 ---
+
+@dataclass
+class StepContext:
+    """アクションに渡す情報"""
+    step: Step
+    params: Dict
+    workflow: Workflow
+    outputs: Dict[str, Dict]
+
+    def item_output(self, step_name: str) -> Dict:
+        """同じアイテムの前の手順の出力"""
+        return self.outputs.get(f"{self.step.item['name']}:{step_name}", {})
+
+
+@dataclass
+class StepResult:
+    """手順の実行結果"""
+    id: str
+    action: str
+    item: Optional[str]
+    status: str  # succeeded / fallback / failed / skipped / unchanged
+    attempts: int = 0
+    started: float = 0.0  # 開始時刻（ワークフロー開始からの秒）
+    seconds: float = 0.0
+    wait_seconds: float = 0.0  # 資源の空きを待った時間
+    error: Optional[str] = None
+
+
+Action = Callable[[StepContext], Awaitable[Dict]]
+
+
+class WorkflowEngine:
+    """手順のグラフを依存関係と資源の制限に従って並列に実行する
+
+    manifest を渡すと、前回から変わっていないアイテムの手順は実行せずに unchanged とし
+    （Blenderのシーンにもインポートしない）、エクスポートしたファイルをマニフェストに記録する。
+    """
+
+    def __init__(self, workflow: Workflow, actions: Dict[str, Action], max_remote: int = DEFAULT_MAX_REMOTE,
+                 blender_workers: int = DEFAULT_BLENDER_WORKERS, log: Callable[[str], None] = print,
+                 manifest: Optional[ItemManifest] = None):
+        missing = sorted({step.action for step in workflow.steps.values()} - set(actions))
+        if missing:
+            raise WorkflowError(f"未対応のアクションです: {', '.join(missing)}")
+        self.workflow = workflow
+        self.actions = actions
+        self.max_remote = max(1, max_remote)
+        self.blender_workers = max(1, blender_workers)
+        self.log = log
+        self.manifest = manifest
+        self.continue_on_error = workflow.error_handling.get("continue_on_error", True)
+        self.results: Dict[str, StepResult] = {}
+        self.outputs: Dict[str, Dict] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._unchanged = set()
+
+    def item_settings(self, name: str) -> Dict:
+        """アイテムの出力に影響する設定（エクスポートの引数から日付を含む出力先を除いたもの）"""
+        export = next((step for step in self.workflow.steps.values()
+                       if step.item and step.item["name"] == name and step.action == "export_individual_asset"), None)
+        params = {key: value for key, value in (export.params if export else {}).items() if key != "output_path"}
+        return {"export": params, "fallback": export.fallback if export else None,
+                "export_options": self.workflow.config.get("export_settings", {}).get("export_options")}
+
+    def _resource(self, step: Step):
+        """手順が使う資源のロック（blender はアイテムごとにワーカーを割り当てる）"""
+        if step.resource == "remote":
+            return self._remote
+        if step.resource == "blender":
+            return self._blender[(step.item_index or 0) % self.blender_workers]
+        return None
+
+    async def _run_action(self, step: Step, params: Dict) -> Dict:
+        context = StepContext(step=step, params=params, workflow=self.workflow, outputs=self.outputs)
+        return await self.actions[step.action](context) or {}
+
+    async def _run_step(self, step: Step, done: Dict[str, asyncio.Event]):
+        for dep in step.deps:
+            await done[dep].wait()
+        result = StepResult(id=step.id, action=step.action, item=step.item["name"] if step.item else None,
+                            status="skipped")
+        try:
+            if result.item in self._unchanged:
+                result.status = "unchanged"
+                return
+            blocked = [dep for dep in step.deps if self.results[dep].status in ("failed", "skipped")
+                       and not self.workflow.steps[dep].skip_on_failure]
+            if self._aborted and not step.always_run:
+                result.error = "前の手順の失敗により中止"
+                return
+            if blocked and not step.always_run:
+                result.error = f"依存先が失敗: {', '.join(blocked)}"
+                return
+
+            waiting = time.perf_counter()
+            resource = self._resource(step)
+            async with resource if resource is not None else _null():
+                started = time.perf_counter()
+                result.wait_seconds = round(started - waiting, 3)
+                result.started = round(started - self._started, 3)
+                result.status, error = await self._attempt(step, result)
+                result.seconds = round(time.perf_counter() - started, 3)
+            if self.manifest is not None and step.action == "export_individual_asset" \
+                    and result.status in ("succeeded", "fallback"):
+                await self._record(step)
+            if error:
+                result.error = error
+                self._log_error(step, error)
+                if not self.continue_on_error and not step.skip_on_failure:
+                    self._aborted = True
+        finally:
+            self.results[step.id] = result
+            label = f"{step.id}" + (f" ({result.seconds}秒)" if result.seconds else "")
+            mark = {"succeeded": "✓", "fallback": "△", "unchanged": "="}.get(result.status, "✗")
+            self.log(f"{mark} {label}" + (f": {result.error}" if result.error else ""))
+            done[step.id].set()
+
+    async def _record(self, step: Step):
+        """エクスポートしたファイルをマニフェストに記録"""
+        name = step.item["name"]
+        output_path = self.outputs.get(step.id, {}).get("output_path", "")
+        if not await asyncio.to_thread(self.manifest.record, name, self._fingerprints[name], output_path):
+            self.log(f"! {step.id}: 出力ファイルが見つからないためマニフェストに記録しません: {output_path}")
+
+    async def _attempt(self, step: Step, result: StepResult):
+        """リトライとフォールバックを含めて手順を実行し、(状態, エラー) を返す"""
+        error = None
+        for _ in range(step.retries + 1):
+            result.attempts += 1
+            try:
+                self.outputs[step.id] = await self._run_action(step, step.params)
+                return "succeeded", None
+            except Exception as e:
+                error = str(e)
+        if step.fallback:
+            result.attempts += 1
+            try:
+                self.outputs[step.id] = await self._run_action(step, dict(step.params, **step.fallback))
+                return "fallback", f"フォールバック {step.fallback} で実行（元のエラー: {error}）"
+            except Exception as e:
+                error = f"{error} / フォールバックも失敗: {e}"
+        return "failed", error
+
+    def _log_error(self, step: Step, error: str):
+        if not self.workflow.error_handling.get("log_errors"):
+            return
+        log_file = self.workflow.error_handling.get("error_log_file")
+        if log_file:
+            with open(self.workflow.resolve_path(log_file), "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now().isoformat()}\t{step.id}\t{error}\n")
+
+    async def run(self) -> Dict:
+        """全手順を実行してレポートを返す"""
+        self._remote = asyncio.Semaphore(self.max_remote)
+        self._blender = [asyncio.Lock() for _ in range(self.blender_workers)]
+        self._aborted = False
+        self._started = time.perf_counter()
+        if self.manifest is not None:
+            for item in self.workflow.items:
+                fingerprint = item_fingerprint(item, self.item_settings(item["name"]))
+                self._fingerprints[item["name"]] = fingerprint
+                if await asyncio.to_thread(self.manifest.is_current, item["name"], fingerprint):
+                    self._unchanged.add(item["name"])
+        done = {step_id: asyncio.Event() for step_id in self.workflow.steps}
+        try:
+            await asyncio.gather(*(self._run_step(step, done) for step in self.workflow.steps.values()))
+        finally:
+            if self.manifest is not None:
+                self.manifest.save()
+        return self.report(time.perf_counter() - self._started)
+
+    def report(self, elapsed: float) -> Dict:
+        """手順ごとの所要時間と状態、アクションごとの合計を含むレポート"""
+        steps = [asdict(self.results[step_id]) for step_id in self.workflow.steps]
+        action_seconds: Dict[str, float] = {}
+        for step in steps:
+            action_seconds[step["action"]] = round(action_seconds.get(step["action"], 0.0) + step["seconds"], 3)
+        busy = sum(step["seconds"] for step in steps)
+        counts = {status: sum(1 for step in steps if step["status"] == status)
+                  for status in ("succeeded", "fallback", "failed", "skipped", "unchanged")}
+        return dict(
+            workflow=str(self.workflow.path),
+            finished_at=datetime.now().isoformat(),
+            elapsed_seconds=round(elapsed, 3),
+            busy_seconds=round(busy, 3),
+            # 手順の所要時間の合計 ÷ 全体の所要時間（1なら逐次実行と同じ）
+            parallelism=round(busy / elapsed, 2) if elapsed > 0 else 0.0,
+            max_remote=self.max_remote,
+            blender_workers=self.blender_workers,
+            action_seconds=action_seconds,
+            manifest=self.manifest.stats() if self.manifest is not None else None,
+            steps=steps,
+            **counts
+        )
+
+
+class _null:
+    """資源を使わない手順用の何もしないコンテキストマネージャ"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+# --- blender-mcp で実行するアクション ---
+
+def tool_text(result) -> str:
+    """ツール実行結果のテキスト"""
+    return "\n".join(getattr(item, "text", "") for item in getattr(result, "content", None) or [])
+
+
+class McpActions:
+    """ワークフローのアクションを blender-mcp のツール呼び出しで実行する
+
+    Hyper3D の生成は Hyper3DScheduler に任せ、全アイテムのジョブを1つのポーリングタスクで確認する。
+    scheduler を渡さなければ自分で作るので、async with で使って終了時にポーリングを止める
+    （渡したスケジューラは閉じない）。
+    """
+
+    def __init__(self, session, poll_interval: float = MIN_POLL_INTERVAL,
+                 scheduler: Optional[Hyper3DScheduler] = None):
+        self.session = session
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or Hyper3DScheduler(session, max_in_flight=DEFAULT_MAX_REMOTE,
+                                                       min_interval=poll_interval)
+
+    async def close(self):
+        """自分で作ったスケジューラを閉じる"""
+        if self._owns_scheduler:
+            await self.scheduler.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+        return False
+
+    async def call(self, tool: str, arguments: Optional[Dict] = None) -> str:
+        """ツールを呼び出してテキストを返す（エラーの結果は StepFailed にする）"""
+        result = await self.session.call_tool(tool, arguments or {})
+        text = tool_text(result)
+        if getattr(result, "isError", None) or getattr(result, "is_error", False) or text.startswith("Error"):
+            raise StepFailed(f"{tool}: {text[:300]}")
+        return text
+
+    async def execute(self, code: str) -> str:
+        return await self.call("execute_blender_code", {"code": code})
+
+    async def check_files(self, context: StepContext) -> Dict:
+        if not context.workflow.items:
+            raise StepFailed("アイテムリストが空です")
+        return {"items": len(context.workflow.items)}
+
+    async def check_blender_connection(self, context: StepContext) -> Dict:
+        tools = await self.session.list_tools()
+        names = {tool.name for tool in tools.tools}
+        missing = {"execute_blender_code", "generate_hyper3d_model_via_text"} - names
+        if missing:
+            raise StepFailed(f"Blender MCPに必要なツールがありません: {', '.join(sorted(missing))}")
+        return {"tools": len(names)}
+
+    async def get_scene_info(self, context: StepContext) -> Dict:
+        return {"scene": json.loads(await self.call("get_scene_info"))}
+
+    async def get_hyper3d_status(self, context: StepContext) -> Dict:
+        text = await self.call("get_hyper3d_status")
+        if "disabled" in text.lower() or "not enabled" in text.lower():
+            raise StepFailed(f"Hyper3D Rodin が無効です: {text}")
+        return {"status": text}
+
+    async def generate_hyper3d_model(self, context: StepContext) -> Dict:
+        """Hyper3D にテキストから生成を依頼し、完了まで待つ
+
+        インポートには完成したモデルが必要なため、wait_for_completion に関わらず完了を待つ
+        （待っている間はBlenderを使わないので、他のアイテムのインポート・エクスポートは進む）。
+        """
+        params, item = context.params, context.step.item
+        prompt = item.get("prompt") if params.get("use_item_prompt", True) else params.get("prompt")
+        job = await self.scheduler.generate(item["name"], prompt, params.get("timeout"))
+        return {"task_uuid": job.task_uuid, "subscription_key": job.subscription_key,
+                "request_id": job.request_id, "polls": job.polls, "seconds": job.seconds}
+
+    async def import_generated_asset(self, context: StepContext) -> Dict:
+        """生成したモデルをインポートし、incremental ならアイテム順にX方向へずらして配置"""
+        params, item = context.params, context.step.item
+        job = context.item_output("generate")
+        name = item["name"] if params.get("use_item_name", True) else params.get("name")
+        arguments = {"name": name}
+        arguments.update({"task_uuid": job["task_uuid"]} if job.get("task_uuid") else {"request_id": job.get("request_id")})
+        text = await self.call("import_generated_asset", arguments)
+        if text.startswith("{") and json.loads(text).get("succeed") is False:
+            raise StepFailed(f"インポートに失敗しました: {text}")
+
+        position = params.get("position", {})
+        if position:
+            initial = context.workflow.config.get("placement", {}).get("initial_position", {})
+            x = float(position.get("x", initial.get("x", 0.0)))
+            if position.get("type") == "incremental":
+                x += float(position.get("x_offset", 0.0)) * context.step.item_index
+            location = (x, float(position.get("y", 0.0)), float(position.get("z", 0.0)))
+            await self.execute(f"import bpy\nbpy.data.objects[{name!r}].location = {location!r}\n")
+            return {"name": name, "location": list(location)}
+        return {"name": name}
+
+    async def export_individual_asset(self, context: StepContext) -> Dict:
+        """オブジェクト（と子）だけを選択して個別のファイルに保存"""
+        params = context.params
+        export_format = params.get("export_format", "glb").lower()
+        output_path = Path(os.path.expanduser(params["output_path"])).with_suffix(f".{export_format}")
+        exporters = {
+            "glb": "bpy.ops.export_scene.gltf(filepath=path, use_selection=True, export_format='GLB')",
+            "gltf": "bpy.ops.export_scene.gltf(filepath=path, use_selection=True, export_format='GLTF_SEPARATE')",
+            "obj": "(bpy.ops.wm.obj_export(filepath=path, export_selected_objects=True) "
+                   "if 'obj_export' in dir(bpy.ops.wm) else bpy.ops.export_scene.obj(filepath=path, use_selection=True))",
+            "fbx": "bpy.ops.export_scene.fbx(filepath=path, use_selection=True)",
+        }
+        if export_format not in exporters:
+            raise StepFailed(f"未対応の形式です: {export_format}")
+        code = (
+            "import bpy, os\n"
+            f"path = {str(output_path)!r}\n"
+            "os.makedirs(os.path.dirname(path), exist_ok=True)\n"
+            "bpy.ops.object.select_all(action='DESELECT')\n"
+            f"obj = bpy.data.objects[{params['target_object']!r}]\n"
+            "for o in [obj] + list(obj.children_recursive):\n"
+            "    o.select_set(True)\n"
+            "bpy.context.view_layer.objects.active = obj\n"
+            f"{exporters[export_format]}\n"
+        )
+        await self.execute(code)
+        return {"output_path": str(output_path), "format": export_format}
+
+    async def save_scene(self, context: StepContext) -> Dict:
+        text = await self.execute(
+            "import bpy\nif bpy.data.filepath:\n    bpy.ops.wm.save_mainfile()\n"
+            "print(bpy.data.filepath or 'unsaved')\n"
+        )
+        return {"result": text}
+
+    def as_dict(self) -> Dict[str, Action]:
+        return {action: getattr(self, action) for action in ACTION_RESOURCES}
+
+
+async def run_workflow(path: str, items_path: Optional[str] = None, max_remote: int = DEFAULT_MAX_REMOTE,
+                       blender_workers: int = DEFAULT_BLENDER_WORKERS, server_command: str = "uvx blender-mcp",
+                       poll_interval: float = MIN_POLL_INTERVAL, incremental: bool = False,
+                       manifest_path: Optional[str] = None) -> Dict:
+    """blender-mcp に接続してワークフローを実行し、post_processing の設定に従ってレポートを保存
+
+    incremental ならマニフェスト（既定は手順ファイルと同じフォルダの generation_manifest.json）を使う。
+    """
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+    from tool_cache import CachingSession
+
+    workflow = load_workflow(path, items_path)
+    manifest = ItemManifest(manifest_path or workflow.path.parent / DEFAULT_MANIFEST_FILE) if incremental else None
+    command, *args = server_command.split()
+    async with stdio_client(StdioServerParameters(command=command, args=args)) as (r, w):
+        async with ClientSession(r, w) as session:
+            await session.initialize()
+            session = CachingSession(session)
+            async with Hyper3DScheduler(session, max_in_flight=max_remote, min_interval=poll_interval) as scheduler:
+                actions = McpActions(session, scheduler=scheduler).as_dict()
+                report = await WorkflowEngine(workflow, actions, max_remote, blender_workers,
+                                              manifest=manifest).run()
+                report["hyper3d"] = scheduler.stats()
+
+    post = workflow.config.get("post_processing", {})
+    if post.get("generate_report"):
+        with open(workflow.resolve_path(post.get("report_file", "generation_report.json")), "w",
+                  encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="3Dモデル生成ワークフローの実行")
+    parser.add_argument("workflow", nargs="?", default="model_generation.yaml", help="手順ファイル")
+    parser.add_argument("--items", help="アイテムリスト（省略時は手順ファイルの設定）")
+    parser.add_argument("--max-remote", type=int, default=DEFAULT_MAX_REMOTE, help="Hyper3D の同時生成数")
+    parser.add_argument("--blender-workers", type=int, default=DEFAULT_BLENDER_WORKERS,
+                        help="インポート・エクスポートを並列に行うBlenderワーカー数")
+    parser.add_argument("--server", default="uvx blender-mcp", help="blender-mcp の起動コマンド")
+    parser.add_argument("--poll-interval", type=float, default=MIN_POLL_INTERVAL, help="生成状態の最短の確認間隔（秒）")
+    parser.add_argument("--incremental", action="store_true",
+                        help="前回から変わっていないアイテムを省略（マニフェストで判定）")
+    parser.add_argument("--manifest", help="マニフェストファイル（省略時は手順ファイルと同じフォルダ）")
+    parser.add_argument("--dry-run", action="store_true", help="実行せずに計画だけ表示")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        for entry in load_workflow(args.workflow, args.items).plan():
+            deps = ", ".join(entry["deps"]) or "-"
+            print(f"{entry['id']:<30} {entry['resource']:<8} ← {deps}")
+    else:
+        result = asyncio.run(run_workflow(args.workflow, args.items, args.max_remote, args.blender_workers,
+                                          args.server, args.poll_interval, args.incremental, args.manifest))
+        print(f"\n完了: 成功 {result['succeeded']} / フォールバック {result['fallback']} / "
+              f"失敗 {result['failed']} / スキップ {result['skipped']} / 変更なし {result['unchanged']} "
+              f"({result['elapsed_seconds']}秒, 並列度 {result['parallelism']})")